@@ -8,25 +8,42 @@ Usage:
     
     Or with uvicorn:
     uvicorn crowd_ai.api_server:app --host 0.0.0.0 --port 8000 --reload
+
+    Set WEB_CONCURRENCY to change the number of worker processes
+    (default: 2). Each worker loads and warms up its own copy of the
+    models at startup.
 """
 
+import asyncio
 import base64
-import io
+import os
 import time
-from typing import Optional
+from bisect import bisect_right
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional, TypedDict
 
+import anyio
 import cv2
 import numpy as np
-from PIL import Image
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm up models before serving the first request."""
+    warmup_models()
+    yield
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Crowd Density API",
     description="Real-time crowd counting and density estimation using CSRNet/YOLO",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse  # Faster JSON serialization
 )
 
 # Enable CORS for frontend access
@@ -38,6 +55,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Density level boundaries (people/sqm) and frontend risk mapping
+DENSITY_LEVELS = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+DENSITY_THRESHOLDS = (0.5, 1.5, 3.0)
+
+# Density level lookup table over density quantized to 1/32 people/sqm.
+# Exact because every threshold is a multiple of 1/32; the last entry
+# covers everything from 255/32 (~8 people/sqm) upwards.
+DENSITY_LUT_SCALE = 32
+DENSITY_LEVEL_LUT = tuple(
+    DENSITY_LEVELS[bisect_right(DENSITY_THRESHOLDS, i / DENSITY_LUT_SCALE)]
+    for i in range(256)
+)
+_DENSITY_LEVEL_LUT_NP = np.array(DENSITY_LEVEL_LUT)
+
+RISK_LEVELS = {
+    "LOW": "Low",
+    "MEDIUM": "Medium",
+    "HIGH": "High",
+    "CRITICAL": "High"  # Map critical to High for frontend compatibility
+}
+
 # Global model instances (lazy loaded)
 _csrnet_engine = None
 _yolo_detector = None
@@ -49,8 +87,13 @@ class AnalyzeRequest(BaseModel):
     area_sqm: Optional[float] = 100.0  # Area covered by camera
 
 
-class AnalyzeResponse(BaseModel):
-    """Response from analyze endpoint."""
+class AnalyzeResponse(TypedDict):
+    """
+    Response from analyze endpoint.
+    
+    A TypedDict rather than a pydantic model: every field is produced
+    by the server, so responses skip validation and go straight to orjson.
+    """
     crowdCount: int
     riskLevel: str  # "Low", "Medium", "High"
     analysis: str
@@ -69,7 +112,9 @@ def get_csrnet_engine():
                 scale_factor=0.5,
                 area_sqm=100.0,
                 use_cuda=True,  # Will fall back to CPU if not available
-                enable_smoothing=False  # Disable smoothing for API (single image)
+                backend="trt_fp16",  # ONNX Runtime + TensorRT FP16 (falls back to PyTorch)
+                enable_smoothing=False,  # Disable smoothing for API (single image)
+                return_density_map=False  # Only counts are returned
             )
             _csrnet_engine = CrowdDensityEngine(config)
             print("CSRNet engine loaded successfully")
@@ -84,13 +129,20 @@ def get_yolo_detector():
     global _yolo_detector
     if _yolo_detector is None:
         try:
-            from .yolo_detector import YOLOv8Detector, YOLO_AVAILABLE
+            from .yolo_detector import YOLOv8Detector, YOLO_AVAILABLE, default_engine_path
             if YOLO_AVAILABLE:
                 _yolo_detector = YOLOv8Detector(
                     model_size="s",  # Small model for better accuracy (stable detection)
-                    confidence_threshold=0.5  # Higher threshold reduces fluctuations
+                    confidence_threshold=0.5,  # Higher threshold reduces fluctuations
+                    engine_path=str(default_engine_path("s", "int8"))  # INT8 TensorRT if exported
                 )
                 print("YOLO detector loaded successfully (small model for stable detection)")
+                
+                # Never batch past what the TensorRT engine accepts
+                engine_batch = _yolo_detector.max_batch_size
+                if engine_batch is not None and engine_batch < _yolo_batcher.max_batch:
+                    print(f"YOLO engine batch size is {engine_batch}, capping request batches")
+                    _yolo_batcher.max_batch = engine_batch
             else:
                 print("YOLO not available (ultralytics not installed)")
                 _yolo_detector = "unavailable"
@@ -100,42 +152,208 @@ def get_yolo_detector():
     return _yolo_detector if _yolo_detector not in ["failed", "unavailable"] else None
 
 
-def decode_image(data_uri: str) -> np.ndarray:
-    """Decode base64 data URI to OpenCV image."""
+def warmup_models():
+    """
+    Load both models and run a dummy forward pass through each.
+    
+    Moves model loading and CUDA kernel selection out of the first
+    /analyze request.
+    """
     try:
-        # Remove data URI prefix if present
-        if "," in data_uri:
-            header, encoded = data_uri.split(",", 1)
-        else:
-            encoded = data_uri
+        import torch
+        if torch.cuda.is_available():
+            # TF32 matmul/conv on Ampere+ GPUs
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+    except ImportError:
+        pass
+    
+    dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+    
+    yolo = get_yolo_detector()
+    if yolo:
+        try:
+            yolo.detect(dummy)
+        except Exception as e:
+            print(f"YOLO warmup failed: {e}")
+    
+    csrnet = get_csrnet_engine()
+    if csrnet:
+        try:
+            csrnet.warmup(num_iterations=1)
+        except Exception as e:
+            print(f"CSRNet warmup failed: {e}")
+
+
+class DynamicBatcher:
+    """
+    Coalesce concurrent requests into a single batched inference call.
+    
+    Requests are queued and drained by a background task. A batch is
+    dispatched once it reaches max_batch frames or max_wait_ms has
+    passed since its first frame arrived. The batch runs in a worker
+    thread so the event loop keeps accepting requests meanwhile.
+    
+    Args:
+        process_batch: Callable taking a list of frames, returning one result per frame
+        max_batch: Maximum frames per batch
+        max_wait_ms: Maximum time to wait for a batch to fill
+    """
+    
+    def __init__(
+        self,
+        process_batch: Callable[[List[np.ndarray]], list],
+        max_batch: int = 16,
+        max_wait_ms: float = 20.0
+    ):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
         
-        # Decode base64
-        image_data = base64.b64decode(encoded)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def predict(self, frame: np.ndarray):
+        """Queue a frame and wait for its result."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._drain())
         
-        # Convert to PIL Image
-        image = Image.open(io.BytesIO(image_data))
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((frame, future))
+        return await future
+    
+    async def _drain(self):
+        """Background task collecting and dispatching batches."""
+        loop = asyncio.get_running_loop()
         
-        # Convert to RGB if necessary
-        if image.mode != "RGB":
-            image = image.convert("RGB")
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_s
+            
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            await self._process(batch)
+    
+    async def _process(self, batch: list):
+        """Run one batch and scatter results to the waiting futures."""
+        frames = [frame for frame, _ in batch]
         
-        # Convert to OpenCV format (BGR)
-        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self.process_batch, frames
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
         
-        return frame
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def _detect_yolo_batch(frames: List[np.ndarray]) -> list:
+    """Batched YOLO detection used by the request batcher."""
+    return get_yolo_detector().detect_batch(frames)
+
+
+_yolo_batcher = DynamicBatcher(_detect_yolo_batch, max_batch=16, max_wait_ms=20)
+
+
+def _decode_base64(data_uri: str) -> bytes:
+    """Decode the base64 payload of a data URI (prefix optional)."""
+    # Skip the data URI prefix via a zero-copy view (find() is -1 if absent)
+    raw = data_uri.encode("ascii")
+    return base64.b64decode(memoryview(raw)[raw.find(b",") + 1:])
+
+
+def _imdecode(image_data: bytes) -> np.ndarray:
+    """Decode JPEG/PNG bytes straight to a BGR array."""
+    frame = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Failed to decode image: unsupported or corrupt image data")
+    return frame
+
+
+def decode_image(data_uri: str) -> np.ndarray:
+    """Decode base64 data URI to OpenCV image."""
+    try:
+        image_data = _decode_base64(data_uri)
     except Exception as e:
         raise ValueError(f"Failed to decode image: {e}")
+    
+    return _imdecode(image_data)
+
+
+def decode_image_gpu(data_uri: str, device):
+    """
+    Decode a base64 data URI, using nvJPEG on the GPU for JPEG payloads.
+    
+    Returns:
+        RGB uint8 tensor [3, H, W] on device for JPEGs when torchvision
+        supports GPU decoding, otherwise a BGR ndarray as decode_image().
+    """
+    try:
+        image_data = _decode_base64(data_uri)
+    except Exception as e:
+        raise ValueError(f"Failed to decode image: {e}")
+    
+    if image_data[:2] == b"\xff\xd8":  # JPEG SOI marker
+        try:
+            import torch
+            from torchvision.io import ImageReadMode, decode_jpeg
+            
+            jpeg = torch.frombuffer(bytearray(image_data), dtype=torch.uint8)
+            return decode_jpeg(jpeg, mode=ImageReadMode.RGB, device=device)
+        except Exception:
+            pass  # No nvJPEG support, or a JPEG variant it rejects
+    
+    return _imdecode(image_data)
+
+
+def decode_request_image(data_uri: str):
+    """Decode an upload on the GPU when YOLO preprocesses there, else on the CPU."""
+    yolo = get_yolo_detector()
+    device = yolo.gpu_preprocess_device if yolo else None
+    if device is not None:
+        return decode_image_gpu(data_uri, device)
+    return decode_image(data_uri)
+
+
+def to_bgr_array(frame) -> np.ndarray:
+    """Convert a GPU-decoded RGB tensor [3, H, W] back to a BGR ndarray."""
+    if isinstance(frame, np.ndarray):
+        return frame
+    return np.ascontiguousarray(frame.flip(0).permute(1, 2, 0).cpu().numpy())
+
+
+def classify_density_level(density_per_sqm: float) -> str:
+    """Classify people/sqm into LOW/MEDIUM/HIGH/CRITICAL."""
+    # Clamp before int(): inf (e.g. a zero-area zone) would overflow, and
+    # NaN fails the > 0 test so it maps to the lowest level
+    scaled = density_per_sqm * DENSITY_LUT_SCALE
+    index = int(min(scaled, 255.0)) if scaled > 0 else 0
+    return DENSITY_LEVEL_LUT[index]
+
+
+def classify_density_levels(densities_per_sqm: np.ndarray) -> np.ndarray:
+    """Vectorized classify_density_level for many regions at once."""
+    indices = np.clip(np.asarray(densities_per_sqm) * DENSITY_LUT_SCALE, 0, 255).astype(np.intp)
+    return _DENSITY_LEVEL_LUT_NP[indices]
 
 
 def classify_risk_level(density_level: str) -> str:
     """Map density level to risk level for frontend."""
-    mapping = {
-        "LOW": "Low",
-        "MEDIUM": "Medium",
-        "HIGH": "High",
-        "CRITICAL": "High"  # Map critical to High for frontend compatibility
-    }
-    return mapping.get(density_level, "Medium")
+    return RISK_LEVELS.get(density_level, "Medium")
 
 
 def generate_analysis(crowd_count: int, density_level: str, density_per_sqm: float) -> str:
@@ -172,20 +390,21 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.post("/analyze", response_model=AnalyzeResponse)
+@app.post("/analyze", response_model=None)
 async def analyze_crowd(request: AnalyzeRequest):
     """
     Analyze crowd density from an image.
     
     Accepts a base64 encoded image and returns crowd count, risk level, and analysis.
     Uses YOLO as primary detector (better for individual detection),
-    with CSRNet for dense crowd estimation.
+    with CSRNet for dense crowd estimation. Concurrent YOLO requests are
+    batched into a single forward pass.
     """
     start_time = time.perf_counter()
     
-    # Decode image
+    # Decode image in a worker thread so the event loop stays responsive
     try:
-        frame = decode_image(request.photoDataUri)
+        frame = await anyio.to_thread.run_sync(decode_request_image, request.photoDataUri)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -199,22 +418,14 @@ async def analyze_crowd(request: AnalyzeRequest):
     yolo = get_yolo_detector()
     if yolo:
         try:
-            result = yolo.detect(frame)
+            result = await _yolo_batcher.predict(frame)
             crowd_count = result.person_count
             processing_time_ms = result.processing_time_ms
             detection_method = "yolo"
             
             # Calculate density and classify
             density_per_sqm = crowd_count / request.area_sqm if request.area_sqm > 0 else 0
-            
-            if density_per_sqm < 0.5:
-                density_level = "LOW"
-            elif density_per_sqm < 1.5:
-                density_level = "MEDIUM"
-            elif density_per_sqm < 3.0:
-                density_level = "HIGH"
-            else:
-                density_level = "CRITICAL"
+            density_level = classify_density_level(density_per_sqm)
         except Exception as e:
             print(f"YOLO detection failed: {e}")
             yolo = None
@@ -224,7 +435,7 @@ async def analyze_crowd(request: AnalyzeRequest):
         csrnet = get_csrnet_engine()
         if csrnet:
             try:
-                result = csrnet.process(frame, area_sqm=request.area_sqm)
+                result = csrnet.process(to_bgr_array(frame), area_sqm=request.area_sqm)
                 # Ensure non-negative values
                 crowd_count = max(0, int(round(result.crowd_count)))
                 density_level = result.density_level
@@ -248,13 +459,13 @@ async def analyze_crowd(request: AnalyzeRequest):
     risk_level = classify_risk_level(density_level)
     analysis = generate_analysis(crowd_count, density_level, density_per_sqm)
     
-    return AnalyzeResponse(
-        crowdCount=max(0, crowd_count),  # Ensure non-negative
+    return ORJSONResponse(AnalyzeResponse(
+        crowdCount=max(0, int(crowd_count)),  # Ensure non-negative
         riskLevel=risk_level,
         analysis=analysis,
-        densityPerSqm=max(0.0, round(density_per_sqm, 2)),
+        densityPerSqm=max(0.0, round(float(density_per_sqm), 2)),
         processingTimeMs=round(total_time, 1)
-    )
+    ))
 
 
 @app.post("/analyze/yolo")
@@ -268,27 +479,19 @@ async def analyze_with_yolo(request: AnalyzeRequest):
         )
     
     try:
-        frame = decode_image(request.photoDataUri)
-        result = yolo.detect(frame)
+        frame = await anyio.to_thread.run_sync(decode_request_image, request.photoDataUri)
+        result = await _yolo_batcher.predict(frame)
         
         density_per_sqm = result.person_count / request.area_sqm if request.area_sqm > 0 else 0
+        density_level = classify_density_level(density_per_sqm)
         
-        if density_per_sqm < 0.5:
-            density_level = "LOW"
-        elif density_per_sqm < 1.5:
-            density_level = "MEDIUM"
-        elif density_per_sqm < 3.0:
-            density_level = "HIGH"
-        else:
-            density_level = "CRITICAL"
-        
-        return AnalyzeResponse(
+        return ORJSONResponse(AnalyzeResponse(
             crowdCount=result.person_count,
             riskLevel=classify_risk_level(density_level),
             analysis=generate_analysis(result.person_count, density_level, density_per_sqm),
-            densityPerSqm=round(density_per_sqm, 2),
+            densityPerSqm=round(float(density_per_sqm), 2),
             processingTimeMs=round(result.processing_time_ms, 1)
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -298,13 +501,24 @@ async def analyze_with_yolo(request: AnalyzeRequest):
 def main():
     """Run the API server."""
     import uvicorn
-    print("Starting Crowd Density API Server...")
+    workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+    print(f"Starting Crowd Density API Server ({workers} workers)...")
     print("=" * 60)
     print("Endpoints:")
     print("  GET  /         - Health check and model status")
     print("  POST /analyze  - Analyze crowd density from image")
     print("=" * 60)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # "auto" picks uvloop/httptools when installed (uvicorn[standard]),
+    # and falls back to asyncio/h11 on platforms without them (Windows)
+    uvicorn.run(
+        "crowd_ai.api_server:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=workers,
+        loop="auto",
+        http="auto",
+        access_log=False
+    )
 
 
 if __name__ == "__main__":
@@ -9,6 +9,7 @@ from .camera_calibration import (
     CalibrationPoint,
     calibrate_from_reference,
     estimate_area_from_height,
+    estimate_area_batch,
     get_preset_calibration,
     CALIBRATION_PRESETS
 )
@@ -18,6 +19,7 @@ __all__ = [
     "CalibrationPoint",
     "calibrate_from_reference",
     "estimate_area_from_height",
+    "estimate_area_batch",
     "get_preset_calibration",
     "CALIBRATION_PRESETS"
 ]
@@ -13,13 +13,21 @@ Calibration Methods:
 """
 
 import json
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+from functools import cached_property, lru_cache
 from typing import List, Optional, Tuple, Dict
 from pathlib import Path
 import math
 
+import cv2
 import numpy as np
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 
 @dataclass
 class CalibrationPoint:
@@ -68,7 +76,7 @@ class CameraCalibration:
         )
         
         # Calculate density
-        pixels_per_sqm = calib.get_pixels_per_sqm()
+        pixels_per_sqm = calib.pixels_per_sqm
         ```
     """
     camera_id: str
@@ -92,12 +100,15 @@ class CameraCalibration:
         if self.calibration_points is None:
             self.calibration_points = []
     
-    @property
+    # Derived values below are cached on first access; frame size and
+    # area are treated as fixed once the calibration is constructed.
+    
+    @cached_property
     def frame_area_pixels(self) -> int:
         """Total frame area in pixels."""
         return self.frame_width * self.frame_height
     
-    @property
+    @cached_property
     def pixels_per_sqm(self) -> float:
         """
         Average pixels per square meter.
@@ -109,13 +120,21 @@ class CameraCalibration:
             return 0.0
         return self.frame_area_pixels / self.total_area_sqm
     
-    @property
+    @cached_property
     def sqm_per_pixel(self) -> float:
         """Square meters per pixel."""
         if self.frame_area_pixels <= 0:
             return 0.0
         return self.total_area_sqm / self.frame_area_pixels
     
+    @cached_property
+    def _linear_world_scale(self) -> np.ndarray:
+        """Meters per pixel (x, y) for the linear pixel-to-world fallback."""
+        # Assumes rectangular area with origin at top-left
+        width_m = math.sqrt(self.total_area_sqm * self.frame_width / self.frame_height)
+        height_m = self.total_area_sqm / width_m
+        return np.array([width_m / self.frame_width, height_m / self.frame_height])
+    
     def get_density_map_area(
         self,
         density_map_shape: Tuple[int, int]
@@ -140,6 +159,25 @@ class CameraCalibration:
         
         return self.total_area_sqm / num_cells
     
+    def region_counts(
+        self,
+        density_map: np.ndarray,
+        masks: np.ndarray
+    ) -> np.ndarray:
+        """
+        Sum the density map over several regions in one pass.
+        
+        Args:
+            density_map: Density map [H, W]
+            masks: Region masks [R, H, W] (bool or float weights)
+            
+        Returns:
+            Array of R people counts, one per region
+        """
+        num_regions = masks.shape[0]
+        flat_masks = masks.reshape(num_regions, -1).astype(np.float32, copy=False)
+        return flat_masks @ density_map.reshape(-1).astype(np.float32, copy=False)
+    
     def pixel_to_world(
         self,
         pixel_x: int,
@@ -158,22 +196,32 @@ class CameraCalibration:
         Returns:
             Tuple of (world_x, world_y) in meters
         """
-        if self._transform_matrix is not None:
-            # Use perspective transform if available
-            point = np.array([[[pixel_x, pixel_y]]], dtype=np.float32)
-            import cv2
-            transformed = cv2.perspectiveTransform(point, self._transform_matrix)
-            return float(transformed[0, 0, 0]), float(transformed[0, 0, 1])
+        world = self.pixels_to_world_batch(np.array([[pixel_x, pixel_y]], dtype=np.float64))
+        return float(world[0, 0]), float(world[0, 1])
+    
+    def pixels_to_world_batch(self, points: np.ndarray) -> np.ndarray:
+        """
+        Convert many pixel coordinates to world coordinates at once.
         
-        # Simple linear mapping as fallback
-        # Assumes rectangular area with origin at top-left
-        width_m = math.sqrt(self.total_area_sqm * self.frame_width / self.frame_height)
-        height_m = self.total_area_sqm / width_m
+        Applies the perspective matrix (if computed) with one matrix
+        multiply and homogeneous divide, otherwise the linear mapping.
+        
+        Args:
+            points: Array of pixel coordinates [N, 2] as (x, y)
+            
+        Returns:
+            Array of world coordinates [N, 2] in meters
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
         
-        world_x = (pixel_x / self.frame_width) * width_m
-        world_y = (pixel_y / self.frame_height) * height_m
+        if self._transform_matrix is not None:
+            # Homogeneous coordinates: [x, y, 1] @ H^T, then divide by w
+            H = self._transform_matrix
+            projected = points @ H[:, :2].T + H[:, 2]
+            return projected[:, :2] / projected[:, 2:3]
         
-        return world_x, world_y
+        # Simple linear mapping as fallback
+        return points * self._linear_world_scale
     
     def compute_perspective_transform(self):
         """
@@ -185,8 +233,6 @@ class CameraCalibration:
             print("Warning: Need at least 4 calibration points for perspective transform")
             return
         
-        import cv2
-        
         # Extract pixel and world coordinates
         src_points = np.array([
             [p.pixel_x, p.pixel_y] for p in self.calibration_points[:4]
@@ -210,20 +256,34 @@ class CameraCalibration:
             "camera_height_m": self.camera_height_m,
             "camera_tilt_deg": self.camera_tilt_deg,
             "camera_fov_deg": self.camera_fov_deg,
-            "calibration_points": [asdict(p) for p in self.calibration_points]
+            "calibration_points": [
+                {
+                    "pixel_x": p.pixel_x,
+                    "pixel_y": p.pixel_y,
+                    "world_x": p.world_x,
+                    "world_y": p.world_y,
+                    "label": p.label
+                }
+                for p in self.calibration_points
+            ]
         }
         
         Path(filepath).parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        if ORJSON_AVAILABLE:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
         
         print(f"Calibration saved to {filepath}")
     
     @classmethod
     def load(cls, filepath: str) -> "CameraCalibration":
         """Load calibration from JSON file."""
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            raw = f.read()
+        data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
         
         calib_points = [
             CalibrationPoint(**p) for p in data.get("calibration_points", [])
@@ -299,6 +359,14 @@ def calibrate_from_reference(
     )
 
 
+@lru_cache(maxsize=64)
+def _fov_constants(horizontal_fov_deg: float, aspect_ratio: float) -> Tuple[float, float]:
+    """Get (tan(h_fov / 2), v_fov_rad) for a lens and frame aspect ratio."""
+    tan_half_h_fov = math.tan(math.radians(horizontal_fov_deg) / 2)
+    v_fov_rad = 2 * math.atan(tan_half_h_fov / aspect_ratio)
+    return tan_half_h_fov, v_fov_rad
+
+
 def estimate_area_from_height(
     frame_width: int,
     frame_height: int,
@@ -344,11 +412,9 @@ def estimate_area_from_height(
     """
     # Convert to radians
     tilt_rad = math.radians(camera_tilt_deg)
-    h_fov_rad = math.radians(horizontal_fov_deg)
     
-    # Vertical FOV (assuming 16:9 aspect ratio)
-    aspect_ratio = frame_width / frame_height
-    v_fov_rad = 2 * math.atan(math.tan(h_fov_rad / 2) / aspect_ratio)
+    # Half-FOV tangent and vertical FOV from the frame aspect ratio
+    tan_half_h_fov, v_fov_rad = _fov_constants(horizontal_fov_deg, frame_width / frame_height)
     
     # Calculate ground distance to center of view
     if tilt_rad != math.pi / 2:  # Not straight down
@@ -372,7 +438,7 @@ def estimate_area_from_height(
     
     # Calculate average width at center distance
     avg_distance = (near_distance + far_distance) / 2
-    width = 2 * avg_distance * math.tan(h_fov_rad / 2)
+    width = 2 * avg_distance * tan_half_h_fov
     
     # Calculate depth
     depth = far_distance - near_distance
@@ -395,6 +461,48 @@ def estimate_area_from_height(
     )
 
 
+def estimate_area_batch(
+    frame_widths: np.ndarray,
+    frame_heights: np.ndarray,
+    camera_heights_m: np.ndarray,
+    camera_tilts_deg: np.ndarray,
+    horizontal_fovs_deg: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized estimate_area_from_height() for many cameras at once.
+    
+    All arguments are broadcast against each other, so scalars can be
+    mixed with per-camera arrays.
+    
+    Returns:
+        Array of estimated areas in square meters
+    """
+    widths, heights, cam_h, tilt_deg, fov_deg = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (
+            frame_widths, frame_heights, camera_heights_m,
+            camera_tilts_deg, horizontal_fovs_deg
+        ))
+    )
+    
+    tilt_rad = np.radians(tilt_deg)
+    tan_half_h_fov = np.tan(np.radians(fov_deg) / 2)
+    v_fov_rad = 2 * np.arctan(tan_half_h_fov / (widths / heights))
+    
+    near_angle = tilt_rad + v_fov_rad / 2
+    far_angle = tilt_rad - v_fov_rad / 2
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        center_distance = np.where(tilt_rad != math.pi / 2, cam_h / np.tan(tilt_rad), 0.0)
+        near_distance = np.where(near_angle < math.pi / 2, cam_h / np.tan(near_angle), 0.0)
+        far_distance = np.where(far_angle > 0, cam_h / np.tan(far_angle), center_distance * 3)
+    
+    avg_distance = (near_distance + far_distance) / 2
+    width = 2 * avg_distance * tan_half_h_fov
+    depth = far_distance - near_distance
+    
+    return np.clip(width * depth, 1.0, 10000.0)
+
+
 # Preset calibrations for common scenarios
 CALIBRATION_PRESETS: Dict[str, dict] = {
     "laptop_webcam_desk": {
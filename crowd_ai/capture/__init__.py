@@ -13,7 +13,8 @@ from .video_source import (
     FrameMetadata,
     create_video_source
 )
-from .frame_buffer import FrameBuffer
+from .frame_buffer import FrameBuffer, LatestFrameStore, iter_frame_batches
+from .frame_pool import FrameMemoryPool, get_frame_pool, hold_until
 from .multi_camera import MultiCameraManager, CameraConfig
 
 __all__ = [
@@ -24,6 +25,11 @@ __all__ = [
     "FrameMetadata",
     "create_video_source",
     "FrameBuffer",
+    "LatestFrameStore",
+    "iter_frame_batches",
+    "FrameMemoryPool",
+    "get_frame_pool",
+    "hold_until",
     "MultiCameraManager",
     "CameraConfig"
 ]
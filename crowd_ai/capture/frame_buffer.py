@@ -6,15 +6,14 @@ Thread-safe frame buffering for async processing.
 
 import threading
 import time
-from collections import deque
 from dataclasses import dataclass
-from typing import Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import numpy as np
 
-from .video_source import FrameMetadata
+from .video_source import FrameMetadata, VideoSource
 
 
-@dataclass
+@dataclass(slots=True)
 class BufferedFrame:
     """A frame with its associated metadata in the buffer."""
     frame: np.ndarray
@@ -23,7 +22,13 @@ class BufferedFrame:
 
 class FrameBuffer:
     """
-    Thread-safe circular buffer for video frames.
+    Lock-free single-producer/single-consumer ring buffer for video frames.
+    
+    Frames are stored in a dict keyed by sequence number. The producer
+    only advances ``_tail`` and the consumer only advances ``_head``;
+    ownership of each frame is handed over with ``dict.pop``, which is
+    atomic under the GIL, so a frame is either consumed or evicted
+    (and recycled) - never both.
     
     Useful for:
     - Decoupling capture from processing
@@ -33,19 +38,33 @@ class FrameBuffer:
     Args:
         max_size: Maximum number of frames to buffer
         drop_old: If True, drops oldest frames when full
+        recycle: Optional callback receiving frames that are dropped
+                 without being consumed (e.g. VideoSource.release_frame)
     """
     
-    def __init__(self, max_size: int = 10, drop_old: bool = True):
+    def __init__(
+        self,
+        max_size: int = 10,
+        drop_old: bool = True,
+        recycle: Optional[Callable[[np.ndarray], None]] = None
+    ):
         self.max_size = max_size
         self.drop_old = drop_old
+        self.recycle = recycle
+        
+        self._slots: Dict[int, BufferedFrame] = {}
+        self._head = 0  # next sequence to consume (consumer-owned)
+        self._tail = 0  # next sequence to write (producer-owned)
         
-        self._buffer: deque = deque(maxlen=max_size if drop_old else None)
-        self._lock = threading.Lock()
-        self._not_empty = threading.Condition(self._lock)
-        self._not_full = threading.Condition(self._lock)
+        # Wakeup for blocking get(); the data itself is never locked
+        self._data_ready = threading.Event()
+        # Only used by put() when drop_old is False
+        self._space_ready = threading.Event()
         
-        self._frames_added = 0
-        self._frames_dropped = 0
+        # Frames added is just _tail; the drop counters are kept
+        # separate so each is written by a single thread
+        self._dropped_on_put = 0
+        self._dropped_on_read = 0
     
     def put(
         self, 
@@ -64,26 +83,49 @@ class FrameBuffer:
         Returns:
             True if frame was added, False if timed out
         """
-        with self._not_full:
-            if not self.drop_old:
-                # Wait for space if not dropping old frames
-                end_time = None if timeout is None else time.time() + timeout
-                
-                while len(self._buffer) >= self.max_size:
-                    remaining = None if end_time is None else end_time - time.time()
-                    if remaining is not None and remaining <= 0:
-                        return False
-                    self._not_full.wait(remaining)
-            
-            # Check if we need to drop oldest
-            if self.drop_old and len(self._buffer) >= self.max_size:
-                self._frames_dropped += 1
-            
-            self._buffer.append(BufferedFrame(frame=frame, metadata=metadata))
-            self._frames_added += 1
+        seq = self._tail
+        
+        if self.drop_old:
+            # Evict the oldest slot; whoever pops it owns the frame
+            dropped = self._slots.pop(seq - self.max_size, None)
+            if dropped is not None:
+                self._dropped_on_put += 1
+                if self.recycle is not None:
+                    self.recycle(dropped.frame)
+        else:
+            # Wait for the consumer to free a slot
+            end_time = None if timeout is None else time.monotonic() + timeout
             
-            self._not_empty.notify()
-            return True
+            while len(self._slots) >= self.max_size:
+                remaining = None if end_time is None else end_time - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._space_ready.wait(remaining)
+                self._space_ready.clear()
+        
+        self._slots[seq] = BufferedFrame(frame=frame, metadata=metadata)
+        self._tail = seq + 1
+        
+        self._data_ready.set()
+        return True
+    
+    def _pop_oldest(self) -> Optional[BufferedFrame]:
+        """Take the oldest unconsumed frame, skipping evicted slots."""
+        tail = self._tail
+        # Anything older than the last max_size sequences was already
+        # evicted by put(); don't walk gaps left while the consumer idled
+        head = max(self._head, tail - self.max_size)
+        
+        while head < tail:
+            buffered = self._slots.pop(head, None)
+            head += 1
+            if buffered is not None:
+                self._head = head
+                self._space_ready.set()
+                return buffered
+        
+        self._head = head
+        return None
     
     def get(
         self, 
@@ -98,20 +140,21 @@ class FrameBuffer:
         Returns:
             Tuple of (frame, metadata) or None if timed out
         """
-        with self._not_empty:
-            end_time = None if timeout is None else time.time() + timeout
-            
-            while len(self._buffer) == 0:
-                remaining = None if end_time is None else end_time - time.time()
-                if remaining is not None and remaining <= 0:
-                    return None
-                if not self._not_empty.wait(remaining):
-                    return None
-            
-            buffered = self._buffer.popleft()
-            self._not_full.notify()
+        end_time = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            # Always re-check the slots after waking: the event may be
+            # stale (set for a frame we already took) or the timeout may
+            # race with a put.
+            buffered = self._pop_oldest()
+            if buffered is not None:
+                return buffered.frame, buffered.metadata
             
-            return buffered.frame, buffered.metadata
+            remaining = None if end_time is None else end_time - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            self._data_ready.wait(remaining)
+            self._data_ready.clear()
     
     def get_latest(self) -> Optional[Tuple[np.ndarray, FrameMetadata]]:
         """
@@ -120,28 +163,48 @@ class FrameBuffer:
         Returns:
             Tuple of (frame, metadata) or None if buffer is empty
         """
-        with self._lock:
-            if len(self._buffer) == 0:
-                return None
-            
-            # Get latest and clear older frames
-            buffered = self._buffer[-1]
-            dropped = len(self._buffer) - 1
-            self._buffer.clear()
-            self._frames_dropped += dropped
-            
-            return buffered.frame, buffered.metadata
+        tail = self._tail
+        head = max(self._head, tail - self.max_size)
+        
+        buffered = None
+        while tail > head:
+            buffered = self._slots.pop(tail - 1, None)
+            if buffered is not None:
+                break
+            # Evicted by a fast producer between reads; retry on the new tail
+            tail = self._tail
+            head = max(head, tail - self.max_size)
+        
+        if buffered is None:
+            return None
+        
+        # Drop everything older than the frame we took
+        for seq in range(head, tail - 1):
+            old = self._slots.pop(seq, None)
+            if old is not None:
+                self._dropped_on_read += 1
+                if self.recycle is not None:
+                    self.recycle(old.frame)
+        
+        self._head = tail
+        self._space_ready.set()
+        
+        return buffered.frame, buffered.metadata
     
     def clear(self):
-        """Clear all frames from the buffer."""
-        with self._lock:
-            self._buffer.clear()
+        """Clear all frames from the buffer, recycling the dropped frames."""
+        tail = self._tail
+        for seq in range(max(self._head, tail - self.max_size), tail):
+            old = self._slots.pop(seq, None)
+            if old is not None and self.recycle is not None:
+                self.recycle(old.frame)
+        self._head = tail
+        self._space_ready.set()
     
     @property
     def size(self) -> int:
         """Current number of frames in buffer."""
-        with self._lock:
-            return len(self._buffer)
+        return len(self._slots)
     
     @property
     def is_empty(self) -> bool:
@@ -156,11 +219,148 @@ class FrameBuffer:
     @property
     def stats(self) -> dict:
         """Get buffer statistics."""
-        with self._lock:
-            return {
-                "current_size": len(self._buffer),
-                "max_size": self.max_size,
-                "frames_added": self._frames_added,
-                "frames_dropped": self._frames_dropped,
-                "drop_rate": self._frames_dropped / max(1, self._frames_added)
-            }
+        frames_added = self._tail
+        frames_dropped = self._dropped_on_put + self._dropped_on_read
+        return {
+            "current_size": len(self._slots),
+            "max_size": self.max_size,
+            "frames_added": frames_added,
+            "frames_dropped": frames_dropped,
+            "drop_rate": frames_dropped / max(1, frames_added)
+        }
+
+
+class LatestFrameStore:
+    """
+    One-slot-per-camera store of the newest frame, with a single wakeup.
+    
+    Capture threads push into it directly (see
+    MultiCameraManager.set_frame_callback); the consumer blocks in
+    wait() until any camera has a new frame and then takes the newest
+    frame of every camera in one sweep, instead of polling each buffer.
+    
+    Args:
+        recycle: Optional callback receiving frames that are replaced
+                 before being consumed (e.g. FrameMemoryPool.release)
+    """
+    
+    def __init__(self, recycle: Optional[Callable[[np.ndarray], None]] = None):
+        self.recycle = recycle
+        self._slots: Dict[str, BufferedFrame] = {}
+        self._data_ready = threading.Event()
+    
+    def put(self, source_id: str, frame: np.ndarray, metadata: FrameMetadata):
+        """Store the newest frame for a camera, replacing any unconsumed one."""
+        # Whoever pops the previous frame owns it (consumer or us)
+        old = self._slots.pop(source_id, None)
+        self._slots[source_id] = BufferedFrame(frame=frame, metadata=metadata)
+        self._data_ready.set()
+        
+        if old is not None and self.recycle is not None:
+            self.recycle(old.frame)
+    
+    def take_all(self) -> Dict[str, Tuple[np.ndarray, FrameMetadata]]:
+        """Take the newest unconsumed frame of every camera without blocking."""
+        frames = {}
+        for source_id in list(self._slots):
+            buffered = self._slots.pop(source_id, None)
+            if buffered is not None:
+                frames[source_id] = (buffered.frame, buffered.metadata)
+        return frames
+    
+    def wait(
+        self,
+        timeout: Optional[float] = None
+    ) -> Dict[str, Tuple[np.ndarray, FrameMetadata]]:
+        """
+        Block until at least one camera has a new frame, then take all.
+        
+        Args:
+            timeout: Max time to wait (None = block forever)
+            
+        Returns:
+            Dict of source_id -> (frame, metadata); empty if timed out
+        """
+        end_time = None if timeout is None else time.monotonic() + timeout
+        
+        while True:
+            frames = self.take_all()
+            if frames:
+                return frames
+            
+            remaining = None if end_time is None else end_time - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return frames
+            self._data_ready.wait(remaining)
+            self._data_ready.clear()
+
+
+def iter_frame_batches(
+    source: VideoSource,
+    max_batch: int,
+    drop_old: bool = True,
+    buffer_size: Optional[int] = None,
+    target_fps: Optional[float] = None
+) -> Iterator[List[Tuple[np.ndarray, FrameMetadata]]]:
+    """
+    Read a source on a background thread and yield frames in batches.
+    
+    Decoding overlaps with whatever the caller does between batches
+    (e.g. inference). Each batch holds every frame buffered at that
+    point, up to max_batch, so batches only grow when the caller falls
+    behind capture and latency stays at one frame otherwise.
+    
+    Args:
+        source: Opened video source
+        max_batch: Maximum frames per batch
+        drop_old: Drop the oldest buffered frames when the caller falls
+                  behind (live cameras); False blocks capture instead
+                  so no frame is skipped (video files)
+        buffer_size: Frames buffered between threads (default 2 * max_batch)
+        target_fps: Passed to source.frames() to skip frames before decoding
+        
+    Yields:
+        Lists of (frame, metadata), oldest first; the caller releases
+        each frame with source.release_frame() when done with it
+    """
+    buffer = FrameBuffer(
+        max_size=buffer_size or 2 * max_batch,
+        drop_old=drop_old,
+        recycle=source.release_frame
+    )
+    stop = threading.Event()
+    done = threading.Event()
+    
+    def capture():
+        try:
+            for frame, metadata in source.frames(target_fps=target_fps):
+                while not buffer.put(frame, metadata, timeout=0.1):
+                    if stop.is_set():
+                        source.release_frame(frame)
+                        return
+                if stop.is_set():
+                    return
+        finally:
+            done.set()
+    
+    thread = threading.Thread(target=capture, daemon=True)
+    thread.start()
+    
+    try:
+        while True:
+            item = buffer.get(timeout=0.1)
+            if item is None:
+                if done.is_set() and buffer.is_empty:
+                    return
+                continue
+            
+            batch = [item]
+            while len(batch) < max_batch:
+                item = buffer.get(timeout=0)
+                if item is None:
+                    break
+                batch.append(item)
+            yield batch
+    finally:
+        stop.set()
+        thread.join(timeout=2.0)
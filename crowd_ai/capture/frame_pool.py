@@ -0,0 +1,223 @@
+"""
+Frame Memory Pool
+=================
+Process-wide pool of reusable uint8 frame buffers.
+
+Buffers are bucketed by byte size rounded up to the next power of two
+(buddy style), so cameras whose resolution drifts slightly, or several
+cameras at similar resolutions, share the same backing allocations.
+Each acquired frame is a contiguous view over the front of a bucket
+buffer, which lets cv2.VideoCapture.read() decode straight into it.
+
+When CUDA is available the buffers are allocated in pinned (page-locked)
+host memory. GPU consumers (CSRNet engine/transform, YOLO preprocessing)
+upload such frames directly with a non_blocking copy instead of going
+through their own pinned staging buffers, and register the copy with
+hold_until() so a released frame is not reused before the copy is done.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Backing buffers with an asynchronous device copy still reading them:
+# id(backing) -> (backing, event). Shared by all pools.
+_in_flight: Dict[int, tuple] = {}
+_in_flight_lock = threading.Lock()
+
+# Completed entries are pruned once this many are tracked
+_MAX_IN_FLIGHT = 64
+
+
+def _backing(frame: np.ndarray) -> np.ndarray:
+    """Outermost ndarray a frame view was sliced from."""
+    backing = frame
+    while isinstance(backing.base, np.ndarray):
+        backing = backing.base
+    return backing
+
+
+def hold_until(frame: np.ndarray, event):
+    """
+    Keep a frame's buffer out of the pool until event has completed.
+
+    Call after queuing a non_blocking copy that reads from frame; a
+    later release() of the frame defers pooling until event.query()
+    is True.
+
+    Args:
+        frame: Frame (or view of a pooled buffer) being read asynchronously
+        event: Object with query() -> bool, e.g. a torch.cuda.Event
+    """
+    backing = _backing(frame)
+    with _in_flight_lock:
+        if len(_in_flight) >= _MAX_IN_FLIGHT:
+            # Frames that are never released must not pin their buffers here
+            for key, (_, pending) in list(_in_flight.items()):
+                if pending.query():
+                    del _in_flight[key]
+        _in_flight[id(backing)] = (backing, event)
+
+
+def _pop_in_flight(backing: np.ndarray):
+    """Event still pending on backing, or None (and forget it either way)."""
+    with _in_flight_lock:
+        entry = _in_flight.pop(id(backing), None)
+    if entry is None or entry[1].query():
+        return None
+    return entry[1]
+
+
+def _bucket_size(nbytes: int) -> int:
+    """Round a byte count up to the next power of two."""
+    return 1 << max(nbytes - 1, 0).bit_length()
+
+
+class FrameMemoryPool:
+    """
+    Reusable ndarray pool for captured frames.
+
+    Args:
+        max_per_bucket: Maximum free buffers kept per size bucket
+        maximum_bytes: Cap on the total bytes held by free buffers
+        pinned: Allocate page-locked host memory (None = auto, when
+                torch with CUDA is available)
+    """
+
+    def __init__(
+        self,
+        max_per_bucket: int = 16,
+        maximum_bytes: int = 512 * 1024 * 1024,
+        pinned: Optional[bool] = None
+    ):
+        self.max_per_bucket = max_per_bucket
+        self.maximum_bytes = maximum_bytes
+        self.pinned = pinned
+
+        self._pools: Dict[int, deque] = {}
+        self._pooled_bytes = 0
+        self._lock = threading.Lock()
+
+        # Released buffers whose device copy had not finished: (backing, event)
+        self._deferred: List[tuple] = []
+
+        self._hits = 0
+        self._misses = 0
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Get a uint8 array of the given shape, reusing a pooled buffer
+        when one is free.
+
+        The contents are undefined; callers are expected to overwrite it.
+        """
+        nbytes = int(np.prod(shape))
+        bucket = _bucket_size(nbytes)
+
+        with self._lock:
+            if self._deferred:
+                self._pool_finished_locked()
+            pool = self._pools.get(bucket)
+            if pool:
+                backing = pool.pop()
+                self._pooled_bytes -= bucket
+                self._hits += 1
+            else:
+                backing = None
+                self._misses += 1
+
+        if backing is None:
+            backing = self._allocate(bucket)
+
+        return backing[:nbytes].reshape(shape)
+
+    def _allocate(self, nbytes: int) -> np.ndarray:
+        """Allocate a new backing buffer, pinned if enabled."""
+        if self.pinned is None:
+            # Resolved lazily so importing the capture module never
+            # pulls in torch
+            try:
+                import torch
+                self.pinned = torch.cuda.is_available()
+            except ImportError:
+                self.pinned = False
+
+        if self.pinned:
+            import torch
+            # The ndarray keeps the pinned tensor alive through .base
+            return torch.empty(nbytes, dtype=torch.uint8, pin_memory=True).numpy()
+
+        return np.empty(nbytes, dtype=np.uint8)
+
+    def release(self, frame: np.ndarray):
+        """
+        Return a frame to the pool.
+
+        Only release frames nothing else references any more; the buffer
+        will be handed out and overwritten by a later acquire(). Buffers
+        registered with hold_until() are pooled once their copy is done.
+        Frames not created by acquire() are pooled too if their backing
+        buffer is a power-of-two sized uint8 array.
+        """
+        backing = _backing(frame)
+
+        bucket = backing.nbytes
+        if backing.dtype != np.uint8 or backing.ndim != 1 or bucket != _bucket_size(bucket):
+            return
+
+        pending = _pop_in_flight(backing) if _in_flight else None
+        with self._lock:
+            if pending is not None:
+                self._deferred.append((backing, pending))
+                return
+            self._pool_locked(backing)
+
+    def _pool_locked(self, backing: np.ndarray):
+        """Add a backing buffer to its bucket if within limits (lock held)."""
+        bucket = backing.nbytes
+        if self._pooled_bytes + bucket > self.maximum_bytes:
+            return
+        pool = self._pools.setdefault(bucket, deque())
+        if len(pool) < self.max_per_bucket:
+            pool.append(backing)
+            self._pooled_bytes += bucket
+
+    def _pool_finished_locked(self):
+        """Move deferred buffers whose device copies have completed into the pool."""
+        still_pending = []
+        for backing, event in self._deferred:
+            if event.query():
+                self._pool_locked(backing)
+            else:
+                still_pending.append((backing, event))
+        self._deferred = still_pending
+
+    def clear(self):
+        """Drop all pooled buffers."""
+        with self._lock:
+            self._pools.clear()
+            self._pooled_bytes = 0
+            self._deferred = []
+
+    @property
+    def stats(self) -> dict:
+        """Get pool statistics."""
+        with self._lock:
+            return {
+                "pooled_buffers": sum(len(p) for p in self._pools.values()),
+                "pooled_bytes": self._pooled_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / max(1, self._hits + self._misses)
+            }
+
+
+_default_pool = FrameMemoryPool()
+
+
+def get_frame_pool() -> FrameMemoryPool:
+    """Get the process-wide frame pool shared by all video sources."""
+    return _default_pool
@@ -6,12 +6,15 @@ Manages multiple video sources for area-wise crowd monitoring.
 
 import threading
 import time
+from collections import deque
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Callable, Tuple
+import cv2
 import numpy as np
 
 from .video_source import VideoSource, FrameMetadata, create_video_source
-from .frame_buffer import FrameBuffer
+from .frame_buffer import FrameBuffer, LatestFrameStore
+from .frame_pool import get_frame_pool
 
 
 @dataclass
@@ -36,25 +39,102 @@ class CameraStatus:
     errors: int
 
 
+class CameraStatusTable:
+    """
+    Structure-of-arrays status storage for a set of cameras.
+    
+    Workers write their counters in place at their slot index (single
+    element stores, one writer per slot), so polling status never
+    allocates per camera and aggregates can be computed vectorized.
+    
+    Args:
+        num_cameras: Number of camera slots
+    """
+    
+    def __init__(self, num_cameras: int):
+        self.is_connected = np.zeros(num_cameras, dtype=bool)
+        self.fps = np.zeros(num_cameras, dtype=np.float32)
+        self.frames_captured = np.zeros(num_cameras, dtype=np.int64)
+        self.errors = np.zeros(num_cameras, dtype=np.int32)
+        # NaN until the first frame arrives
+        self.last_frame_time = np.full(num_cameras, np.nan, dtype=np.float64)
+    
+    def to_status(
+        self,
+        slot: int,
+        config: CameraConfig,
+        out: Optional[CameraStatus] = None
+    ) -> CameraStatus:
+        """
+        Materialize a CameraStatus for one slot.
+        
+        Args:
+            slot: Camera slot index
+            config: Camera configuration (for id and area name)
+            out: Existing CameraStatus to update in place instead of
+                 allocating a new one
+        """
+        if out is None:
+            out = CameraStatus(
+                source_id=config.source_id,
+                area_name=config.area_name,
+                is_connected=False,
+                fps=0.0,
+                last_frame_time=None,
+                frames_captured=0,
+                errors=0
+            )
+        
+        last_frame_time = self.last_frame_time[slot]
+        out.is_connected = bool(self.is_connected[slot])
+        out.fps = float(self.fps[slot])
+        out.last_frame_time = None if np.isnan(last_frame_time) else float(last_frame_time)
+        out.frames_captured = int(self.frames_captured[slot])
+        out.errors = int(self.errors[slot])
+        return out
+
+
 class CameraWorker:
-    """Worker thread for a single camera."""
+    """
+    Worker thread for a single camera.
+    
+    Args:
+        config: Camera configuration
+        buffer: Buffer receiving captured frames
+        on_error: Optional error callback (source_id, exception)
+        on_frame: Optional callback (source_id, frame, metadata) invoked
+                  from the capture thread instead of buffering the frame
+        status_table: Shared status table to write into (a private
+                      single-slot table is created if omitted)
+        slot: This worker's index in status_table
+    """
+    
+    # Upper bound on the sleep between consecutive failed reads (seconds)
+    max_backoff = 0.5
     
     def __init__(
         self,
         config: CameraConfig,
         buffer: FrameBuffer,
-        on_error: Optional[Callable[[str, Exception], None]] = None
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+        on_frame: Optional[Callable[[str, np.ndarray, FrameMetadata], None]] = None,
+        status_table: Optional[CameraStatusTable] = None,
+        slot: int = 0
     ):
         self.config = config
         self.buffer = buffer
         self.on_error = on_error
+        self.on_frame = on_frame
+        
+        if status_table is None:
+            status_table, slot = CameraStatusTable(1), 0
+        self.status_table = status_table
+        self.slot = slot
+        self._status = status_table.to_status(slot, config)
         
         self._source: Optional[VideoSource] = None
         self._thread: Optional[threading.Thread] = None
         self._running = False
-        self._frames_captured = 0
-        self._errors = 0
-        self._last_frame_time: Optional[float] = None
     
     def start(self):
         """Start the camera worker thread."""
@@ -75,6 +155,7 @@ class CameraWorker:
         if self._source is not None:
             self._source.close()
             self._source = None
+        self.status_table.is_connected[self.slot] = False
     
     def _capture_loop(self):
         """Main capture loop running in separate thread."""
@@ -83,44 +164,67 @@ class CameraWorker:
             self.config.source_id
         )
         
+        # Frames the buffer drops unconsumed go back to the source's pool
+        self.buffer.recycle = self._source.release_frame
+        
+        table, slot = self.status_table, self.slot
+        
         if not self._source.open():
-            self._errors += 1
+            table.errors[slot] += 1
             if self.on_error:
                 self.on_error(self.config.source_id, Exception("Failed to open source"))
             return
         
+        table.is_connected[slot] = True
+        table.fps[slot] = self._source.fps
+        frames_captured = 0
+        fail_count = 0
+        
         while self._running:
+            # read() blocks in OpenCV with the GIL released, so healthy
+            # streams never sleep here; only consecutive failures back off
             try:
                 frame, metadata = self._source.read()
                 
                 if frame is not None:
-                    self.buffer.put(frame, metadata)
-                    self._frames_captured += 1
-                    self._last_frame_time = time.time()
-                else:
-                    # Small delay on failed read to avoid busy loop
-                    time.sleep(0.01)
+                    on_frame = self.on_frame
+                    if on_frame is not None:
+                        on_frame(self.config.source_id, frame, metadata)
+                    else:
+                        self.buffer.put(frame, metadata)
+                    frames_captured += 1
+                    table.frames_captured[slot] = frames_captured
+                    table.last_frame_time[slot] = metadata.timestamp
+                    if fail_count:
+                        # Recovered (e.g. RTSP reconnect succeeded)
+                        table.is_connected[slot] = True
+                        fail_count = 0
+                    continue
                     
             except Exception as e:
-                self._errors += 1
+                table.errors[slot] += 1
                 if self.on_error:
                     self.on_error(self.config.source_id, e)
-                time.sleep(0.1)
+            
+            # Sources close themselves when reconnecting gives up
+            table.is_connected[slot] = self._source.is_open
+            
+            # Exponential backoff on failed reads: 1 ms doubling up to max_backoff
+            time.sleep(min(0.001 * (1 << fail_count), self.max_backoff))
+            fail_count = min(fail_count + 1, 16)
         
         self._source.close()
+        table.is_connected[slot] = False
     
     @property
     def status(self) -> CameraStatus:
-        """Get current camera status."""
-        return CameraStatus(
-            source_id=self.config.source_id,
-            area_name=self.config.area_name,
-            is_connected=self._source is not None and self._source.is_open,
-            fps=self._source.fps if self._source else 0.0,
-            last_frame_time=self._last_frame_time,
-            frames_captured=self._frames_captured,
-            errors=self._errors
-        )
+        """
+        Get current camera status.
+        
+        The same object is refreshed and returned on every call; treat it
+        as read-only and copy it (dataclasses.replace) to keep a snapshot.
+        """
+        return self.status_table.to_status(self.slot, self.config, out=self._status)
 
 
 class MultiCameraManager:
@@ -142,6 +246,17 @@ class MultiCameraManager:
             for source_id, (frame, meta) in frames.items():
                 process(frame)
         ```
+    
+    Push-based alternative (no polling; one wakeup for all cameras):
+        ```python
+        manager.set_frame_callback(manager.latest_store.put)
+        manager.start()
+        
+        while True:
+            frames = manager.latest_store.wait(timeout=1.0)
+            for source_id, (frame, meta) in frames.items():
+                process(frame)
+        ```
     """
     
     def __init__(
@@ -154,32 +269,51 @@ class MultiCameraManager:
         
         self._workers: Dict[str, CameraWorker] = {}
         self._buffers: Dict[str, FrameBuffer] = {}
-        self._error_log: List[Tuple[str, str, float]] = []
+        # Preallocated (N, H, W, 3) output for get_latest_batch
+        self._batch_buf: Optional[np.ndarray] = None
+        # Newest frame per camera for push-based consumers
+        self.latest_store = LatestFrameStore(recycle=get_frame_pool().release)
+        self.status_table = CameraStatusTable(
+            sum(1 for c in camera_configs if c.enabled)
+        )
+        # Keep only the last 100 errors
+        self._error_log: deque = deque(maxlen=100)
         
         self._setup_workers()
     
     def _setup_workers(self):
         """Initialize workers for all cameras."""
-        for config in self.camera_configs.values():
-            if not config.enabled:
-                continue
-            
+        enabled = [c for c in self.camera_configs.values() if c.enabled]
+        for slot, config in enumerate(enabled):
             buffer = FrameBuffer(max_size=self.buffer_size, drop_old=True)
             worker = CameraWorker(
                 config=config,
                 buffer=buffer,
-                on_error=self._handle_error
+                on_error=self._handle_error,
+                status_table=self.status_table,
+                slot=slot
             )
             
             self._buffers[config.source_id] = buffer
             self._workers[config.source_id] = worker
     
+    def set_frame_callback(
+        self,
+        callback: Optional[Callable[[str, np.ndarray, FrameMetadata], None]]
+    ):
+        """
+        Deliver frames by calling `callback(source_id, frame, metadata)`
+        directly from each capture thread instead of buffering them.
+        
+        Pass `latest_store.put` to wait on all cameras with a single
+        wakeup, or None to go back to the per-camera FrameBuffers.
+        """
+        for worker in self._workers.values():
+            worker.on_frame = callback
+    
     def _handle_error(self, source_id: str, error: Exception):
         """Handle camera errors."""
         self._error_log.append((source_id, str(error), time.time()))
-        # Keep only last 100 errors
-        if len(self._error_log) > 100:
-            self._error_log = self._error_log[-100:]
     
     def start(self):
         """Start all camera workers."""
@@ -215,19 +349,81 @@ class MultiCameraManager:
     def get_latest_frames(
         self
     ) -> Dict[str, Tuple[np.ndarray, FrameMetadata]]:
-        """Get the most recent frame from all cameras."""
-        frames = {}
-        for source_id, buffer in self._buffers.items():
+        """
+        Get the most recent frame from all cameras.
+        
+        FrameBuffer.get_latest is lock-free, so this is a single sweep
+        over the buffers with no per-camera lock round-trip.
+        """
+        return {
+            source_id: result
+            for source_id, buffer in self._buffers.items()
+            if (result := buffer.get_latest()) is not None
+        }
+    
+    def get_latest_batch(
+        self,
+        target_size: Tuple[int, int]
+    ) -> Tuple[np.ndarray, List[FrameMetadata]]:
+        """
+        Get the most recent frame from all cameras as one stacked batch.
+        
+        Each frame is resized straight into a preallocated (N, H, W, 3)
+        buffer, so a single model forward can process every camera.
+        The buffer is reused on the next call; copy it to keep it.
+        
+        Args:
+            target_size: Output frame size (width, height)
+            
+        Returns:
+            Tuple of (batch of shape (K, H, W, 3), metadata per row) for
+            the K cameras that had a new frame
+        """
+        width, height = target_size
+        shape = (len(self._buffers), height, width, 3)
+        if self._batch_buf is None or self._batch_buf.shape != shape:
+            # From the frame pool so it is pinned when CUDA is available
+            self._batch_buf = get_frame_pool().acquire(shape)
+        
+        metadata_list = []
+        for buffer in self._buffers.values():
             result = buffer.get_latest()
-            if result is not None:
-                frames[source_id] = result
-        return frames
+            if result is None:
+                continue
+            frame, metadata = result
+            
+            out = self._batch_buf[len(metadata_list)]
+            if frame.shape == out.shape:
+                np.copyto(out, frame)
+            else:
+                cv2.resize(frame, target_size, dst=out, interpolation=cv2.INTER_AREA)
+            # The frame has been copied out, so its buffer can be reused
+            if buffer.recycle is not None:
+                buffer.recycle(frame)
+            metadata_list.append(metadata)
+        
+        return self._batch_buf[:len(metadata_list)], metadata_list
     
-    def get_status(self) -> Dict[str, CameraStatus]:
-        """Get status of all cameras."""
+    def get_status(
+        self,
+        source_ids: Optional[List[str]] = None
+    ) -> Dict[str, CameraStatus]:
+        """
+        Get status of cameras.
+        
+        Args:
+            source_ids: Cameras to report (None = all). For aggregate
+                        numbers read status_table directly instead.
+        
+        The returned CameraStatus objects are reused across calls (see
+        CameraWorker.status).
+        """
+        if source_ids is None:
+            source_ids = self._workers.keys()
         return {
-            source_id: worker.status
-            for source_id, worker in self._workers.items()
+            source_id: self._workers[source_id].status
+            for source_id in source_ids
+            if source_id in self._workers
         }
     
     def get_area_config(self, source_id: str) -> Optional[CameraConfig]:
@@ -237,12 +433,18 @@ class MultiCameraManager:
     @property
     def active_cameras(self) -> List[str]:
         """List of currently connected camera IDs."""
+        connected = self.status_table.is_connected
         return [
             source_id 
             for source_id, worker in self._workers.items()
-            if worker.status.is_connected
+            if connected[worker.slot]
         ]
     
+    @property
+    def error_log(self) -> List[Tuple[str, str, float]]:
+        """Recent camera errors as (source_id, message, timestamp)."""
+        return list(self._error_log)
+    
     def __enter__(self):
         self.start()
         return self
@@ -4,13 +4,14 @@ Inference Module
 Real-time crowd density inference engine.
 """
 
-from .engine import CrowdDensityEngine, InferenceResult, EngineConfig, create_engine
+from .engine import CrowdDensityEngine, InferenceResult, EngineConfig, MicroBatcher, create_engine
 from .density_analyzer import DensityAnalyzer, DensityLevel, DensityStats
 
 __all__ = [
     "CrowdDensityEngine",
     "InferenceResult",
     "EngineConfig",
+    "MicroBatcher",
     "create_engine",
     "DensityAnalyzer",
     "DensityLevel",
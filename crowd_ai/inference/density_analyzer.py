@@ -4,11 +4,95 @@ Density Analyzer Module
 Advanced density analysis and classification.
 """
 
+from bisect import bisect_right
 from dataclasses import dataclass
 from enum import Enum
 from typing import Dict, List, Optional, Tuple
 import numpy as np
 
+try:
+    import cv2
+    CV2_AVAILABLE = True
+    # Spaghetti (block-based decision forest), BBDT on older OpenCV
+    _CCL_TYPE = getattr(cv2, "CCL_SPAGHETTI", cv2.CCL_BBDT)
+except ImportError:
+    CV2_AVAILABLE = False
+
+try:
+    from scipy import ndimage
+    SCIPY_AVAILABLE = True
+    _EIGHT_CONNECTED = np.ones((3, 3), dtype=bool)
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(fastmath=True, cache=True, boundscheck=False)
+    def _reduce_stats_kernel(flat):
+        """Sum, sum of squares, min and max in one pass."""
+        total = 0.0
+        total_sq = 0.0
+        lo = flat[0]
+        hi = flat[0]
+        for v in flat:
+            total += v
+            total_sq += v * v
+            lo = min(lo, v)
+            hi = max(hi, v)
+        return total, total_sq, lo, hi
+    
+    @numba.njit(parallel=True, cache=True, boundscheck=False)
+    def _threshold_counts_kernel(flat, t1, t2):
+        """Count values above each of two thresholds in one pass."""
+        c1 = 0
+        c2 = 0
+        for i in numba.prange(flat.size):
+            v = flat[i]
+            c1 += v > t1
+            c2 += v > t2
+        return c1, c2
+
+
+def _threshold_counts(flat: np.ndarray, t1: float, t2: float) -> Tuple[int, int]:
+    """
+    Count the values of a flat array above t1 and above t2.
+    
+    Uses a fused parallel Numba kernel when available, so neither
+    boolean mask is materialized; otherwise falls back to NumPy.
+    """
+    if NUMBA_AVAILABLE:
+        c1, c2 = _threshold_counts_kernel(flat, t1, t2)
+        return int(c1), int(c2)
+    
+    return int(np.count_nonzero(flat > t1)), int(np.count_nonzero(flat > t2))
+
+
+def _reduce_stats(flat: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    Compute (sum, sum of squares, min, max) of a flat array.
+    
+    Uses a fused single-pass Numba kernel when available; otherwise
+    falls back to NumPy (sum of squares via a dot product, which
+    avoids materializing flat ** 2).
+    """
+    if NUMBA_AVAILABLE:
+        total, total_sq, lo, hi = _reduce_stats_kernel(flat)
+        return float(total), float(total_sq), float(lo), float(hi)
+    
+    flat64 = flat.astype(np.float64, copy=False)
+    return (
+        float(flat64.sum()),
+        float(np.dot(flat64, flat64)),
+        float(flat.min()),
+        float(flat.max())
+    )
+
 
 class DensityLevel(Enum):
     """
@@ -30,26 +114,37 @@ class DensityLevel(Enum):
     @property
     def color_rgb(self) -> Tuple[int, int, int]:
         """Get RGB color for visualization."""
-        colors = {
-            DensityLevel.FREE_FLOW: (0, 200, 0),    # Green
-            DensityLevel.LOW: (100, 200, 100),       # Light green
-            DensityLevel.MEDIUM: (255, 200, 0),      # Yellow
-            DensityLevel.HIGH: (255, 100, 0),        # Orange
-            DensityLevel.CRITICAL: (255, 0, 0),      # Red
-        }
-        return colors[self]
+        return _LEVEL_COLORS[self]
+    
+    @property
+    def color_bgr(self) -> Tuple[int, int, int]:
+        """Get BGR color for drawing with OpenCV."""
+        return _LEVEL_COLORS_BGR[self]
     
     @property
     def description(self) -> str:
         """Get human-readable description."""
-        descriptions = {
-            DensityLevel.FREE_FLOW: "Open space, free movement",
-            DensityLevel.LOW: "Comfortable walking space",
-            DensityLevel.MEDIUM: "Normal crowd density",
-            DensityLevel.HIGH: "Dense crowd, limited movement",
-            DensityLevel.CRITICAL: "SAFETY ALERT: Very high density",
-        }
-        return descriptions[self]
+        return _LEVEL_DESCRIPTIONS[self]
+
+
+# Per-level lookups, built once rather than on every property access
+_LEVEL_COLORS = {
+    DensityLevel.FREE_FLOW: (0, 200, 0),    # Green
+    DensityLevel.LOW: (100, 200, 100),       # Light green
+    DensityLevel.MEDIUM: (255, 200, 0),      # Yellow
+    DensityLevel.HIGH: (255, 100, 0),        # Orange
+    DensityLevel.CRITICAL: (255, 0, 0),      # Red
+}
+
+_LEVEL_COLORS_BGR = {level: rgb[::-1] for level, rgb in _LEVEL_COLORS.items()}
+
+_LEVEL_DESCRIPTIONS = {
+    DensityLevel.FREE_FLOW: "Open space, free movement",
+    DensityLevel.LOW: "Comfortable walking space",
+    DensityLevel.MEDIUM: "Normal crowd density",
+    DensityLevel.HIGH: "Dense crowd, limited movement",
+    DensityLevel.CRITICAL: "SAFETY ALERT: Very high density",
+}
 
 
 @dataclass
@@ -139,6 +234,49 @@ class DensityAnalyzer:
         """
         self.area_sqm = area_sqm
         self.thresholds = thresholds or self.DEFAULT_THRESHOLDS.copy()
+        
+        # Sorted upper bounds of every level below CRITICAL, for
+        # bisect/searchsorted classification
+        self._levels = (
+            DensityLevel.FREE_FLOW,
+            DensityLevel.LOW,
+            DensityLevel.MEDIUM,
+            DensityLevel.HIGH,
+            DensityLevel.CRITICAL
+        )
+        self._level_bounds = tuple(self.thresholds[level] for level in self._levels[:-1])
+        self._level_bounds_arr = np.array(self._level_bounds, dtype=np.float64)
+        
+        # Per-(pixel count, area) constants; map shape is fixed per camera
+        self._const_cache: Dict[Tuple[int, float], Tuple[float, float, float]] = {}
+    
+    def warmup(self):
+        """
+        Compile the Numba kernels for float32 maps ahead of the first frame.
+        
+        With cache=True this only loads the on-disk cache after the first
+        run, but a cold compile takes seconds and would otherwise stall
+        the first analyzed frame.
+        """
+        self.analyze(np.zeros((8, 8), dtype=np.float32))
+    
+    def _map_constants(self, pixels: int) -> Tuple[float, float, float]:
+        """
+        Get (1 / pixels, 100 / pixels, critical threshold in map units)
+        for a density map size, computing them on first use.
+        """
+        key = (pixels, self.area_sqm)
+        constants = self._const_cache.get(key)
+        if constants is None:
+            # Compare per-pixel people/sqm against the threshold by scaling
+            # the threshold to map units instead of dividing the map
+            area_per_pixel = self.area_sqm / pixels
+            critical_threshold = self.thresholds[DensityLevel.HIGH]
+            if area_per_pixel > 0:
+                critical_threshold *= area_per_pixel
+            constants = (1.0 / pixels, 100.0 / pixels, critical_threshold)
+            self._const_cache[key] = constants
+        return constants
     
     def analyze(
         self,
@@ -159,33 +297,38 @@ class DensityAnalyzer:
         if density_map.ndim == 3:
             density_map = density_map[0]
         
-        # Basic stats
-        total = crowd_count if crowd_count is not None else float(density_map.sum())
+        # Basic stats (sum, sum of squares, min, max in a single pass)
+        flat = density_map.ravel()
+        map_sum, map_sum_sq, min_density, max_density = _reduce_stats(flat)
+        inv_pixels, percent_per_pixel, critical_threshold = self._map_constants(flat.size)
+        
+        total = crowd_count if crowd_count is not None else map_sum
         density_per_sqm = total / self.area_sqm if self.area_sqm > 0 else 0
         
-        mean_density = float(density_map.mean())
-        max_density = float(density_map.max())
-        min_density = float(density_map.min())
-        std_density = float(density_map.std())
+        mean_density = map_sum * inv_pixels
+        std_density = float(np.sqrt(max(map_sum_sq * inv_pixels - mean_density ** 2, 0.0)))
         
         # Classify overall level
         level = self._classify_density(density_per_sqm)
         
-        # Hotspot analysis
         hotspot_threshold = mean_density + 2 * std_density
-        hotspot_mask = density_map > hotspot_threshold
-        hotspot_count = self._count_connected_components(hotspot_mask)
-        hotspot_percentage = (hotspot_mask.sum() / density_map.size) * 100
         
-        # Critical area analysis
-        # Scale density map values to people/sqm for per-pixel analysis
-        pixels = density_map.size
-        area_per_pixel = self.area_sqm / pixels
-        density_per_pixel_sqm = density_map / area_per_pixel if area_per_pixel > 0 else density_map
+        # Both pixel counts in one pass, without building boolean masks
+        hotspot_pixels, critical_pixels = _threshold_counts(
+            flat, hotspot_threshold, critical_threshold
+        )
         
-        critical_threshold = self.thresholds[DensityLevel.HIGH]
-        critical_mask = density_per_pixel_sqm > critical_threshold
-        critical_area_percentage = (critical_mask.sum() / pixels) * 100
+        # Hotspot analysis; the mask is only needed for CCL when there
+        # is something to label
+        if hotspot_pixels == 0:
+            hotspot_count = 0
+        elif CV2_AVAILABLE or SCIPY_AVAILABLE:
+            hotspot_count = self._count_connected_components(density_map > hotspot_threshold)
+        else:
+            # No labelling backend: only "some hotspot exists" is known
+            hotspot_count = 1
+        hotspot_percentage = hotspot_pixels * percent_per_pixel
+        critical_area_percentage = critical_pixels * percent_per_pixel
         
         # Estimate flow rate (simplified model)
         # Higher density = lower flow rate
@@ -209,27 +352,39 @@ class DensityAnalyzer:
     
     def _classify_density(self, density_per_sqm: float) -> DensityLevel:
         """Classify density into level."""
-        if density_per_sqm < self.thresholds[DensityLevel.FREE_FLOW]:
-            return DensityLevel.FREE_FLOW
-        elif density_per_sqm < self.thresholds[DensityLevel.LOW]:
-            return DensityLevel.LOW
-        elif density_per_sqm < self.thresholds[DensityLevel.MEDIUM]:
-            return DensityLevel.MEDIUM
-        elif density_per_sqm < self.thresholds[DensityLevel.HIGH]:
-            return DensityLevel.HIGH
-        else:
-            return DensityLevel.CRITICAL
+        # Each level covers [previous bound, own bound)
+        return self._levels[bisect_right(self._level_bounds, density_per_sqm)]
+    
+    def classify_densities(self, densities: np.ndarray) -> np.ndarray:
+        """
+        Classify an array of densities (people/sqm) in one call.
+        
+        Args:
+            densities: Array of any shape
+            
+        Returns:
+            Integer array of the same shape indexing into
+            (FREE_FLOW, LOW, MEDIUM, HIGH, CRITICAL)
+        """
+        return np.searchsorted(self._level_bounds_arr, densities, side='right')
     
     def _count_connected_components(self, mask: np.ndarray) -> int:
-        """Count connected high-density regions."""
-        try:
-            import cv2
-            mask_uint8 = (mask * 255).astype(np.uint8)
-            num_labels, _ = cv2.connectedComponents(mask_uint8)
+        """Count connected high-density regions (8-connectivity)."""
+        if CV2_AVAILABLE:
+            # CCL only tests for nonzero, so a bool mask can be viewed
+            # as uint8 without a copy
+            mask_uint8 = mask.view(np.uint8) if mask.dtype == np.bool_ else mask.astype(np.uint8)
+            num_labels, _ = cv2.connectedComponentsWithAlgorithm(
+                mask_uint8, 8, cv2.CV_32S, _CCL_TYPE
+            )
             return max(0, num_labels - 1)  # Exclude background
-        except:
-            # Fallback: estimate from thresholded regions
-            return int(mask.sum() > 0)
+        
+        if SCIPY_AVAILABLE:
+            _, num_features = ndimage.label(mask, structure=_EIGHT_CONNECTED)
+            return int(num_features)
+        
+        # Fallback: only detects whether any region exists
+        return int(np.count_nonzero(mask) > 0)
     
     def analyze_zones(
         self,
@@ -259,17 +414,26 @@ class DensityAnalyzer:
         
         zone_area = self.area_sqm / (rows * cols)
         
+        # Sum every zone in one reduction over a (rows, zone_h, cols, zone_w) view
+        zone_sums = density_map[:rows * zone_h, :cols * zone_w].reshape(
+            rows, zone_h, cols, zone_w
+        ).sum(axis=(1, 3))
+        zone_densities = (
+            zone_sums.astype(np.float64) / zone_area if zone_area > 0
+            else np.zeros(zone_sums.shape)
+        )
+        zone_levels = self.classify_densities(zone_densities)
+        
         zones = []
         for i in range(rows):
             for j in range(cols):
                 y1, y2 = i * zone_h, (i + 1) * zone_h
                 x1, x2 = j * zone_w, (j + 1) * zone_w
                 
-                zone_map = density_map[y1:y2, x1:x2]
-                zone_count = float(zone_map.sum())
-                zone_density = zone_count / zone_area if zone_area > 0 else 0
+                zone_count = float(zone_sums[i, j])
+                zone_density = float(zone_densities[i, j])
                 
-                zone_level = self._classify_density(zone_density)
+                zone_level = self._levels[zone_levels[i, j]]
                 
                 zones.append({
                     "zone_id": f"zone_{i}_{j}",
@@ -279,7 +443,8 @@ class DensityAnalyzer:
                     "count": round(zone_count, 1),
                     "density_per_sqm": round(zone_density, 3),
                     "level": zone_level.value,
-                    "color": zone_level.color_rgb
+                    "color": zone_level.color_rgb,
+                    "color_bgr": zone_level.color_bgr
                 })
         
         return zones
@@ -4,9 +4,12 @@ Crowd Density Inference Engine
 Real-time inference using CSRNet for crowd counting.
 """
 
+import queue
+import threading
 import time
+from concurrent.futures import Future
 from dataclasses import dataclass, field
-from typing import Optional, Dict, List, Tuple, Union
+from typing import Optional, Dict, Hashable, Iterable, Iterator, List, Tuple, Union
 from pathlib import Path
 
 import cv2
@@ -14,8 +17,22 @@ import numpy as np
 import torch
 import torch.nn as nn
 
-from ..models import CSRNet, load_csrnet_model
-from ..preprocessing import preprocess_frame, CSRNetTransform
+from ..models import (
+    CSRNet,
+    CUDAGraphRunner,
+    load_csrnet_model,
+    ONNXCSRNetRunner,
+    export_csrnet_onnx,
+    ORT_AVAILABLE
+)
+from ..models.onnx_backend import (
+    DEFAULT_ONNX_DIR,
+    CALIBRATION_TABLE_NAME,
+    build_int8_calibration_table,
+    default_trt_cache_dir
+)
+from ..preprocessing import preprocess_frame, preprocess_frame_gpu, get_resize_shape, CSRNetTransform
+from ..capture.frame_pool import hold_until
 
 
 @dataclass
@@ -25,12 +42,16 @@ class InferenceResult:
     
     Attributes:
         crowd_count: Estimated number of people in frame
-        density_map: Raw density map from model [H', W']
+        density_map: Raw density map from model [H', W'] (empty if
+                     return_density_map is False)
         density_per_sqm: Average density (people per square meter)
         density_level: Classification (LOW/MEDIUM/HIGH/CRITICAL)
         processing_time_ms: Time taken for inference
         frame_shape: Original frame dimensions (H, W)
         timestamp: Unix timestamp of inference
+        device_frame: Uploaded uint8 BGR frame [H, W, 3] on the GPU
+                      (EngineConfig.keep_device_outputs, CUDA only)
+        device_density_map: Density map [H', W'] on the GPU (same)
     """
     crowd_count: float
     density_map: np.ndarray
@@ -45,6 +66,11 @@ class InferenceResult:
     min_density: float = 0.0
     std_density: float = 0.0
     
+    # GPU-resident copies for on-device visualization; only valid until
+    # the engine processes the next frame
+    device_frame: Optional[torch.Tensor] = None
+    device_density_map: Optional[torch.Tensor] = None
+    
     def to_dict(self) -> dict:
         """Convert to JSON-serializable dictionary."""
         return {
@@ -70,6 +96,7 @@ class EngineConfig:
     # Preprocessing
     scale_factor: float = 0.5  # Resize input (0.5 = half size)
     target_size: Optional[Tuple[int, int]] = None
+    input_size: Optional[Tuple[int, int]] = None  # Camera frame (H, W), if known; fixes the TensorRT profile
     
     # Area calibration
     area_sqm: float = 100.0  # Area covered by camera in square meters
@@ -85,12 +112,66 @@ class EngineConfig:
     # Performance
     use_cuda: bool = True
     use_half_precision: bool = False  # FP16 for faster inference
+    backend: str = "pytorch"  # "pytorch", "onnx" (ONNX Runtime), "trt_fp16" or "trt_int8" (TensorRT EP)
+    onnx_path: Optional[str] = None  # Exported on first use if missing
+    calibration_images: Optional[str] = None  # Image folder or video source for trt_int8 calibration (first use)
+    compile_model: bool = False  # torch.compile: fused conv+ReLU, + CUDA graphs on GPU (PyTorch backend)
+    use_cuda_graph: bool = False  # Replay the forward as a CUDA graph without torch.compile (GPU, PyTorch backend)
+    channels_last: Union[bool, str] = "auto"  # NHWC for Tensor Core convs; "auto" = time both layouts at load (GPU, PyTorch backend)
+    max_batch_size: int = 8  # Largest process_batch() forward pass (also sizes the TensorRT profile)
+    return_density_map: bool = True  # Copy the map to host (False = stats only)
+    reuse_density_buffer: bool = False  # Return maps in one reused pinned buffer (CUDA; valid until the next call)
+    keep_device_outputs: bool = False  # Attach the GPU frame/map to results for GPU visualization (CUDA)
     
     # Smoothing
     enable_smoothing: bool = True
     smoothing_window: int = 5  # Number of frames for temporal smoothing
 
 
+class _MovingAverage:
+    """Moving average over the last N samples (O(1) per update, fixed memory)."""
+    
+    def __init__(self, window: int):
+        self._ring: List[float] = [0.0] * max(1, window)
+        self._index = 0
+        self._len = 0
+        self._sum = 0.0
+    
+    def update(self, count: float) -> float:
+        """Add a count and return the current moving average."""
+        ring = self._ring
+        window = len(ring)
+        i = self._index
+        
+        # Replace the oldest sample once the window is full
+        if self._len == window:
+            self._sum -= ring[i]
+        else:
+            self._len += 1
+        ring[i] = count
+        self._sum += count
+        
+        i += 1
+        if i == window:
+            i = 0
+            # Resync once per lap so add/subtract rounding can't drift
+            self._sum = sum(ring)
+        self._index = i
+        
+        return self._sum / self._len
+    
+    @property
+    def mean(self) -> float:
+        """Current average (0.0 when empty)."""
+        return self._sum / self._len if self._len else 0.0
+    
+    def reset(self):
+        """Forget all samples."""
+        self._index = 0
+        self._len = 0
+        self._sum = 0.0
+
+
 class CrowdDensityEngine:
     """
     Real-time crowd density estimation engine.
@@ -111,6 +192,9 @@ class CrowdDensityEngine:
         ```
     """
     
+    # Number of recent frames averaged for average_inference_time / fps
+    inference_time_window = 1024
+    
     def __init__(self, config: Optional[EngineConfig] = None):
         """
         Initialize the inference engine.
@@ -123,11 +207,13 @@ class CrowdDensityEngine:
         self._load_model()
         self._setup_transform()
         
-        # For temporal smoothing
-        self._count_history: List[float] = []
+        # For temporal smoothing: one ring of recent counts per stream
+        # (stream_id None is the default single stream)
+        self._smoothers: Dict[Optional[Hashable], _MovingAverage] = {}
         
-        # Performance tracking
-        self._inference_times: List[float] = []
+        # Performance tracking: recent inference times (bounded) + total
+        self._inference_times = _MovingAverage(self.inference_time_window)
+        self._frames_processed = 0
     
     def _setup_device(self):
         """Setup computation device (CUDA/CPU)."""
@@ -148,54 +234,417 @@ class CrowdDensityEngine:
             device=self.device
         )
         
-        # Use half precision if enabled (GPU only)
-        if self.config.use_half_precision and self.device.type == "cuda":
+        if self.config.backend != "pytorch":
+            self.model = self._load_onnx_runner(self.model)
+        
+        # Use half precision if enabled (GPU only, PyTorch backend)
+        self._use_half = (
+            self.config.use_half_precision
+            and self.device.type == "cuda"
+            and self.config.backend == "pytorch"
+        )
+        if self._use_half:
             self.model = self.model.half()
             print("Using FP16 precision")
         
         self.model.eval()
+        
+        # NHWC weights/activations let cuDNN pick Tensor Core conv kernels
+        self._channels_last = (
+            bool(self.config.channels_last)
+            and self.device.type == "cuda"
+            and self.config.backend == "pytorch"
+        )
+        if self._channels_last and self.config.channels_last == "auto":
+            # NHWC is not faster for every GPU/dtype/size combination
+            self._channels_last = self._probe_channels_last()
+        if self._channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+        
+        # Inductor fuses each conv with its ReLU (no HBM round trip for the
+        # activation); on CUDA, reduce-overhead also captures the forward
+        # as CUDA graphs to remove launch overhead. Shapes are specialized
+        # (dynamic=False), so a fixed camera resolution compiles once.
+        if self.config.compile_model and self.config.backend == "pytorch":
+            mode = "reduce-overhead" if self.device.type == "cuda" else None
+            try:
+                self.model = torch.compile(self.model, mode=mode, fullgraph=True, dynamic=False)
+                print(f"Compiled model with torch.compile ({mode or 'default'})")
+            except Exception as e:
+                print(f"torch.compile unavailable, using eager model: {e}")
+        elif (
+            self.config.use_cuda_graph
+            and self.device.type == "cuda"
+            and self.config.backend == "pytorch"
+        ):
+            # Graphs are captured lazily per input shape (warmup() captures
+            # the expected one)
+            self.model = CUDAGraphRunner(self.model)
+            print("Using CUDA graph replay")
+    
+    @torch.inference_mode()
+    def _probe_channels_last(self, iterations: int = 10) -> bool:
+        """Time the eager model in NCHW and NHWC at the expected input size; True if NHWC wins."""
+        frame_h, frame_w = self.config.input_size or (480, 640)
+        h, w = get_resize_shape(frame_h, frame_w, self.config.target_size, self.config.scale_factor)
+        dtype = torch.half if self._use_half else torch.float32
+        x = torch.randn(1, 3, h, w, device=self.device, dtype=dtype)
+        
+        timings = {}
+        for memory_format in (torch.contiguous_format, torch.channels_last):
+            self.model.to(memory_format=memory_format)
+            x_fmt = x.contiguous(memory_format=memory_format)
+            
+            # First runs include cuDNN autotuning
+            for _ in range(3):
+                self.model(x_fmt)
+            torch.cuda.synchronize(self.device)
+            
+            start = time.perf_counter()
+            for _ in range(iterations):
+                self.model(x_fmt)
+            torch.cuda.synchronize(self.device)
+            timings[memory_format] = (time.perf_counter() - start) * 1000 / iterations
+        
+        nchw_ms = timings[torch.contiguous_format]
+        nhwc_ms = timings[torch.channels_last]
+        use_nhwc = nhwc_ms < nchw_ms
+        print(
+            f"Layout probe ({h}x{w}): NCHW {nchw_ms:.1f}ms, NHWC {nhwc_ms:.1f}ms "
+            f"-> using {'channels_last' if use_nhwc else 'contiguous'}"
+        )
+        
+        # Leave the model in its default layout; the caller converts if needed
+        self.model.to(memory_format=torch.contiguous_format)
+        return use_nhwc
+    
+    def _load_onnx_runner(self, model: nn.Module):
+        """Swap the PyTorch model for an ONNX Runtime session, if possible."""
+        if not ORT_AVAILABLE:
+            print("onnxruntime not installed, falling back to PyTorch backend")
+            self.config.backend = "pytorch"
+            return model
+        
+        if self.config.onnx_path is not None:
+            onnx_path = Path(self.config.onnx_path)
+        else:
+            weights_tag = f"_{Path(self.config.weights_path).stem}" if self.config.weights_path else ""
+            onnx_path = DEFAULT_ONNX_DIR / f"csrnet_{self.config.model_type}{weights_tag}.onnx"
+        if not onnx_path.exists():
+            export_csrnet_onnx(model, onnx_path)
+        
+        validation_inputs = []
+        if self.config.backend == "trt_int8":
+            table_path = default_trt_cache_dir(onnx_path) / CALIBRATION_TABLE_NAME
+            if not table_path.exists() and self.config.calibration_images:
+                validation_inputs = self._build_calibration_table(onnx_path)
+        
+        # Build the TensorRT engine for the one input size frames will have
+        input_shape = None
+        if self.config.input_size is not None:
+            frame_h, frame_w = self.config.input_size
+            input_shape = get_resize_shape(
+                frame_h, frame_w, self.config.target_size, self.config.scale_factor
+            )
+        elif self.config.target_size is not None:
+            input_shape = get_resize_shape(
+                0, 0, self.config.target_size, self.config.scale_factor
+            )
+        
+        device_id = self.device.index or 0
+        print(f"Using {self.config.backend} backend ({onnx_path.name})")
+        runner = ONNXCSRNetRunner(
+            onnx_path,
+            backend=self.config.backend,
+            device_id=device_id,
+            input_shape=input_shape,
+            max_batch=self.config.max_batch_size
+        )
+        
+        if validation_inputs and runner.backend == "trt_int8":
+            self._validate_int8(model, runner, validation_inputs)
+        
+        return runner
+    
+    def _calibration_frames(self, max_frames: int, stride: int = 10) -> List[np.ndarray]:
+        """
+        Load calibration frames from an image folder, or sample every
+        stride-th frame of a video source (file, camera or RTSP URL).
+        """
+        path = Path(self.config.calibration_images)
+        if path.is_dir():
+            image_paths = sorted(
+                p for p in path.iterdir()
+                if p.suffix.lower() in (".jpg", ".jpeg", ".png", ".bmp")
+            )[:max_frames]
+            images = (cv2.imread(str(p)) for p in image_paths)
+            return [image for image in images if image is not None]
+        
+        from ..capture import create_video_source
+        
+        source = create_video_source(self.config.calibration_images)
+        if not source.open():
+            print(f"Could not open calibration source: {self.config.calibration_images}")
+            return []
+        try:
+            # Copies, since the source recycles its frame buffers
+            return [
+                frame.copy()
+                for frame, _ in source.frames(max_frames=max_frames, skip_frames=stride - 1)
+            ]
+        finally:
+            source.close()
+    
+    def _build_calibration_table(self, onnx_path: Path, max_images: int = 128) -> List[np.ndarray]:
+        """
+        Calibrate INT8 ranges on frames preprocessed like live frames.
+        
+        Every other frame is held out from calibration.
+        
+        Returns:
+            The held-out preprocessed inputs, for validation
+        """
+        frames = self._calibration_frames(max_images)
+        
+        transform = CSRNetTransform(
+            target_size=self.config.target_size,
+            scale_factor=self.config.scale_factor,
+            device=torch.device("cpu")
+        )
+        inputs = [transform(frame)[0].contiguous().numpy() for frame in frames]
+        calibration_inputs = inputs[::2]
+        print(f"Calibrating INT8 on {len(calibration_inputs)} frames...")
+        
+        build_int8_calibration_table(onnx_path, calibration_inputs)
+        return inputs[1::2]
+    
+    @torch.inference_mode()
+    def _validate_int8(
+        self,
+        model: nn.Module,
+        runner: ONNXCSRNetRunner,
+        inputs: List[np.ndarray],
+        tolerance: float = 0.05
+    ):
+        """Compare INT8 crowd counts (density map sums) against the FP32 model."""
+        device = next(model.parameters()).device
+        errors = []
+        for x in inputs:
+            reference = float(model(torch.from_numpy(x).to(device)).sum())
+            quantized = float(runner(torch.from_numpy(x)).sum())
+            errors.append(abs(quantized - reference) / max(abs(reference), 1e-6))
+        
+        mean_error = sum(errors) / len(errors)
+        print(f"INT8 validation on {len(errors)} held-out frames: "
+              f"mean count error {mean_error * 100:.1f}%")
+        if mean_error > tolerance:
+            print(f"Warning: INT8 count error exceeds {tolerance * 100:.0f}%; "
+                  f"consider trt_fp16 or more representative calibration frames")
     
     def _setup_transform(self):
         """Setup preprocessing transform."""
+        # On CUDA (PyTorch backend) the raw uint8 frame is uploaded through
+        # pinned staging buffers on a separate copy stream and preprocessed
+        # on the GPU (preprocess_frame_gpu); the CPU transform is the
+        # fallback for other devices/backends
+        self._pipelined = self.device.type == "cuda" and self.config.backend == "pytorch"
+        
+        # ONNX Runtime backends take host arrays and do their own upload;
+        # preprocessing them on the GPU would bounce every frame
+        # host -> device -> host -> device
+        transform_device = self.device if self.config.backend == "pytorch" else torch.device("cpu")
         self.transform = CSRNetTransform(
             target_size=self.config.target_size,
             scale_factor=self.config.scale_factor,
-            device=self.device
+            device=transform_device
         )
+        
+        if self._pipelined:
+            self._copy_stream = torch.cuda.Stream(device=self.device)
+            # Double-buffered so one upload can be in flight while the
+            # next frame is staged
+            self._staging: List[Optional[torch.Tensor]] = [None, None]
+            self._staging_events: List[Optional[torch.cuda.Event]] = [None, None]
+            self._staging_index = 0
+        
+        # Host buffer reused for density maps (reuse_density_buffer)
+        self._density_host: Optional[torch.Tensor] = None
     
-    @torch.no_grad()
-    def process(
-        self,
-        frame: np.ndarray,
-        area_sqm: Optional[float] = None
-    ) -> InferenceResult:
+    def _upload(self, frame: np.ndarray) -> Tuple[torch.Tensor, Optional[dict]]:
         """
-        Process a single frame and return crowd density results.
+        Start getting a frame onto the device.
         
-        Args:
-            frame: BGR image from OpenCV [H, W, 3]
-            area_sqm: Override area in square meters (uses config default if None)
-            
-        Returns:
-            InferenceResult with count, density map, and classification
+        Returns the preprocessed tensor and info (CPU transform path), or
+        the raw uint8 frame being copied asynchronously and None (CUDA
+        path; preprocessing happens in _launch).
         """
-        start_time = time.perf_counter()
+        if not self._pipelined:
+            return self.transform(frame)
         
-        # Use provided area or config default
-        area = area_sqm if area_sqm is not None else self.config.area_sqm
+        host = torch.from_numpy(frame)
+        if host.is_pinned() and host.is_contiguous():
+            # Pooled capture frames are already page-locked: copy straight
+            # from them and keep the buffer out of the pool until it's done
+            with torch.cuda.stream(self._copy_stream):
+                device_frame = host.to(self.device, non_blocking=True)
+                hold_until(frame, self._copy_stream.record_event())
+            device_frame.record_stream(torch.cuda.current_stream(self.device))
+            return device_frame, None
         
-        # Preprocess
-        tensor, preprocess_info = self.transform(frame)
+        i = self._staging_index
+        self._staging_index ^= 1
         
+        staging = self._staging[i]
+        if staging is None or staging.shape != frame.shape:
+            staging = torch.empty(frame.shape, dtype=torch.uint8, pin_memory=True)
+            self._staging[i] = staging
+        elif self._staging_events[i] is not None:
+            # Previous upload from this buffer must finish before reuse
+            self._staging_events[i].synchronize()
+        staging.copy_(host)
+        
+        with torch.cuda.stream(self._copy_stream):
+            device_frame = staging.to(self.device, non_blocking=True)
+            self._staging_events[i] = self._copy_stream.record_event()
+        # Allocated on the copy stream, consumed on the compute stream
+        device_frame.record_stream(torch.cuda.current_stream(self.device))
+        
+        return device_frame, None
+    
+    def _launch(
+        self,
+        tensor: torch.Tensor,
+        preprocess_info: Optional[dict]
+    ) -> Tuple[torch.Tensor, torch.Tensor, dict]:
+        """Queue preprocessing (CUDA path), the forward pass and on-device reductions (no sync)."""
+        tensor, preprocess_info = self._prepare(tensor, preprocess_info)
+        density_map, stats = self._forward(tensor)
+        return density_map, stats, preprocess_info
+    
+    def _prepare(
+        self,
+        tensor: torch.Tensor,
+        preprocess_info: Optional[dict]
+    ) -> Tuple[torch.Tensor, dict]:
+        """Finish preprocessing an uploaded frame on the device (CUDA path)."""
+        if self._pipelined:
+            torch.cuda.current_stream(self.device).wait_stream(self._copy_stream)
+            device_frame = tensor
+            tensor, preprocess_info = preprocess_frame_gpu(
+                tensor,
+                target_size=self.config.target_size,
+                scale_factor=self.config.scale_factor,
+                dtype=torch.half if self._use_half else torch.float32  # No separate cast in _forward
+            )
+            if self.config.keep_device_outputs:
+                preprocess_info["device_frame"] = device_frame
+        return tensor, preprocess_info
+    
+    def _forward(self, tensor: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Run the model on a [B, 3, H, W] batch; returns the maps and per-frame [B, 4] stats."""
         # Handle half precision
-        if self.config.use_half_precision and self.device.type == "cuda":
+        if self._use_half:
             tensor = tensor.half()
+        if self._channels_last:
+            tensor = tensor.contiguous(memory_format=torch.channels_last)
         
         # Model inference
         density_map = self.model(tensor)
         
-        # Get crowd count (sum of density map)
-        raw_count = density_map.sum().item()
+        # Reduce on the device and bring sum/max/min/std back together,
+        # so there is a single sync instead of one per statistic.
+        # The map stays in the model's dtype: sums accumulate in FP32 inside
+        # the reduction kernels (no FP32 copy of an FP16 map), max/min are
+        # exact in either dtype.
+        flat = density_map.reshape(density_map.shape[0], -1)
+        n = flat.shape[1]
+        total = flat.sum(1, dtype=torch.float32)
+        total_sq = torch.linalg.vector_norm(flat, 2, dim=1, dtype=torch.float32).square()
+        mean = total / n
+        std = (total_sq / n - mean.square()).clamp_min(0).sqrt()
+        stats = torch.stack(
+            [total, flat.amax(1).float(), flat.amin(1).float(), std],
+            dim=1
+        )
+        
+        return density_map, stats
+    
+    def _fetch(
+        self,
+        density_map: torch.Tensor,
+        stats: torch.Tensor,
+        return_density_map: Optional[bool] = None
+    ) -> Tuple[List[np.ndarray], List[List[float]]]:
+        """Wait for launched results and copy the per-frame maps and stats to the host."""
+        if return_density_map is None:
+            return_density_map = self.config.return_density_map
+        
+        # Copy the maps alongside (one D2H transfer, skipped if unused)
+        if return_density_map and self.config.reuse_density_buffer and density_map.is_cuda:
+            maps = list(self._copy_to_density_buffer(density_map[:, 0]))
+        elif return_density_map:
+            maps = list(density_map[:, 0].float().cpu().numpy())
+        else:
+            maps = [np.empty((0, 0), dtype=np.float32)] * density_map.shape[0]
+        return maps, stats.tolist()
+    
+    def _copy_to_density_buffer(self, maps: torch.Tensor) -> np.ndarray:
+        """
+        Queue a copy of [B, H', W'] maps into the reused pinned host buffer.
+        
+        The copy is asynchronous; it completes by the time the stats are
+        read back, which happens on the same stream right after.
+        """
+        host = self._density_host
+        if host is None or host.shape != maps.shape:
+            host = torch.empty(maps.shape, dtype=torch.float32, pin_memory=True)
+            self._density_host = host
+        host.copy_(maps, non_blocking=True)
+        return host.numpy()
+    
+    def _finalize(
+        self,
+        density_map: torch.Tensor,
+        stats: torch.Tensor,
+        preprocess_info: dict,
+        area: float,
+        start_time: float,
+        stream_id: Optional[Hashable] = None,
+        return_density_map: Optional[bool] = None
+    ) -> InferenceResult:
+        """Wait for the results of a launched frame and build the result."""
+        maps, frame_stats = self._fetch(density_map, stats, return_density_map)
+        processing_time = (time.perf_counter() - start_time) * 1000
+        result = self._build_result(
+            maps[0], frame_stats[0], preprocess_info, area, processing_time, stream_id
+        )
+        self._attach_device_outputs(result, density_map[0, 0], preprocess_info)
+        return result
+    
+    def _attach_device_outputs(
+        self,
+        result: InferenceResult,
+        density_map: torch.Tensor,
+        preprocess_info: dict
+    ):
+        """Attach the GPU frame and map to a result (keep_device_outputs)."""
+        device_frame = preprocess_info.get("device_frame")
+        if device_frame is not None:
+            result.device_frame = device_frame
+            result.device_density_map = density_map
+    
+    def _build_result(
+        self,
+        density_np: np.ndarray,
+        stats: List[float],
+        preprocess_info: dict,
+        area: float,
+        processing_time: float,
+        stream_id: Optional[Hashable]
+    ) -> InferenceResult:
+        """Calibrate, smooth and classify one frame's host-side results."""
+        # Crowd count is the sum of the density map
+        raw_count, max_density, min_density, std_density = stats
         
         # IMPORTANT: Without trained crowd-counting weights, apply calibration.
         # CSRNet with only VGG pretrained weights produces uncalibrated density maps.
@@ -209,27 +658,18 @@ class CrowdDensityEngine:
         
         # Apply temporal smoothing
         if self.config.enable_smoothing:
-            smoothed_count = self._smooth_count(raw_count)
+            smoothed_count = self._smooth_count(raw_count, stream_id)
         else:
             smoothed_count = raw_count
         
-        # Convert density map to numpy
-        density_np = density_map[0, 0].cpu().numpy()
-        
         # Calculate density per square meter
         density_per_sqm = smoothed_count / area if area > 0 else 0
         
         # Classify density level
         density_level = self._classify_density(density_per_sqm)
         
-        # Calculate statistics
-        max_density = float(density_np.max())
-        min_density = float(density_np.min())
-        std_density = float(density_np.std())
-        
-        # Processing time
-        processing_time = (time.perf_counter() - start_time) * 1000
-        self._inference_times.append(processing_time)
+        self._inference_times.update(processing_time)
+        self._frames_processed += 1
         
         return InferenceResult(
             crowd_count=smoothed_count,
@@ -244,16 +684,155 @@ class CrowdDensityEngine:
             std_density=std_density
         )
     
-    def _smooth_count(self, count: float) -> float:
-        """Apply temporal smoothing to crowd count."""
-        self._count_history.append(count)
+    @torch.inference_mode()
+    def process(
+        self,
+        frame: np.ndarray,
+        area_sqm: Optional[float] = None,
+        stream_id: Optional[Hashable] = None,
+        return_density_map: Optional[bool] = None
+    ) -> InferenceResult:
+        """
+        Process a single frame and return crowd density results.
+        
+        Args:
+            frame: BGR image from OpenCV [H, W, 3]
+            area_sqm: Override area in square meters (uses config default if None)
+            stream_id: Camera/stream the frame belongs to (selects its smoothing ring)
+            return_density_map: Copy the density map to the host (None = config
+                                default); False skips the transfer when only
+                                the count and statistics are needed
+            
+        Returns:
+            InferenceResult with count, density map, and classification
+        """
+        start_time = time.perf_counter()
+        
+        # Use provided area or config default
+        area = area_sqm if area_sqm is not None else self.config.area_sqm
+        
+        pending = self._upload(frame)
+        return self._finalize(
+            *self._launch(*pending), area, start_time, stream_id, return_density_map
+        )
+    
+    @torch.inference_mode()
+    def process_batch(
+        self,
+        frames: List[np.ndarray],
+        area_sqm: Optional[Union[float, List[Optional[float]]]] = None,
+        stream_ids: Optional[List[Optional[Hashable]]] = None,
+        return_density_map: Optional[bool] = None
+    ) -> List[InferenceResult]:
+        """
+        Process several frames (e.g. one per camera) in one forward pass.
+        
+        Frames with the same shape are stacked into batches of up to
+        EngineConfig.max_batch_size; frames of other sizes form batches
+        of their own. Each result's
+        processing_time_ms is its batch's time divided by the batch size.
+        
+        Args:
+            frames: BGR images from OpenCV [H, W, 3]
+            area_sqm: Area for all frames, or one per frame (None = config default)
+            stream_ids: Stream of each frame, for per-stream smoothing
+                        (None = all frames belong to the default stream)
+            return_density_map: Copy the density maps to the host (None = config default)
+            
+        Returns:
+            InferenceResult per frame, in input order
+        """
+        n = len(frames)
+        if not isinstance(area_sqm, (list, tuple)):
+            area_sqm = [area_sqm] * n
+        areas = [a if a is not None else self.config.area_sqm for a in area_sqm]
+        if stream_ids is None:
+            stream_ids = [None] * n
+        
+        # Same input shape -> same preprocessed shape -> stackable
+        groups: Dict[Tuple[int, ...], List[int]] = {}
+        for i, frame in enumerate(frames):
+            groups.setdefault(frame.shape, []).append(i)
+        
+        max_batch = max(1, self.config.max_batch_size)
+        batches = [
+            group[k:k + max_batch]
+            for group in groups.values()
+            for k in range(0, len(group), max_batch)
+        ]
+        
+        results: List[Optional[InferenceResult]] = [None] * n
+        for indices in batches:
+            start_time = time.perf_counter()
+            
+            tensors = []
+            infos = []
+            for i in indices:
+                tensor, info = self._prepare(*self._upload(frames[i]))
+                tensors.append(tensor)
+                infos.append(info)
+            
+            density_map, stats = self._forward(torch.cat(tensors, dim=0))
+            maps, frame_stats = self._fetch(density_map, stats, return_density_map)
+            
+            processing_time = (time.perf_counter() - start_time) * 1000 / len(indices)
+            for j, i in enumerate(indices):
+                results[i] = self._build_result(
+                    maps[j], frame_stats[j], infos[j], areas[i], processing_time, stream_ids[i]
+                )
+                self._attach_device_outputs(results[i], density_map[j, 0], infos[j])
+        
+        return results
+    
+    @torch.inference_mode()
+    def process_stream(
+        self,
+        frames: Iterable[np.ndarray],
+        area_sqm: Optional[float] = None
+    ) -> Iterator[InferenceResult]:
+        """
+        Process a sequence of frames, pipelining preprocessing and upload
+        of frame N+1 with inference of frame N.
+        
+        Results are yielded in order and are identical to calling
+        process() on each frame; only the overlap differs.
+        
+        Args:
+            frames: Iterable of BGR images (e.g. a video source generator)
+            area_sqm: Override area in square meters (uses config default if None)
+            
+        Yields:
+            InferenceResult per frame
+        """
+        area = area_sqm if area_sqm is not None else self.config.area_sqm
+        frames = iter(frames)
+        
+        first = next(frames, None)
+        if first is None:
+            return
         
-        # Keep only recent history
-        if len(self._count_history) > self.config.smoothing_window:
-            self._count_history = self._count_history[-self.config.smoothing_window:]
+        start_time = time.perf_counter()
+        pending = self._upload(first)
+        
+        for frame in frames:
+            launched = self._launch(*pending)
+            
+            # Stage and upload the next frame while the GPU runs this one
+            next_start = time.perf_counter()
+            pending = self._upload(frame)
+            
+            yield self._finalize(*launched, area, start_time)
+            start_time = next_start
         
-        # Return moving average
-        return sum(self._count_history) / len(self._count_history)
+        yield self._finalize(*self._launch(*pending), area, start_time)
+    
+    def _smooth_count(self, count: float, stream_id: Optional[Hashable] = None) -> float:
+        """Apply temporal smoothing to crowd count (moving average per stream)."""
+        smoother = self._smoothers.get(stream_id)
+        if smoother is None:
+            smoother = _MovingAverage(self.config.smoothing_window)
+            self._smoothers[stream_id] = smoother
+        return smoother.update(count)
     
     def _classify_density(self, density_per_sqm: float) -> str:
         """
@@ -276,16 +855,22 @@ class CrowdDensityEngine:
         else:
             return "CRITICAL"
     
-    def reset_smoothing(self):
-        """Reset temporal smoothing history."""
-        self._count_history.clear()
+    def reset_smoothing(self, stream_id: Optional[Hashable] = None):
+        """
+        Reset temporal smoothing history.
+        
+        Args:
+            stream_id: Stream to reset (None = all streams)
+        """
+        if stream_id is None:
+            self._smoothers.clear()
+        else:
+            self._smoothers.pop(stream_id, None)
     
     @property
     def average_inference_time(self) -> float:
-        """Get average inference time in milliseconds."""
-        if not self._inference_times:
-            return 0.0
-        return sum(self._inference_times) / len(self._inference_times)
+        """Get average inference time in milliseconds (over recent frames)."""
+        return self._inference_times.mean
     
     @property
     def fps(self) -> float:
@@ -302,8 +887,9 @@ class CrowdDensityEngine:
             "estimated_fps": round(self.fps, 1),
             "device": str(self.device),
             "model_type": self.config.model_type,
-            "using_half_precision": self.config.use_half_precision,
-            "total_frames_processed": len(self._inference_times)
+            "using_half_precision": self._use_half,
+            "backend": self.config.backend,
+            "total_frames_processed": self._frames_processed
         }
     
     def warmup(self, num_iterations: int = 5):
@@ -317,19 +903,135 @@ class CrowdDensityEngine:
         """
         print("Warming up model...")
         
-        # Create dummy input
-        dummy = np.zeros((480, 640, 3), dtype=np.uint8)
+        # Create dummy input (at the real frame size when known, so the
+        # TensorRT profile / CUDA graphs for it are built here)
+        frame_h, frame_w = self.config.input_size or (480, 640)
+        dummy = np.zeros((frame_h, frame_w, 3), dtype=np.uint8)
         
         for _ in range(num_iterations):
             self.process(dummy)
         
         # Clear history after warmup
-        self._inference_times.clear()
-        self._count_history.clear()
+        self._inference_times.reset()
+        self._frames_processed = 0
+        self.reset_smoothing()
         
         print(f"Warmup complete. Average inference: {self.average_inference_time:.1f}ms")
 
 
+class MicroBatcher:
+    """
+    Collects frames submitted from several threads into batches for
+    CrowdDensityEngine.process_batch.
+    
+    A batch is run as soon as max_batch frames are queued, or max_wait_ms
+    after its first frame arrived, trading a little latency for GPU
+    throughput.
+    
+    Example:
+        ```python
+        batcher = MicroBatcher(engine, max_batch=8, max_wait_ms=20)
+        batcher.start()
+        
+        future = batcher.submit(frame, stream_id="cam1")
+        result = future.result()
+        ```
+    
+    Args:
+        engine: Inference engine to run batches on
+        max_batch: Maximum frames per forward pass
+        max_wait_ms: Maximum time the oldest queued frame waits for a batch to fill
+    """
+    
+    def __init__(
+        self,
+        engine: CrowdDensityEngine,
+        max_batch: int = 8,
+        max_wait_ms: float = 20.0
+    ):
+        self.engine = engine
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        
+        self._queue: queue.Queue = queue.Queue()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start the batching thread."""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the batching thread; frames still queued are cancelled."""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        
+        while True:
+            try:
+                _, _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+    
+    def submit(
+        self,
+        frame: np.ndarray,
+        stream_id: Optional[Hashable] = None,
+        area_sqm: Optional[float] = None
+    ) -> Future:
+        """
+        Queue a frame for batched inference.
+        
+        Returns:
+            Future resolving to the frame's InferenceResult
+        """
+        future: Future = Future()
+        self._queue.put((frame, stream_id, area_sqm, future))
+        return future
+    
+    def _run(self):
+        """Batching loop."""
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            
+            frames, stream_ids, areas, futures = zip(*batch)
+            try:
+                results = self.engine.process_batch(
+                    list(frames), area_sqm=list(areas), stream_ids=list(stream_ids)
+                )
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+
 def create_engine(
     weights_path: Optional[str] = None,
     area_sqm: float = 100.0,
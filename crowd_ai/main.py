@@ -14,8 +14,17 @@ Usage:
     # RTSP camera
     python -m crowd_ai.main --source "rtsp://192.168.1.100/stream"
     
+    # TensorRT FP16 (NVIDIA GPU, requires onnxruntime-gpu)
+    python -m crowd_ai.main --backend trt_fp16
+    
     # Video file
     python -m crowd_ai.main --source "test_video.mp4"
+    
+    # Check camera and display without a model
+    python -m crowd_ai.main --demo
+    
+    # Save annotated output with NVIDIA hardware encoding
+    python -m crowd_ai.main --output out.mp4 --encoder nvenc
 
 Key Features:
 - CSRNet-based density estimation (PyTorch)
@@ -33,8 +42,12 @@ All components are free and open-source.
 """
 
 import argparse
+import queue
+import re
 import sys
+import threading
 import time
+from collections import deque
 from pathlib import Path
 
 import cv2
@@ -102,6 +115,33 @@ Examples:
         help="Input scale factor (default: 0.5 = half resolution)"
     )
     
+    parser.add_argument(
+        "--backend",
+        default="pytorch",
+        choices=["pytorch", "onnx", "trt_fp16", "trt_int8"],
+        help="Inference backend (trt_* = TensorRT via ONNX Runtime, engine cached on disk)"
+    )
+    
+    parser.add_argument(
+        "--target-fps",
+        type=float,
+        default=None,
+        help="Process about this many frames per second of video; others are skipped before decoding"
+    )
+    
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=1,
+        help="Max frames per forward pass; > 1 decodes on a background thread (default: 1)"
+    )
+    
+    parser.add_argument(
+        "--calibration-images",
+        default=None,
+        help="Image folder or video source for trt_int8 calibration (used once, on first run)"
+    )
+    
     # Output options
     parser.add_argument(
         "--no-display",
@@ -115,12 +155,25 @@ Examples:
         help="Save output to video file"
     )
     
+    parser.add_argument(
+        "--encoder",
+        default="mp4v",
+        choices=["mp4v", "nvenc"],
+        help="Encoder for --output; nvenc = NVIDIA hardware H.264, falls back to mp4v (default: mp4v)"
+    )
+    
     parser.add_argument(
         "--dashboard",
         action="store_true",
         help="Show full dashboard view with statistics"
     )
     
+    parser.add_argument(
+        "--demo",
+        action="store_true",
+        help="Run without a model, showing synthetic density maps (UI/camera check)"
+    )
+    
     # Debug options
     parser.add_argument(
         "--debug",
@@ -131,6 +184,156 @@ Examples:
     return parser.parse_args()
 
 
+def _create_video_writer(path, fps, size, encoder="mp4v"):
+    """
+    Open a VideoWriter, preferring hardware (NVENC) encoding if requested.
+    
+    Args:
+        path: Output video file path
+        fps: Output frame rate
+        size: Frame size as (width, height)
+        encoder: "mp4v" (CPU) or "nvenc"
+        
+    Returns:
+        Opened cv2.VideoWriter
+    """
+    if encoder == "nvenc":
+        build_info = cv2.getBuildInformation()
+        
+        if re.search(r"GStreamer:\s+YES", build_info):
+            pipeline = (
+                "appsrc ! videoconvert ! nvh264enc ! h264parse ! mp4mux ! "
+                f'filesink location="{path}"'
+            )
+            writer = cv2.VideoWriter(pipeline, cv2.CAP_GSTREAMER, 0, fps, size)
+            if writer.isOpened():
+                print("Encoding with NVENC (GStreamer)")
+                return writer
+            writer.release()
+        
+        # FFmpeg backend: let OpenCV pick a hardware H.264 encoder
+        writer = cv2.VideoWriter(path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*'avc1'), fps, size, [
+            cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY
+        ])
+        if writer.isOpened():
+            print("Encoding with hardware H.264 (FFmpeg)")
+            return writer
+        writer.release()
+        
+        print("Warning: Hardware encoding unavailable, using mp4v")
+    
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+
+class _DisplayThread:
+    """
+    Shows and saves rendered frames off the inference thread.
+    
+    cv2.imshow/waitKey and VideoWriter.write (several ms per frame for
+    mp4v) run here, so they overlap with inference instead of adding to
+    it. All HighGUI calls stay on this one thread.
+    """
+    
+    def __init__(self, window_name, video_writer=None, show=True, max_queue=2):
+        """
+        Args:
+            window_name: HighGUI window title
+            video_writer: Optional cv2.VideoWriter to save frames to
+            show: Whether to display frames in a window
+            max_queue: Rendered frames allowed to wait for display
+        """
+        self.window_name = window_name
+        self.video_writer = video_writer
+        self.show = show
+        self._frames = queue.Queue(maxsize=max_queue)
+        self._keys = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="display", daemon=True)
+        self.frames_dropped = 0
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def submit(self, display, fps=None):
+        """
+        Queue a rendered frame (the caller must not modify it afterwards).
+        
+        Frames are dropped when the queue is full so the GUI never
+        throttles inference; when saving to video the call waits
+        instead, so the file keeps every frame.
+        
+        Args:
+            display: BGR frame to show/save
+            fps: Optional FPS value to draw in the top-right corner
+            
+        Returns:
+            False if the frame was dropped
+        """
+        try:
+            self._frames.put((display, fps), block=self.video_writer is not None)
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+    
+    def poll_key(self):
+        """Return the next key pressed in the window, or None."""
+        try:
+            return self._keys.get_nowait()
+        except queue.Empty:
+            return None
+    
+    def stop(self):
+        """Flush queued frames and stop the thread."""
+        if self._thread.is_alive():
+            self._frames.put(None)
+            self._thread.join()
+    
+    def _run(self):
+        while True:
+            try:
+                item = self._frames.get(timeout=0.05)
+            except queue.Empty:
+                # Keep the window responsive between frames
+                if self.show:
+                    self._read_key(None)
+                continue
+            
+            if item is None:
+                break
+            
+            display, fps = item
+            if fps is not None:
+                cv2.putText(
+                    display, f"FPS: {fps:.1f}",
+                    (display.shape[1] - 100, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2
+                )
+            
+            if self.video_writer is not None:
+                self.video_writer.write(display)
+            
+            if self.show:
+                cv2.imshow(self.window_name, display)
+                self._read_key(display)
+        
+        if self.show:
+            cv2.destroyAllWindows()
+    
+    def _read_key(self, display):
+        key = cv2.waitKey(1) & 0xFF
+        if key == 0xFF:
+            return
+        
+        # Screenshots need the frame on screen, so they're handled here
+        if key == ord('s') and display is not None:
+            screenshot_path = f"screenshot_{int(time.time())}.png"
+            cv2.imwrite(screenshot_path, display)
+            print(f"Screenshot saved: {screenshot_path}")
+        else:
+            self._keys.put(key)
+
+
 def run_demo(args):
     """
     Run the crowd density estimation demo.
@@ -142,10 +345,10 @@ def run_demo(args):
     4. Displays heatmap visualization
     """
     # Import modules (import here for faster --help)
-    from .capture import WebcamSource, RTSPSource, VideoFileSource, create_video_source
+    from .capture import WebcamSource, RTSPSource, VideoFileSource, create_video_source, iter_frame_batches
     from .models import load_csrnet_model, create_mock_model
     from .inference import CrowdDensityEngine, EngineConfig, DensityAnalyzer
-    from .visualization import DensityVisualizer, create_dashboard_frame
+    from .visualization import DensityVisualizer, DashboardRenderer
     from .calibration import get_preset_calibration, CameraCalibration
     
     print("=" * 60)
@@ -190,16 +393,26 @@ def run_demo(args):
         model_type="lite" if args.lite else "standard",
         weights_path=args.weights,
         scale_factor=args.scale,
+        input_size=(frame_h, frame_w),
         area_sqm=area_sqm,
         use_cuda=True,  # Will fall back to CPU if not available
+        backend=args.backend,
+        calibration_images=args.calibration_images,
+        reuse_density_buffer=True,  # Map is only used within each loop iteration
+        keep_device_outputs=True,  # Render the heatmap overlay on the GPU
     )
     
-    try:
-        engine = CrowdDensityEngine(config)
-    except Exception as e:
-        print(f"Warning: Could not load full model: {e}")
-        print("Using mock model for demo (results will not be accurate)")
-        engine = None  # Will use simple demo mode
+    if args.demo:
+        print("Demo mode: no model loaded, density maps are synthetic")
+        engine = None
+    else:
+        try:
+            engine = CrowdDensityEngine(config)
+        except Exception as e:
+            print(f"ERROR: Could not load model: {e}")
+            print("Check --weights/--backend, or run with --demo to test the camera and display without a model.")
+            source.close()
+            return 1
     
     # Create visualizer
     visualizer = DensityVisualizer(
@@ -209,119 +422,177 @@ def run_demo(args):
         show_density_bar=True
     )
     
+    # Dashboards are drawn into reused canvases; the rotation covers the
+    # display thread's queue plus the frame being shown/encoded
+    dashboard_renderer = DashboardRenderer(num_buffers=4)
+    
     # Create density analyzer
     analyzer = DensityAnalyzer(area_sqm=area_sqm)
     
     # Setup video writer if output specified
     video_writer = None
     if args.output:
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out_w = 800 if args.dashboard else frame_w
         out_h = 600 if args.dashboard else frame_h
-        video_writer = cv2.VideoWriter(args.output, fourcc, 30.0, (out_w, out_h))
+        video_writer = _create_video_writer(args.output, 30.0, (out_w, out_h), encoder=args.encoder)
         print(f"Saving output to: {args.output}")
     
+    # Display and video encoding run on their own thread
+    display_thread = _DisplayThread(
+        "Crowd Density Estimation",
+        video_writer=video_writer,
+        show=not args.no_display
+    ).start()
+    
     # Warmup
     if engine:
         print("\nWarming up model...")
         engine.warmup(3)
+        if args.dashboard:
+            analyzer.warmup()
     
     print("\n" + "=" * 60)
     print("Starting real-time processing...")
     print("Press 'q' to quit, 's' to save screenshot")
     print("=" * 60 + "\n")
     
+    # Demo mode cycles through precomputed synthetic outputs instead of
+    # allocating a random map every frame
+    if engine is None:
+        demo_rng = np.random.default_rng(0)
+        demo_maps = demo_rng.random((32, frame_h // 8, frame_w // 8), dtype=np.float32) * 0.1
+        demo_counts = demo_rng.integers(10, 100, size=32)
+    
     # Statistics tracking
     frame_count = 0
     start_time = time.time()
     fps_update_interval = 30
     display_fps = 0.0
     
-    try:
-        for frame, metadata in source.frames():
-            frame_count += 1
-            
-            # Run inference
-            if engine:
-                result = engine.process(frame, area_sqm=area_sqm)
-                crowd_count = result.crowd_count
-                density_map = result.density_map
-                density_level = result.density_level
-                processing_ms = result.processing_time_ms
-            else:
-                # Demo mode without model - generate synthetic output
-                crowd_count = np.random.randint(10, 100)
-                h, w = frame.shape[:2]
-                density_map = np.random.rand(h // 8, w // 8).astype(np.float32) * 0.1
-                density_level = "DEMO"
-                processing_ms = 0.0
+    # With --batch > 1, frames are decoded on a background thread and
+    # inferred in batches of whatever has queued up (at most --batch)
+    if args.batch > 1:
+        batches = iter_frame_batches(
+            source,
+            max_batch=args.batch,
+            drop_old=not isinstance(source, VideoFileSource),  # Files: keep every frame
+            target_fps=args.target_fps
+        )
+    else:
+        batches = ([item] for item in source.frames(target_fps=args.target_fps))
+    
+    def run_inference():
+        """Yield (frames, results) for each batch."""
+        if engine is None:
+            for batch in batches:
+                yield [frame for frame, _ in batch], [None] * len(batch)
+        elif args.batch > 1:
+            for batch in batches:
+                frames = [frame for frame, _ in batch]
+                if len(frames) > 1:
+                    yield frames, engine.process_batch(frames, area_sqm=area_sqm)
+                else:
+                    yield frames, [engine.process(frames[0], area_sqm=area_sqm)]
+        else:
+            # One frame at a time: process_stream uploads frame N+1 while
+            # the GPU runs frame N
+            queued = deque()
             
-            # Update FPS counter
-            if frame_count % fps_update_interval == 0:
-                elapsed = time.time() - start_time
-                display_fps = frame_count / elapsed
+            def stream_frames():
+                for batch in batches:
+                    frame = batch[0][0]
+                    queued.append(frame)
+                    yield frame
             
-            # Generate visualization
-            if args.dashboard:
-                # Full dashboard view
-                stats = analyzer.analyze(density_map, crowd_count) if engine else None
-                display = create_dashboard_frame(
-                    frame, density_map,
-                    stats=stats,
-                    count=crowd_count,
-                    density_level=density_level,
-                    fps=display_fps
-                )
-            else:
-                # Simple heatmap overlay
-                display = visualizer.visualize(
-                    frame, density_map,
-                    count=crowd_count,
-                    density_level=density_level
-                )
+            for result in engine.process_stream(stream_frames(), area_sqm=area_sqm):
+                yield [queued.popleft()], [result]
+    
+    try:
+        quit_requested = False
+        for frames, results in run_inference():
+            for frame, result in zip(frames, results):
+                frame_count += 1
                 
-                # Add FPS counter
-                cv2.putText(
-                    display, f"FPS: {display_fps:.1f}",
-                    (display.shape[1] - 100, 30),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2
-                )
-            
-            # Save to video if specified
-            if video_writer:
-                video_writer.write(display)
-            
-            # Display
-            if not args.no_display:
-                cv2.imshow("Crowd Density Estimation", display)
+                if result is not None:
+                    crowd_count = result.crowd_count
+                    density_map = result.density_map
+                    density_level = result.density_level
+                    processing_ms = result.processing_time_ms
+                else:
+                    # Demo mode without model - synthetic output
+                    crowd_count = int(demo_counts[frame_count & 31])
+                    density_map = demo_maps[frame_count & 31]
+                    density_level = "DEMO"
+                    processing_ms = 0.0
+                
+                # Update FPS counter
+                if frame_count % fps_update_interval == 0:
+                    elapsed = time.time() - start_time
+                    display_fps = frame_count / elapsed
                 
-                key = cv2.waitKey(1) & 0xFF
+                # Generate visualization
+                if args.dashboard:
+                    # Full dashboard view
+                    stats = analyzer.analyze(density_map, crowd_count) if engine else None
+                    display = dashboard_renderer.render(
+                        frame, density_map,
+                        stats=stats,
+                        count=crowd_count,
+                        density_level=density_level,
+                        fps=display_fps,
+                        device_frame=result.device_frame if result is not None else None,
+                        device_density_map=result.device_density_map if result is not None else None
+                    )
+                    display_thread.submit(display)
+                else:
+                    # Simple heatmap overlay (on the GPU when the engine
+                    # kept the frame and map there)
+                    if result is not None and result.device_density_map is not None:
+                        display = visualizer.visualize(
+                            result.device_frame, result.device_density_map,
+                            count=crowd_count,
+                            density_level=density_level
+                        )
+                    else:
+                        display = visualizer.visualize(
+                            frame, density_map,
+                            count=crowd_count,
+                            density_level=density_level
+                        )
+                    
+                    # FPS counter is drawn by the display thread
+                    display_thread.submit(display, fps=display_fps)
                 
-                if key == ord('q'):
+                # Key presses are forwarded by the display thread
+                if display_thread.poll_key() == ord('q'):
                     print("\nQuitting...")
+                    quit_requested = True
                     break
-                elif key == ord('s'):
-                    screenshot_path = f"screenshot_{int(time.time())}.png"
-                    cv2.imwrite(screenshot_path, display)
-                    print(f"Screenshot saved: {screenshot_path}")
+                
+                # Print periodic status to console (every 30 frames)
+                if frame_count % 30 == 0:
+                    print(f"[Frame {frame_count}] Count: {crowd_count:.0f} | "
+                          f"Level: {density_level} | "
+                          f"Density: {crowd_count/area_sqm:.2f} p/sqm | "
+                          f"FPS: {display_fps:.1f}")
+                
+                # Visualizations render into new arrays, so the captured
+                # frame can go back to the pool for the next read
+                source.release_frame(frame)
             
-            # Print periodic status to console (every 30 frames)
-            if frame_count % 30 == 0:
-                print(f"[Frame {frame_count}] Count: {crowd_count:.0f} | "
-                      f"Level: {density_level} | "
-                      f"Density: {crowd_count/area_sqm:.2f} p/sqm | "
-                      f"FPS: {display_fps:.1f}")
+            if quit_requested:
+                break
     
     except KeyboardInterrupt:
         print("\nInterrupted by user")
     
     finally:
-        # Cleanup
+        # Cleanup (stop the capture thread before closing its source)
+        batches.close()
         source.close()
+        display_thread.stop()
         if video_writer:
             video_writer.release()
-        if not args.no_display:
-            cv2.destroyAllWindows()
         
         # Print summary
         elapsed = time.time() - start_time
@@ -331,6 +602,8 @@ def run_demo(args):
         print(f"Total frames processed: {frame_count}")
         print(f"Total time: {elapsed:.1f} seconds")
         print(f"Average FPS: {frame_count / elapsed:.1f}")
+        if display_thread.frames_dropped:
+            print(f"Frames not displayed (GUI behind): {display_thread.frames_dropped}")
         
         if engine:
             stats = engine.get_performance_stats()
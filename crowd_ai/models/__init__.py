@@ -6,8 +6,23 @@ Based on the paper: "CSRNet: Dilated Convolutional Neural Networks
 for Understanding the Highly Congested Scenes" (CVPR 2018)
 """
 
-from .csrnet import CSRNet, CSRNetLite, get_model_info
-from .model_loader import load_csrnet_model, download_pretrained_weights, create_mock_model
+import importlib
+
+# Submodules import torch, so they are loaded on first attribute access
+# (PEP 562) rather than when the package is imported
+_EXPORTS = {
+    "CSRNet": ".csrnet",
+    "CSRNetLite": ".csrnet",
+    "get_model_info": ".csrnet",
+    "load_csrnet_model": ".model_loader",
+    "download_pretrained_weights": ".model_loader",
+    "create_mock_model": ".model_loader",
+    "CUDAGraphRunner": ".model_loader",
+    "ONNXCSRNetRunner": ".onnx_backend",
+    "export_csrnet_onnx": ".onnx_backend",
+    "build_int8_calibration_table": ".onnx_backend",
+    "ORT_AVAILABLE": ".onnx_backend",
+}
 
 __all__ = [
     "CSRNet", 
@@ -15,5 +30,22 @@ __all__ = [
     "get_model_info",
     "load_csrnet_model", 
     "download_pretrained_weights",
-    "create_mock_model"
+    "create_mock_model",
+    "CUDAGraphRunner",
+    "ONNXCSRNetRunner",
+    "export_csrnet_onnx",
+    "build_int8_calibration_table",
+    "ORT_AVAILABLE"
 ]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value  # Cache so __getattr__ isn't hit again
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -13,9 +13,95 @@ Li, Y., Zhang, X., & Chen, D. (2018). CSRNet: Dilated convolutional
 neural networks for understanding the highly congested scenes. CVPR.
 """
 
+import os
+from typing import List
+
 import torch
 import torch.nn as nn
-import torchvision
+
+
+# Number of VGG-16 feature layers used as the frontend (up to conv4_3 + ReLU)
+VGG_FRONTEND_LAYERS = 23
+
+
+def _build_frontend_layers() -> List[nn.Module]:
+    """
+    Build the VGG-16 frontend (first 10 conv layers) from scratch.
+    
+    Layer indices match torchvision's vgg16().features, so pretrained
+    VGG weights and saved CSRNet checkpoints load by index.
+    """
+    return [
+        # Block 1
+        nn.Conv2d(3, 64, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(64, 64, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.MaxPool2d(kernel_size=2, stride=2),
+        
+        # Block 2
+        nn.Conv2d(64, 128, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(128, 128, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.MaxPool2d(kernel_size=2, stride=2),
+        
+        # Block 3
+        nn.Conv2d(128, 256, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(256, 256, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(256, 256, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.MaxPool2d(kernel_size=2, stride=2),
+        
+        # Block 4 (partial)
+        nn.Conv2d(256, 512, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(512, 512, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(512, 512, kernel_size=3, padding=1),
+        nn.ReLU(inplace=True),
+    ]
+
+
+def _load_pretrained_frontend(frontend: nn.Sequential):
+    """
+    Copy ImageNet VGG-16 weights into a frontend built by _build_frontend_layers().
+    
+    Only the checkpoint's feature tensors are read (memory-mapped where
+    supported); the full VGG model and its ~470 MB classifier head are
+    never built. Keeps the random initialization if the weights cannot
+    be downloaded (e.g. offline).
+    """
+    import torchvision  # Only needed for the pretrained weights URL
+    
+    url = torchvision.models.VGG16_Weights.DEFAULT.url
+    checkpoint = os.path.join(torch.hub.get_dir(), "checkpoints", os.path.basename(url))
+    
+    try:
+        if not os.path.exists(checkpoint):
+            os.makedirs(os.path.dirname(checkpoint), exist_ok=True)
+            torch.hub.download_url_to_file(url, checkpoint)
+        try:
+            state_dict = torch.load(checkpoint, map_location="cpu", weights_only=True, mmap=True)
+        except TypeError:
+            # torch < 2.1 has no mmap
+            state_dict = torch.load(checkpoint, map_location="cpu", weights_only=True)
+    except Exception as e:
+        print(f"Warning: Could not load pretrained VGG-16 weights: {e}")
+        print("Frontend keeps random initialization.")
+        return
+    
+    # "features.<index>.<param>" -> "<index>.<param>" for the frontend layers
+    frontend_state = {}
+    for key, tensor in state_dict.items():
+        if key.startswith("features."):
+            index, name = key[len("features."):].split(".", 1)
+            if int(index) < VGG_FRONTEND_LAYERS:
+                frontend_state[f"{index}.{name}"] = tensor
+    
+    frontend.load_state_dict(frontend_state, strict=True)
 
 
 class CSRNet(nn.Module):
@@ -56,48 +142,13 @@ class CSRNet(nn.Module):
         """
         # VGG-16 configuration for first 10 conv layers
         # [64, 64, 'M', 128, 128, 'M', 256, 256, 256, 'M', 512, 512, 512]
-        # We use layers up to conv4_3 (10 conv layers)
+        # We use layers up to conv4_3 (index 22 in VGG features)
+        frontend = nn.Sequential(*_build_frontend_layers())
         
         if load_pretrained:
-            vgg = torchvision.models.vgg16(weights=torchvision.models.VGG16_Weights.DEFAULT)
-            # Extract features up to conv4_3 (index 22 in VGG features)
-            frontend_layers = list(vgg.features.children())[:23]
-        else:
-            # Build from scratch
-            frontend_layers = [
-                # Block 1
-                nn.Conv2d(3, 64, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.Conv2d(64, 64, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.MaxPool2d(kernel_size=2, stride=2),
-                
-                # Block 2
-                nn.Conv2d(64, 128, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.Conv2d(128, 128, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.MaxPool2d(kernel_size=2, stride=2),
-                
-                # Block 3
-                nn.Conv2d(128, 256, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.Conv2d(256, 256, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.Conv2d(256, 256, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.MaxPool2d(kernel_size=2, stride=2),
-                
-                # Block 4 (partial)
-                nn.Conv2d(256, 512, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.Conv2d(512, 512, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-                nn.Conv2d(512, 512, kernel_size=3, padding=1),
-                nn.ReLU(inplace=True),
-            ]
+            _load_pretrained_frontend(frontend)
         
-        return nn.Sequential(*frontend_layers)
+        return frontend
     
     def _make_backend(self) -> nn.Sequential:
         """
@@ -158,11 +209,12 @@ class CSRNet(nn.Module):
         # Backend: Dilated convolutions (maintains spatial size)
         density_features = self.backend(features)
         
-        # Output: Generate density map (ReLU ensures non-negative values)
+        # Output: Generate density map (ReLU ensures non-negative values;
+        # in place, so no second 1-channel tensor is allocated in eager
+        # mode, and torch.compile fuses it into the conv epilogue)
         density_map = self.output_layer(density_features)
-        density_map = torch.relu(density_map)
         
-        return density_map
+        return torch.relu_(density_map)
     
     def count(self, density_map: torch.Tensor) -> torch.Tensor:
         """
@@ -189,14 +241,9 @@ class CSRNetLite(nn.Module):
         super(CSRNetLite, self).__init__()
         
         # Use same frontend
+        self.frontend = nn.Sequential(*_build_frontend_layers())
         if load_pretrained_vgg:
-            vgg = torchvision.models.vgg16(weights=torchvision.models.VGG16_Weights.DEFAULT)
-            frontend_layers = list(vgg.features.children())[:23]
-        else:
-            # Simplified frontend definition
-            frontend_layers = self._build_frontend_layers()
-        
-        self.frontend = nn.Sequential(*frontend_layers)
+            _load_pretrained_frontend(self.frontend)
         
         # Lighter backend: fewer channels
         backend_config = [256, 256, 128, 64, 32]
@@ -216,24 +263,6 @@ class CSRNetLite(nn.Module):
         
         self._initialize_weights()
     
-    def _build_frontend_layers(self):
-        """Build frontend layers from scratch."""
-        return [
-            nn.Conv2d(3, 64, 3, padding=1), nn.ReLU(inplace=True),
-            nn.Conv2d(64, 64, 3, padding=1), nn.ReLU(inplace=True),
-            nn.MaxPool2d(2, 2),
-            nn.Conv2d(64, 128, 3, padding=1), nn.ReLU(inplace=True),
-            nn.Conv2d(128, 128, 3, padding=1), nn.ReLU(inplace=True),
-            nn.MaxPool2d(2, 2),
-            nn.Conv2d(128, 256, 3, padding=1), nn.ReLU(inplace=True),
-            nn.Conv2d(256, 256, 3, padding=1), nn.ReLU(inplace=True),
-            nn.Conv2d(256, 256, 3, padding=1), nn.ReLU(inplace=True),
-            nn.MaxPool2d(2, 2),
-            nn.Conv2d(256, 512, 3, padding=1), nn.ReLU(inplace=True),
-            nn.Conv2d(512, 512, 3, padding=1), nn.ReLU(inplace=True),
-            nn.Conv2d(512, 512, 3, padding=1), nn.ReLU(inplace=True),
-        ]
-    
     def _initialize_weights(self):
         for module in self.backend.modules():
             if isinstance(module, nn.Conv2d):
@@ -247,7 +276,7 @@ class CSRNetLite(nn.Module):
         features = self.frontend(x)
         density_features = self.backend(features)
         density_map = self.output_layer(density_features)
-        return torch.relu(density_map)
+        return torch.relu_(density_map)
     
     def count(self, density_map: torch.Tensor) -> torch.Tensor:
         return density_map.sum(dim=(1, 2, 3))
@@ -263,12 +292,21 @@ def get_model_info(model: nn.Module) -> dict:
     Returns:
         Dictionary with model statistics
     """
-    total_params = sum(p.numel() for p in model.parameters())
-    trainable_params = sum(p.numel() for p in model.parameters() if p.requires_grad)
+    total_params = 0
+    trainable_params = 0
+    total_bytes = 0
+    
+    # Single pass over the parameters
+    for p in model.parameters():
+        numel = p.numel()
+        total_params += numel
+        if p.requires_grad:
+            trainable_params += numel
+        total_bytes += numel * p.element_size()
     
     return {
         "total_parameters": total_params,
         "trainable_parameters": trainable_params,
-        "total_params_mb": total_params * 4 / (1024 * 1024),  # Assuming float32
+        "total_params_mb": total_bytes / (1024 * 1024),  # Actual dtype (FP16 = half of FP32)
         "model_class": model.__class__.__name__
     }
@@ -4,10 +4,12 @@ Model Loader Module
 Utilities for loading CSRNet models and pretrained weights.
 """
 
+import hashlib
 import os
+import urllib.error
 import urllib.request
 from pathlib import Path
-from typing import Optional, Union
+from typing import Dict, Optional, Tuple, Union
 
 import torch
 
@@ -24,6 +26,75 @@ PRETRAINED_WEIGHTS_URLS = {
 # Default weights directory
 DEFAULT_WEIGHTS_DIR = Path(__file__).parent.parent / "weights"
 
+# Download chunk size (streamed to disk, never held in memory)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _sha256_file(path: Path) -> str:
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _download_file(url: str, dest: Path) -> str:
+    """
+    Stream a URL to dest via a .tmp file, resuming a partial download.
+    
+    The file only appears at dest once complete (atomic rename), so an
+    interrupted run never leaves a truncated checkpoint behind.
+    
+    Args:
+        url: File URL
+        dest: Destination path
+        
+    Returns:
+        SHA-256 hex digest of the downloaded file
+    """
+    tmp_path = dest.with_suffix(dest.suffix + ".tmp")
+    offset = tmp_path.stat().st_size if tmp_path.exists() else 0
+    
+    request = urllib.request.Request(url)
+    if offset:
+        request.add_header("Range", f"bytes={offset}-")
+    
+    try:
+        response = urllib.request.urlopen(request, timeout=30)
+    except urllib.error.HTTPError as e:
+        if e.code != 416:  # 416: partial file is already complete (or stale)
+            raise
+        offset = 0
+        response = urllib.request.urlopen(url, timeout=30)
+    
+    with response:
+        if offset and response.status == 206:
+            print(f"Resuming download at {offset / 1e6:.1f} MB")
+            mode = "ab"
+        else:
+            mode = "wb"  # Server ignored Range; start over
+        
+        total = response.headers.get("Content-Length")
+        
+        with open(tmp_path, mode) as f:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            
+            received = 0
+            for chunk in iter(lambda: response.read(DOWNLOAD_CHUNK_SIZE), b""):
+                f.write(chunk)
+                received += len(chunk)
+            
+            f.flush()
+            os.fsync(f.fileno())
+    
+    if total is not None and received != int(total):
+        raise IOError(f"Download incomplete ({received} of {total} bytes); re-run to resume")
+    
+    os.replace(tmp_path, dest)
+    return _sha256_file(dest)
+
 
 def download_pretrained_weights(
     model_name: str = "csrnet_sha",
@@ -44,6 +115,11 @@ def download_pretrained_weights(
     Note:
         SHA = ShanghaiTech Part A (dense crowds)
         SHB = ShanghaiTech Part B (sparse crowds)
+        
+        The SHA-256 of each download is recorded next to it
+        (<name>.pth.sha256) and checked on later calls; a file that no
+        longer matches is downloaded again. Interrupted downloads
+        resume from the partial <name>.pth.tmp file.
     """
     if model_name not in PRETRAINED_WEIGHTS_URLS:
         raise ValueError(f"Unknown model: {model_name}. Available: {list(PRETRAINED_WEIGHTS_URLS.keys())}")
@@ -53,16 +129,28 @@ def download_pretrained_weights(
     
     filename = f"{model_name}.pth"
     weights_path = save_dir / filename
+    checksum_path = save_dir / f"{filename}.sha256"
     
     if weights_path.exists() and not force_download:
-        print(f"Weights already exist at {weights_path}")
-        return weights_path
+        if not checksum_path.exists():
+            # Downloaded before checksums were recorded; trust it once
+            checksum_path.write_text(_sha256_file(weights_path))
+            print(f"Weights already exist at {weights_path}")
+            return weights_path
+        
+        if _sha256_file(weights_path) == checksum_path.read_text().strip():
+            print(f"Weights already exist at {weights_path}")
+            return weights_path
+        
+        print(f"Warning: Checksum mismatch for {weights_path}, downloading again")
     
     url = PRETRAINED_WEIGHTS_URLS[model_name]
     print(f"Downloading {model_name} weights from {url}...")
     
     try:
-        urllib.request.urlretrieve(url, weights_path)
+        if force_download:
+            weights_path.with_suffix(".pth.tmp").unlink(missing_ok=True)
+        checksum_path.write_text(_download_file(url, weights_path))
         print(f"Successfully downloaded to {weights_path}")
     except Exception as e:
         print(f"Warning: Could not download weights: {e}")
@@ -85,7 +173,8 @@ def load_csrnet_model(
         weights_path: Path to model weights file. If None, loads with only VGG pretrained.
         model_type: 'standard' for CSRNet or 'lite' for CSRNetLite
         device: Device to load model on (default: auto-detect)
-        pretrained_vgg: Whether to use pretrained VGG-16 frontend
+        pretrained_vgg: Whether to use pretrained VGG-16 frontend (skipped
+                        when weights_path is given, since it overwrites it)
         
     Returns:
         Loaded CSRNet model ready for inference
@@ -106,6 +195,9 @@ def load_csrnet_model(
     if device is None:
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     
+    # Full weights replace the frontend anyway, so don't fetch ImageNet VGG
+    pretrained_vgg = pretrained_vgg and weights_path is None
+    
     # Create model
     if model_type == "lite":
         model = CSRNetLite(load_pretrained_vgg=pretrained_vgg)
@@ -119,18 +211,31 @@ def load_csrnet_model(
             raise FileNotFoundError(f"Weights file not found: {weights_path}")
         
         print(f"Loading weights from {weights_path}...")
-        state_dict = torch.load(weights_path, map_location=device, weights_only=True)
+        # Load on the CPU (memory-mapped where supported, so tensors are
+        # read straight from the file) and move the model to the device
+        # once, below
+        try:
+            state_dict = torch.load(weights_path, map_location="cpu", weights_only=True, mmap=True)
+        except (TypeError, RuntimeError):
+            # torch < 2.1, or a legacy (non-zipfile) checkpoint that can't be mapped
+            state_dict = torch.load(weights_path, map_location="cpu", weights_only=True)
         
         # Handle different state dict formats
         if "state_dict" in state_dict:
             state_dict = state_dict["state_dict"]
         
-        # Try to load weights (may need key remapping)
-        try:
-            model.load_state_dict(state_dict, strict=True)
-        except RuntimeError as e:
-            print(f"Warning: Strict loading failed, trying non-strict: {e}")
-            model.load_state_dict(state_dict, strict=False)
+        # Checkpoints saved from nn.DataParallel prefix every key
+        if any(key.startswith("module.") for key in state_dict):
+            state_dict = {key.removeprefix("module."): value for key, value in state_dict.items()}
+        
+        # Single pass; report mismatched keys instead of retrying
+        missing, unexpected = model.load_state_dict(state_dict, strict=False)
+        if missing or unexpected:
+            print(f"Warning: Partial weight load ({len(missing)} missing, {len(unexpected)} unexpected keys)")
+            if missing:
+                print(f"  Missing: {missing[:5]}{' ...' if len(missing) > 5 else ''}")
+            if unexpected:
+                print(f"  Unexpected: {unexpected[:5]}{' ...' if len(unexpected) > 5 else ''}")
     
     # Move to device and set to eval mode
     model = model.to(device)
@@ -140,6 +245,74 @@ def load_csrnet_model(
     return model
 
 
+class CUDAGraphRunner:
+    """
+    Replays a model's forward pass as a captured CUDA graph.
+    
+    At batch size 1 the CSRNet forward is dominated by kernel launch
+    overhead; a graph launches the whole network with one call. A graph
+    is captured per input shape/dtype/layout on first use, so a camera
+    with a fixed resolution captures once.
+    
+    The returned tensor is a static output buffer that the next call
+    overwrites, so consume (or copy) it before running another frame.
+    
+    Args:
+        model: Model in eval mode on a CUDA device
+        warmup_iters: Eager iterations run before each capture
+    """
+    
+    def __init__(self, model: torch.nn.Module, warmup_iters: int = 3):
+        self.model = model
+        self.warmup_iters = warmup_iters
+        
+        # (shape, dtype, stride) -> (graph, static input, static output)
+        self._graphs: Dict[Tuple, Tuple[torch.cuda.CUDAGraph, torch.Tensor, torch.Tensor]] = {}
+        # Graphs share one memory pool, so extra shapes cost little memory
+        self._pool = None
+    
+    def _capture(self, x: torch.Tensor) -> Tuple[torch.cuda.CUDAGraph, torch.Tensor, torch.Tensor]:
+        """Capture the forward pass for inputs shaped like x."""
+        static_in = torch.empty_like(x)
+        static_in.copy_(x)
+        
+        # Warm up on a side stream (cuDNN autotuning, lazy allocations)
+        # so none of it ends up in the graph
+        side_stream = torch.cuda.Stream(device=x.device)
+        side_stream.wait_stream(torch.cuda.current_stream(x.device))
+        with torch.cuda.stream(side_stream):
+            for _ in range(self.warmup_iters):
+                self.model(static_in)
+        torch.cuda.current_stream(x.device).wait_stream(side_stream)
+        
+        if self._pool is None:
+            self._pool = torch.cuda.graph_pool_handle()
+        
+        graph = torch.cuda.CUDAGraph()
+        with torch.cuda.graph(graph, pool=self._pool):
+            static_out = self.model(static_in)
+        
+        print(f"Captured CUDA graph for input {tuple(x.shape)}")
+        return graph, static_in, static_out
+    
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        """Run the model on x by replaying the graph for its shape."""
+        key = (tuple(x.shape), x.dtype, x.stride())
+        entry = self._graphs.get(key)
+        if entry is None:
+            entry = self._capture(x)
+            self._graphs[key] = entry
+        
+        graph, static_in, static_out = entry
+        static_in.copy_(x, non_blocking=True)
+        graph.replay()
+        return static_out
+    
+    def eval(self) -> "CUDAGraphRunner":
+        """No-op for API compatibility with nn.Module (model is already in eval mode)."""
+        return self
+
+
 def create_mock_model(device: Optional[torch.device] = None) -> CSRNet:
     """
     Create a CSRNet model with random weights for testing.
@@ -0,0 +1,259 @@
+"""
+ONNX Runtime Backend
+====================
+Export CSRNet to ONNX and run it through ONNX Runtime.
+
+With the TensorRT execution provider and FP16 enabled, the dilated
+conv stack runs on Tensor Cores. The built TensorRT engine is cached
+on disk so only the first session creation pays the build cost.
+
+The 'trt_int8' backend additionally runs INT8 kernels using a
+calibration table built once from representative frames with
+build_int8_calibration_table().
+
+Installation:
+    pip install onnxruntime-gpu
+"""
+
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+
+# Default directory for exported ONNX models and TensorRT engine cache
+DEFAULT_ONNX_DIR = Path(__file__).parent.parent / "weights"
+
+# Supported inference backends
+BACKENDS = ("pytorch", "onnx", "trt_fp16", "trt_int8")
+
+# INT8 calibration table written by build_int8_calibration_table and read
+# by the TensorRT EP from the engine cache directory
+CALIBRATION_TABLE_NAME = "calibration.flatbuffers"
+
+
+def default_trt_cache_dir(onnx_path: Union[str, Path]) -> Path:
+    """TensorRT engine cache / calibration directory for an ONNX model."""
+    return Path(onnx_path).parent / "trt_cache"
+
+
+def build_int8_calibration_table(
+    onnx_path: Union[str, Path],
+    batches: Iterable[np.ndarray],
+    cache_dir: Optional[Union[str, Path]] = None,
+    method: str = "entropy"
+) -> Path:
+    """
+    Build a TensorRT INT8 calibration table for a CSRNet ONNX model.
+
+    Runs calibration over representative inputs with ONNX Runtime and
+    writes the table where the TensorRT EP looks for it.
+
+    Args:
+        onnx_path: Path to exported CSRNet ONNX model
+        batches: Preprocessed float32 inputs [B, 3, H, W] (a few dozen
+                 frames from the target cameras is usually enough)
+        cache_dir: TensorRT cache directory (defaults next to the model)
+        method: 'entropy' (KL-divergence thresholds, as TensorRT's
+                entropy calibrator; robust to outlier activations),
+                'percentile' or 'minmax'
+
+    Returns:
+        Path to the written calibration table
+    """
+    if not ORT_AVAILABLE:
+        raise ImportError(
+            "onnxruntime package not installed. "
+            "Install with: pip install onnxruntime-gpu"
+        )
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        CalibrationMethod,
+        create_calibrator,
+        write_calibration_table
+    )
+
+    onnx_path = Path(onnx_path)
+    cache_dir = Path(cache_dir) if cache_dir else default_trt_cache_dir(onnx_path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    class _BatchReader(CalibrationDataReader):
+        def __init__(self, input_name: str):
+            self._inputs = ({input_name: np.ascontiguousarray(b, dtype=np.float32)} for b in batches)
+
+        def get_next(self):
+            return next(self._inputs, None)
+
+    calibrate_method = {
+        "entropy": CalibrationMethod.Entropy,
+        "percentile": CalibrationMethod.Percentile,
+        "minmax": CalibrationMethod.MinMax
+    }[method]
+
+    calibrator = create_calibrator(
+        str(onnx_path),
+        [],
+        augmented_model_path=str(cache_dir / "augmented_model.onnx"),
+        calibrate_method=calibrate_method
+    )
+    calibrator.set_execution_providers(["CUDAExecutionProvider", "CPUExecutionProvider"])
+    input_name = calibrator.model.graph.input[0].name
+    calibrator.collect_data(_BatchReader(input_name))
+    write_calibration_table(calibrator.compute_data(), dir=str(cache_dir))
+
+    table_path = cache_dir / CALIBRATION_TABLE_NAME
+    print(f"INT8 calibration table written to {table_path}")
+    return table_path
+
+
+def export_csrnet_onnx(
+    model: nn.Module,
+    save_path: Union[str, Path],
+    input_size: Tuple[int, int] = (480, 640),
+    opset_version: int = 17
+) -> Path:
+    """
+    Export a CSRNet model to ONNX with dynamic batch and spatial axes.
+
+    Args:
+        model: CSRNet or CSRNetLite model
+        save_path: Output .onnx file path
+        input_size: Dummy input size (H, W) used for tracing
+        opset_version: ONNX opset version
+
+    Returns:
+        Path to the exported ONNX file
+    """
+    save_path = Path(save_path)
+    save_path.parent.mkdir(parents=True, exist_ok=True)
+
+    device = next(model.parameters()).device
+    dummy_input = torch.zeros(1, 3, *input_size, dtype=torch.float32, device=device)
+
+    model.eval()
+    torch.onnx.export(
+        model.float(),
+        dummy_input,
+        str(save_path),
+        opset_version=opset_version,
+        input_names=["input"],
+        output_names=["density_map"],
+        dynamic_axes={
+            "input": {0: "N", 2: "H", 3: "W"},
+            "density_map": {0: "N", 2: "H_out", 3: "W_out"}
+        }
+    )
+
+    print(f"ONNX model exported to {save_path}")
+    return save_path
+
+
+class ONNXCSRNetRunner:
+    """
+    Drop-in replacement for the CSRNet forward pass using ONNX Runtime.
+
+    Takes and returns torch tensors so the inference engine can use it
+    exactly like the PyTorch model.
+
+    Args:
+        onnx_path: Path to exported CSRNet ONNX model
+        backend: 'trt_fp16' (TensorRT EP with FP16), 'trt_int8' (TensorRT
+                 EP with INT8 + FP16, needs a calibration table) or
+                 'onnx' (CUDA/CPU EP)
+        device_id: CUDA device index
+        cache_dir: Directory for the TensorRT engine cache
+        input_shape: Expected model input (H, W); pins the TensorRT
+                     optimization profile to it so the engine is built
+                     once for that size instead of per new shape
+        max_batch: Largest batch the TensorRT profile must accept
+    """
+
+    def __init__(
+        self,
+        onnx_path: Union[str, Path],
+        backend: str = "trt_fp16",
+        device_id: int = 0,
+        cache_dir: Optional[Union[str, Path]] = None,
+        input_shape: Optional[Tuple[int, int]] = None,
+        max_batch: int = 1
+    ):
+        if not ORT_AVAILABLE:
+            raise ImportError(
+                "onnxruntime package not installed. "
+                "Install with: pip install onnxruntime-gpu"
+            )
+
+        self.onnx_path = Path(onnx_path)
+        if not self.onnx_path.exists():
+            raise FileNotFoundError(f"ONNX model not found: {self.onnx_path}")
+
+        self.cache_dir = Path(cache_dir) if cache_dir else default_trt_cache_dir(self.onnx_path)
+
+        if backend == "trt_int8" and not (self.cache_dir / CALIBRATION_TABLE_NAME).exists():
+            print("No INT8 calibration table found, using trt_fp16")
+            backend = "trt_fp16"
+        self.backend = backend
+        self.input_shape = input_shape
+        self.max_batch = max(1, max_batch)
+
+        self.session = ort.InferenceSession(
+            str(self.onnx_path),
+            providers=self._get_providers(backend, device_id)
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        self.output_name = self.session.get_outputs()[0].name
+
+        print(f"ONNX Runtime providers: {self.session.get_providers()}")
+
+    def _get_providers(self, backend: str, device_id: int) -> list:
+        """Build the execution provider list, keeping only available ones."""
+        providers = []
+
+        if backend in ("trt_fp16", "trt_int8"):
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            options = {
+                "device_id": device_id,
+                "trt_fp16_enable": True,
+                "trt_engine_cache_enable": True,
+                "trt_engine_cache_path": str(self.cache_dir)
+            }
+            if backend == "trt_int8":
+                # Layers without INT8 kernels fall back to FP16
+                options["trt_int8_enable"] = True
+                options["trt_int8_calibration_table_name"] = CALIBRATION_TABLE_NAME
+            if self.input_shape is not None:
+                # Cached engines are keyed by the EP on model, profile and GPU
+                # compute capability, so a profile change or new GPU rebuilds
+                h, w = self.input_shape
+                options["trt_profile_min_shapes"] = f"input:1x3x{h}x{w}"
+                options["trt_profile_opt_shapes"] = f"input:1x3x{h}x{w}"
+                options["trt_profile_max_shapes"] = f"input:{self.max_batch}x3x{h}x{w}"
+            providers.append(("TensorrtExecutionProvider", options))
+
+        providers.append(("CUDAExecutionProvider", {"device_id": device_id}))
+        providers.append("CPUExecutionProvider")
+
+        available = set(ort.get_available_providers())
+        return [
+            p for p in providers
+            if (p[0] if isinstance(p, tuple) else p) in available
+        ]
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        """Run inference on a [B, 3, H, W] tensor, returning [B, 1, H/8, W/8]."""
+        # ONNX Runtime wants NCHW-contiguous input (a no-op unless x is channels_last)
+        inputs = x.detach().float().cpu().contiguous().numpy()
+        output = self.session.run([self.output_name], {self.input_name: inputs})[0]
+        return torch.from_numpy(output)
+
+    def eval(self) -> "ONNXCSRNetRunner":
+        """No-op for API compatibility with nn.Module."""
+        return self
@@ -4,20 +4,40 @@ Preprocessing Module
 Image preprocessing utilities for CSRNet inference.
 """
 
-from .transforms import (
-    preprocess_frame,
-    preprocess_batch,
-    normalize_image,
-    resize_image,
-    denormalize_image,
-    CSRNetTransform
-)
+import importlib
+
+# transforms imports torch, so it is loaded on first attribute access
+# (PEP 562) rather than when the package is imported
+_EXPORTS = {
+    "preprocess_frame": ".transforms",
+    "preprocess_frame_gpu": ".transforms",
+    "preprocess_batch": ".transforms",
+    "normalize_image": ".transforms",
+    "resize_image": ".transforms",
+    "get_resize_shape": ".transforms",
+    "denormalize_image": ".transforms",
+    "CSRNetTransform": ".transforms",
+}
 
 __all__ = [
     "preprocess_frame",
+    "preprocess_frame_gpu",
     "preprocess_batch",
     "normalize_image",
     "resize_image",
+    "get_resize_shape",
     "denormalize_image",
     "CSRNetTransform"
 ]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value  # Cache so __getattr__ isn't hit again
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -9,16 +9,68 @@ CSRNet expects:
 - Divisible dimensions (for downsampling)
 """
 
-from typing import Tuple, Optional, List, Union
+from functools import lru_cache
+from typing import Dict, Tuple, Optional, List, Union
 import cv2
 import numpy as np
 import torch
+import torch.nn.functional as F
+
+from ..capture.frame_pool import hold_until
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 
 # ImageNet normalization constants (used by pretrained VGG)
 IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
 IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
 
+# Same constants folded for uint8 input: (x - mean*255) * 1/(std*255)
+IMAGENET_MEAN_255 = IMAGENET_MEAN * np.float32(255.0)
+IMAGENET_INV_STD_255 = np.float32(1.0) / (IMAGENET_STD * np.float32(255.0))
+
+
+def _cv_scalar(values: np.ndarray) -> Tuple[float, float, float, float]:
+    """Per-channel values as an OpenCV Scalar (4-tuple)."""
+    return tuple(float(v) for v in values) + (0.0,) * (4 - len(values))
+
+
+# (x / 255 - mean) / std == x * scale + shift, per RGB channel
+_NORMALIZE_SCALE = IMAGENET_INV_STD_255
+_NORMALIZE_SHIFT = -IMAGENET_MEAN / IMAGENET_STD
+
+
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, fastmath=True, cache=True, boundscheck=False)
+    def _normalize_bgr_kernel(image, out, scale, shift):
+        """BGR uint8 [H, W, 3] -> normalized RGB float32 [H, W, 3] in one pass."""
+        for y in numba.prange(image.shape[0]):
+            for x in range(image.shape[1]):
+                for c in range(3):
+                    out[y, x, c] = image[y, x, 2 - c] * scale[c] + shift[c]
+
+
+def _normalize_bgr(image: np.ndarray) -> np.ndarray:
+    """
+    Normalize a BGR uint8 frame into an RGB float32 HWC image.
+    
+    Uses a fused parallel Numba kernel when available (channel swap,
+    scale and shift in a single read of the frame); otherwise an OpenCV
+    color conversion on the uint8 frame followed by normalize_image().
+    """
+    if NUMBA_AVAILABLE and image.dtype == np.uint8:
+        out = np.empty(image.shape, dtype=np.float32)
+        _normalize_bgr_kernel(image, out, _NORMALIZE_SCALE, _NORMALIZE_SHIFT)
+        return out
+    
+    # BGR to RGB while still uint8 (a quarter of the bytes of the float
+    # image), so the normalized HWC buffer can become the tensor as-is
+    return normalize_image(bgr_to_rgb(image))
+
 
 def bgr_to_rgb(image: np.ndarray) -> np.ndarray:
     """
@@ -33,32 +85,21 @@ def bgr_to_rgb(image: np.ndarray) -> np.ndarray:
     return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
 
-def resize_image(
-    image: np.ndarray,
+def get_resize_shape(
+    h: int,
+    w: int,
     target_size: Optional[Tuple[int, int]] = None,
     scale_factor: Optional[float] = None,
     min_size: int = 256,
     max_size: int = 2048,
     divisor: int = 8
-) -> np.ndarray:
+) -> Tuple[int, int]:
     """
-    Resize image for CSRNet inference.
-    
-    Ensures dimensions are divisible by 8 (for 8x downsampling).
+    Compute the CSRNet input size for a frame (see resize_image).
     
-    Args:
-        image: Input image [H, W, C]
-        target_size: Target (width, height) - overrides scale_factor
-        scale_factor: Scale factor (e.g., 0.5 for half size)
-        min_size: Minimum dimension size
-        max_size: Maximum dimension size
-        divisor: Dimensions must be divisible by this (default: 8 for CSRNet)
-        
     Returns:
-        Resized image with dimensions divisible by divisor
+        (new_h, new_w), clamped and divisible by divisor
     """
-    h, w = image.shape[:2]
-    
     if target_size is not None:
         new_w, new_h = target_size
     elif scale_factor is not None:
@@ -75,8 +116,59 @@ def resize_image(
     new_w = (new_w // divisor) * divisor
     new_h = (new_h // divisor) * divisor
     
+    return new_h, new_w
+
+
+def _resize_interpolation(h: int, w: int, new_h: int, new_w: int) -> int:
+    """OpenCV interpolation flag for resizing (h, w) to (new_h, new_w)."""
+    # Exact integer downscale (e.g. 1280x720 at 0.5): INTER_AREA takes
+    # a box-filter fast path there that is anti-aliased and no slower
+    # than bilinear. For other ratios it is several times slower, so
+    # those stay bilinear.
+    if w % new_w == 0 and h % new_h == 0 and w // new_w == h // new_h > 1:
+        return cv2.INTER_AREA
+    return cv2.INTER_LINEAR
+
+
+def resize_image(
+    image: np.ndarray,
+    target_size: Optional[Tuple[int, int]] = None,
+    scale_factor: Optional[float] = None,
+    min_size: int = 256,
+    max_size: int = 2048,
+    divisor: int = 8,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Resize image for CSRNet inference.
+    
+    Ensures dimensions are divisible by 8 (for 8x downsampling).
+    
+    Args:
+        image: Input image [H, W, C]
+        target_size: Target (width, height) - overrides scale_factor
+        scale_factor: Scale factor (e.g., 0.5 for half size)
+        min_size: Minimum dimension size
+        max_size: Maximum dimension size
+        divisor: Dimensions must be divisible by this (default: 8 for CSRNet)
+        out: Optional preallocated output of the resized shape (written
+             and returned instead of a new array)
+        
+    Returns:
+        Resized image with dimensions divisible by divisor
+    """
+    h, w = image.shape[:2]
+    new_h, new_w = get_resize_shape(
+        h, w, target_size, scale_factor, min_size, max_size, divisor
+    )
+    
     if new_w != w or new_h != h:
-        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        interpolation = _resize_interpolation(h, w, new_h, new_w)
+        return cv2.resize(image, (new_w, new_h), dst=out, interpolation=interpolation)
+    
+    if out is not None:
+        out[...] = image
+        return out
     
     return image
 
@@ -84,26 +176,41 @@ def resize_image(
 def normalize_image(
     image: np.ndarray,
     mean: np.ndarray = IMAGENET_MEAN,
-    std: np.ndarray = IMAGENET_STD
+    std: np.ndarray = IMAGENET_STD,
+    bgr: bool = False
 ) -> np.ndarray:
     """
     Normalize image with ImageNet statistics.
     
+    Computes (image / 255 - mean) / std as a single subtract and
+    multiply with pre-scaled constants; uint8 input goes through OpenCV,
+    which converts to float32 on the fly instead of in a separate pass.
+    
     Args:
         image: RGB image [H, W, 3] with values in [0, 255]
-        mean: Mean values for each channel
-        std: Std values for each channel
+        mean: Mean values for each channel (RGB order)
+        std: Std values for each channel (RGB order)
+        bgr: Image is BGR; the constants are applied in BGR order so no
+             color conversion is needed (output stays BGR)
         
     Returns:
         Normalized image [H, W, 3] with float32 values
     """
-    # Convert to float and scale to [0, 1]
-    image = image.astype(np.float32) / 255.0
+    if mean is IMAGENET_MEAN and std is IMAGENET_STD:
+        mean_255, inv_std_255 = IMAGENET_MEAN_255, IMAGENET_INV_STD_255
+    else:
+        mean_255 = np.asarray(mean, dtype=np.float32) * np.float32(255.0)
+        inv_std_255 = np.float32(1.0) / (np.asarray(std, dtype=np.float32) * np.float32(255.0))
     
-    # Normalize
-    image = (image - mean) / std
+    if bgr:
+        mean_255, inv_std_255 = mean_255[::-1], inv_std_255[::-1]
     
-    return image
+    if image.dtype == np.uint8 and image.ndim == 3 and image.shape[2] == 3:
+        normalized = cv2.subtract(image, _cv_scalar(mean_255), dtype=cv2.CV_32F)
+        cv2.multiply(normalized, _cv_scalar(inv_std_255), dst=normalized)
+        return normalized
+    
+    return (image.astype(np.float32) - mean_255) * inv_std_255
 
 
 def denormalize_image(
@@ -131,19 +238,24 @@ def image_to_tensor(image: np.ndarray) -> torch.Tensor:
     """
     Convert numpy image to PyTorch tensor.
     
+    The HWC buffer is used as-is: the result is a [1, C, H, W] view in
+    torch.channels_last memory format (NHWC strides), which is what
+    cuDNN's Tensor Core convolutions want, so no transpose copy is made
+    here or inside the first conv. Call .contiguous() where plain NCHW
+    memory is required (e.g. exporting to numpy for ONNX Runtime).
+    
     Args:
         image: Normalized image [H, W, C]
         
     Returns:
-        Tensor [1, C, H, W] ready for model input
+        Tensor [1, C, H, W] (channels_last) ready for model input
     """
-    # HWC -> CHW
-    tensor = torch.from_numpy(image.transpose(2, 0, 1))
+    tensor = torch.from_numpy(np.ascontiguousarray(image))
     
-    # Add batch dimension
-    tensor = tensor.unsqueeze(0)
+    # HWC -> NCHW view with NHWC strides (no copy)
+    tensor = tensor.unsqueeze(0).permute(0, 3, 1, 2)
     
-    return tensor
+    return tensor.contiguous(memory_format=torch.channels_last)
 
 
 def tensor_to_image(tensor: torch.Tensor) -> np.ndarray:
@@ -175,10 +287,10 @@ def preprocess_frame(
     Full preprocessing pipeline for a single frame.
     
     Steps:
-    1. BGR to RGB conversion
-    2. Resize (if specified)
-    3. Normalize with ImageNet stats
-    4. Convert to tensor
+    1. Resize (if specified)
+    2. BGR to RGB conversion and ImageNet normalization (fused with
+       Numba when available)
+    3. Convert to tensor (channels_last, no copy)
     
     Args:
         frame: BGR image from OpenCV [H, W, 3]
@@ -202,19 +314,16 @@ def preprocess_frame(
     """
     original_shape = frame.shape[:2]  # (H, W)
     
-    # BGR to RGB
-    rgb = bgr_to_rgb(frame)
-    
     # Resize if needed
     resized = resize_image(
-        rgb,
+        frame,
         target_size=target_size,
         scale_factor=scale_factor
     )
     processed_shape = resized.shape[:2]
     
-    # Normalize
-    normalized = normalize_image(resized)
+    # BGR to RGB and normalize
+    normalized = _normalize_bgr(resized)
     
     # To tensor
     tensor = image_to_tensor(normalized)
@@ -234,6 +343,65 @@ def preprocess_frame(
     return tensor, info
 
 
+@lru_cache(maxsize=None)
+def _normalize_coeffs(
+    device: torch.device,
+    dtype: torch.dtype = torch.float32
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Per-channel scale/shift folding /255 and ImageNet mean/std."""
+    scale = torch.tensor(1.0 / (255.0 * IMAGENET_STD), device=device, dtype=dtype).view(1, 3, 1, 1)
+    shift = torch.tensor(-IMAGENET_MEAN / IMAGENET_STD, device=device, dtype=dtype).view(1, 3, 1, 1)
+    return scale, shift
+
+
+def preprocess_frame_gpu(
+    frame: torch.Tensor,
+    target_size: Optional[Tuple[int, int]] = None,
+    scale_factor: Optional[float] = None,
+    dtype: torch.dtype = torch.float32
+) -> Tuple[torch.Tensor, dict]:
+    """
+    Preprocessing pipeline for a frame already on the GPU.
+    
+    Same steps as preprocess_frame (BGR to RGB, resize, normalize), but
+    run as tensor ops on the frame's device so only the uint8 frame has
+    to be uploaded instead of the 4x larger float32 tensor.
+    
+    Args:
+        frame: BGR uint8 tensor [H, W, 3] on the target device
+        target_size: Optional target (width, height)
+        scale_factor: Optional scale factor
+        dtype: Output dtype; torch.float16 runs the resize and normalize
+               in half precision too (uint8 values are exact in FP16)
+        
+    Returns:
+        Tuple of (tensor [1, 3, H', W'], preprocessing info dict)
+    """
+    original_shape = (frame.shape[0], frame.shape[1])  # (H, W)
+    processed_shape = get_resize_shape(
+        *original_shape, target_size=target_size, scale_factor=scale_factor
+    )
+    
+    # HWC BGR -> NCHW RGB float
+    tensor = frame.permute(2, 0, 1).flip(0).unsqueeze(0).to(dtype)
+    
+    if processed_shape != original_shape:
+        tensor = F.interpolate(tensor, size=processed_shape, mode="bilinear", align_corners=False)
+    
+    # (x / 255 - mean) / std as a single multiply-add
+    scale, shift = _normalize_coeffs(tensor.device, dtype)
+    tensor = torch.addcmul(shift, tensor, scale)
+    
+    info = {
+        "original_shape": original_shape,  # (H, W)
+        "processed_shape": processed_shape,  # (H, W)
+        "scale_h": original_shape[0] / processed_shape[0],
+        "scale_w": original_shape[1] / processed_shape[1],
+    }
+    
+    return tensor, info
+
+
 def preprocess_batch(
     frames: List[np.ndarray],
     target_size: Optional[Tuple[int, int]] = None,
@@ -254,21 +422,38 @@ def preprocess_batch(
     Returns:
         Tuple of (batched tensor [B, C, H, W], list of info dicts)
     """
-    tensors = []
-    infos = []
-    
-    for frame in frames:
-        tensor, info = preprocess_frame(
-            frame,
-            target_size=target_size,
-            scale_factor=scale_factor,
-            device=None  # Move batch together at the end
-        )
-        tensors.append(tensor)
-        infos.append(info)
-    
-    # Stack into batch
-    batch = torch.cat(tensors, dim=0)
+    shapes = [
+        get_resize_shape(*frame.shape[:2], target_size=target_size, scale_factor=scale_factor)
+        for frame in frames
+    ]
+    infos = [
+        {
+            "original_shape": frame.shape[:2],  # (H, W)
+            "processed_shape": shape,  # (H, W)
+            "scale_h": frame.shape[0] / shape[0],
+            "scale_w": frame.shape[1] / shape[1],
+        }
+        for frame, shape in zip(frames, shapes)
+    ]
+    
+    if len(set(shapes)) == 1 and all(frame.dtype == np.uint8 for frame in frames):
+        # Resize every frame into one [B, H, W, 3] uint8 block, normalize
+        # the whole block at once and view it as NCHW (channels_last)
+        new_h, new_w = shapes[0]
+        block = np.empty((len(frames), new_h, new_w, 3), dtype=np.uint8)
+        for i, frame in enumerate(frames):
+            resize_image(frame, target_size=target_size, scale_factor=scale_factor, out=block[i])
+        
+        normalized = _normalize_bgr(block.reshape(-1, new_w, 3)).reshape(block.shape)
+        batch = torch.from_numpy(normalized).permute(0, 3, 1, 2)
+    else:
+        # Mixed output sizes cannot share a block (torch.cat below still
+        # requires them to match); preprocess frame by frame
+        tensors = [
+            preprocess_frame(frame, target_size=target_size, scale_factor=scale_factor)[0]
+            for frame in frames
+        ]
+        batch = torch.cat(tensors, dim=0)
     
     if device is not None:
         batch = batch.to(device)
@@ -280,6 +465,14 @@ class CSRNetTransform:
     """
     Reusable transform pipeline for CSRNet preprocessing.
     
+    On CUDA devices the uint8 frame is uploaded and resized/normalized
+    on the GPU (preprocess_frame_gpu); otherwise preprocessing runs on
+    the CPU (preprocess_frame), whose tensors are in torch.channels_last
+    memory format; convert the model with
+    model.to(memory_format=torch.channels_last) to run it without layout
+    conversions (CrowdDensityEngine does this when
+    EngineConfig.channels_last is enabled).
+    
     Example:
         ```python
         transform = CSRNetTransform(scale_factor=0.5, device=device)
@@ -294,7 +487,8 @@ class CSRNetTransform:
         self,
         target_size: Optional[Tuple[int, int]] = None,
         scale_factor: Optional[float] = None,
-        device: Optional[torch.device] = None
+        device: Optional[torch.device] = None,
+        dtype: torch.dtype = torch.float32
     ):
         """
         Initialize transform.
@@ -303,40 +497,154 @@ class CSRNetTransform:
             target_size: Fixed target size (width, height)
             scale_factor: Scale factor relative to input
             device: Target device for output tensor
+            dtype: Output dtype (torch.float16 for half-precision models;
+                   on CUDA the preprocessing itself then runs in FP16)
         """
         self.target_size = target_size
         self.scale_factor = scale_factor
         self.device = device
+        self.dtype = dtype
+        
+        # A fixed target_size makes the output shape independent of the
+        # frame, so it is resolved once; per input shape, the info dict
+        # and interpolation are cached and the resize target is reused
+        self._fixed_shape = (
+            get_resize_shape(0, 0, target_size=target_size) if target_size is not None else None
+        )
+        self._fixed_plans: Dict[Tuple[int, int], Tuple[dict, int]] = {}
+        self._resized: Optional[np.ndarray] = None
+        
+        # CUDA: upload the raw uint8 frame (a quarter of the bytes of the
+        # float tensor) through two pinned staging buffers on a side
+        # stream, then resize and normalize on the GPU
+        self._gpu = (
+            device is not None
+            and torch.device(device).type == "cuda"
+            and torch.cuda.is_available()
+        )
+        self._staging: List[Optional[torch.Tensor]] = [None, None]
+        self._staging_events: List[Optional[torch.cuda.Event]] = [None, None]
+        self._staging_index = 0
+        self._copy_stream = torch.cuda.Stream(device=device) if self._gpu else None
     
     def __call__(
         self, 
         frame: np.ndarray
     ) -> Tuple[torch.Tensor, dict]:
         """Transform a frame."""
-        return preprocess_frame(
-            frame,
-            target_size=self.target_size,
-            scale_factor=self.scale_factor,
-            device=self.device
-        )
+        if self._gpu:
+            return preprocess_frame_gpu(
+                self._upload(frame),
+                target_size=self.target_size,
+                scale_factor=self.scale_factor,
+                dtype=self.dtype
+            )
+        
+        if self._fixed_shape is not None and frame.dtype == np.uint8:
+            tensor, info = self._call_fixed_size(frame)
+        else:
+            tensor, info = preprocess_frame(
+                frame,
+                target_size=self.target_size,
+                scale_factor=self.scale_factor,
+                device=self.device
+            )
+        
+        return tensor.to(self.dtype), info
     
     def batch(
         self, 
         frames: List[np.ndarray]
     ) -> Tuple[torch.Tensor, List[dict]]:
         """Transform a batch of frames."""
-        return preprocess_batch(
+        if self._gpu:
+            tensors, infos = zip(*(self(frame) for frame in frames))
+            return torch.cat(tensors, dim=0), list(infos)
+        
+        batch, infos = preprocess_batch(
             frames,
             target_size=self.target_size,
             scale_factor=self.scale_factor,
             device=self.device
         )
+        return batch.to(self.dtype), infos
+    
+    def _call_fixed_size(self, frame: np.ndarray) -> Tuple[torch.Tensor, dict]:
+        """CPU preprocessing specialized for a fixed target_size (same output as preprocess_frame)."""
+        original_shape = frame.shape[:2]
+        plan = self._fixed_plans.get(original_shape)
+        if plan is None:
+            new_h, new_w = self._fixed_shape
+            info = {
+                "original_shape": original_shape,  # (H, W)
+                "processed_shape": self._fixed_shape,  # (H, W)
+                "scale_h": original_shape[0] / new_h,
+                "scale_w": original_shape[1] / new_w,
+            }
+            plan = (info, _resize_interpolation(*original_shape, new_h, new_w))
+            self._fixed_plans[original_shape] = plan
+        info, interpolation = plan
+        
+        if original_shape != self._fixed_shape:
+            new_h, new_w = self._fixed_shape
+            # Reused: normalization writes a new array, so nothing
+            # returned to the caller aliases this buffer
+            self._resized = cv2.resize(frame, (new_w, new_h), dst=self._resized, interpolation=interpolation)
+            frame = self._resized
+        
+        tensor = image_to_tensor(_normalize_bgr(frame))
+        if self.device is not None:
+            tensor = tensor.to(self.device)
+        
+        return tensor, dict(info)
+    
+    def _upload(self, frame: np.ndarray) -> torch.Tensor:
+        """Copy a uint8 frame to self.device asynchronously via pinned memory."""
+        host = torch.from_numpy(frame)
+        if host.is_pinned() and host.is_contiguous():
+            # Already page-locked (frame pool): no staging copy needed
+            with torch.cuda.stream(self._copy_stream):
+                device_frame = host.to(self.device, non_blocking=True)
+                hold_until(frame, self._copy_stream.record_event())
+        else:
+            device_frame = self._upload_staged(host)
+        
+        # Work queued after this on the caller's stream sees the upload
+        current = torch.cuda.current_stream(self.device)
+        current.wait_stream(self._copy_stream)
+        device_frame.record_stream(current)
+        
+        return device_frame
+    
+    def _upload_staged(self, host: torch.Tensor) -> torch.Tensor:
+        """Copy a pageable frame through a pinned staging buffer on the copy stream."""
+        i = self._staging_index
+        self._staging_index ^= 1
+        
+        staging = self._staging[i]
+        if staging is None or staging.shape != host.shape:
+            staging = torch.empty(host.shape, dtype=torch.uint8, pin_memory=True)
+            self._staging[i] = staging
+        elif self._staging_events[i] is not None:
+            # Previous upload from this buffer must finish before reuse
+            self._staging_events[i].synchronize()
+        staging.copy_(host)
+        
+        with torch.cuda.stream(self._copy_stream):
+            device_frame = staging.to(self.device, non_blocking=True)
+            self._staging_events[i] = self._copy_stream.record_event()
+        
+        return device_frame
 
 
+@lru_cache(maxsize=32)
 def create_gaussian_kernel(sigma: float = 4.0, size: int = 15) -> np.ndarray:
     """
     Create Gaussian kernel for density map generation (training).
     
+    Kernels are cached per (sigma, size) and returned read-only; copy
+    the result before modifying it.
+    
     Args:
         sigma: Standard deviation of Gaussian
         size: Kernel size (should be odd)
@@ -345,10 +653,12 @@ def create_gaussian_kernel(sigma: float = 4.0, size: int = 15) -> np.ndarray:
         Normalized Gaussian kernel
     """
     x = np.arange(0, size, 1, float)
-    y = x[:, np.newaxis]
-    x0 = y0 = size // 2
+    x0 = size // 2
     
-    kernel = np.exp(-((x - x0) ** 2 + (y - y0) ** 2) / (2 * sigma ** 2))
+    # Separable: outer product of two 1-D Gaussians
+    k = np.exp(-((x - x0) ** 2) / (2 * sigma ** 2))
+    kernel = np.outer(k, k)
     kernel = kernel / kernel.sum()
     
+    kernel.setflags(write=False)
     return kernel
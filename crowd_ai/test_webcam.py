@@ -11,7 +11,9 @@ Usage:
     python test_webcam.py
 """
 
+import queue
 import sys
+import threading
 import time
 
 import cv2
@@ -121,6 +123,49 @@ def test_preprocessing():
         return False
 
 
+def _put(q, item, stop):
+    """Put an item on a bounded queue, giving up once stop is set."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _read_frames(cap, frames, stop):
+    """Reader stage: grab webcam frames until stopped or the stream ends."""
+    while not stop.is_set():
+        ret, frame = cap.read()
+        if not ret or not _put(frames, frame, stop):
+            break
+    _put(frames, None, stop)
+
+
+def _infer_frames(engine, frames, results, stop):
+    """
+    Inference stage: run the engine on frames from the reader.
+    
+    An engine error is passed on as (None, exception) so the display
+    loop can re-raise it on the main thread.
+    """
+    try:
+        while not stop.is_set():
+            try:
+                frame = frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if frame is None:
+                break
+            if not _put(results, (frame, engine.process(frame)), stop):
+                break
+    except Exception as e:
+        _put(results, (None, e), stop)
+    finally:
+        _put(results, None, stop)
+
+
 def test_full_pipeline():
     """Test full inference pipeline with webcam."""
     print("\nTesting full pipeline...")
@@ -152,47 +197,66 @@ def test_full_pipeline():
         
         print("Processing frames... (press 'q' to quit)")
         
+        # Read -> infer -> display run as overlapping stages; the small
+        # queues keep at most a couple of frames in flight per stage
+        frames = queue.Queue(maxsize=2)
+        results = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        workers = [
+            threading.Thread(target=_read_frames, args=(cap, frames, stop), daemon=True),
+            threading.Thread(target=_infer_frames, args=(engine, frames, results, stop), daemon=True),
+        ]
+        
         frame_count = 0
         start_time = time.time()
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process frame
-            result = engine.process(frame)
-            frame_count += 1
+        try:
+            for worker in workers:
+                worker.start()
             
-            # Visualize
-            display = viz.visualize(
-                frame,
-                result.density_map,
-                count=result.crowd_count,
-                density_level=result.density_level
-            )
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                frame, result = item
+                if frame is None:
+                    # Inference worker failed
+                    raise result
+                frame_count += 1
+                
+                # Visualize
+                display = viz.visualize(
+                    frame,
+                    result.density_map,
+                    count=result.crowd_count,
+                    density_level=result.density_level
+                )
+                
+                # Add FPS
+                elapsed = time.time() - start_time
+                fps = frame_count / elapsed if elapsed > 0 else 0
+                cv2.putText(
+                    display, f"FPS: {fps:.1f}", 
+                    (display.shape[1] - 120, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2
+                )
+                
+                cv2.imshow("Crowd Density Test", display)
+                
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                
+                # Print periodic status
+                if frame_count % 30 == 0:
+                    print(f"Frame {frame_count}: Count={result.crowd_count:.0f}, "
+                          f"Level={result.density_level}, FPS={fps:.1f}")
             
-            # Add FPS
-            elapsed = time.time() - start_time
-            fps = frame_count / elapsed if elapsed > 0 else 0
-            cv2.putText(
-                display, f"FPS: {fps:.1f}", 
-                (display.shape[1] - 120, 30),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2
-            )
-            
-            cv2.imshow("Crowd Density Test", display)
-            
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            
-            # Print periodic status
-            if frame_count % 30 == 0:
-                print(f"Frame {frame_count}: Count={result.crowd_count:.0f}, "
-                      f"Level={result.density_level}, FPS={fps:.1f}")
-        
-        cap.release()
-        cv2.destroyAllWindows()
+        finally:
+            # Always stop the workers and free the webcam, even if display failed
+            stop.set()
+            for worker in workers:
+                worker.join()
+            cap.release()
+            cv2.destroyAllWindows()
         
         print(f"\nProcessed {frame_count} frames")
         print(f"Average FPS: {frame_count / (time.time() - start_time):.1f}")
@@ -7,17 +7,21 @@ Heatmap generation and density visualization.
 from .heatmap import (
     generate_heatmap,
     overlay_heatmap,
+    overlay_heatmap_gpu,
     DensityVisualizer
 )
 from .dashboard import (
     create_dashboard_frame,
-    draw_stats_overlay
+    draw_stats_overlay,
+    DashboardRenderer
 )
 
 __all__ = [
     "generate_heatmap",
     "overlay_heatmap",
+    "overlay_heatmap_gpu",
     "DensityVisualizer",
     "create_dashboard_frame",
-    "draw_stats_overlay"
+    "draw_stats_overlay",
+    "DashboardRenderer"
 ]
@@ -4,17 +4,126 @@ Dashboard Visualization
 Create comprehensive dashboard views with stats overlays.
 """
 
-from typing import Dict, Optional, List
+from functools import lru_cache
+from typing import Dict, Optional, List, Tuple
 import cv2
 import numpy as np
 
 from ..inference.density_analyzer import DensityLevel, DensityStats
 
 
+# Histogram panel bins and their bar colors (turbo, low to high),
+# computed once instead of one applyColorMap call per bar per frame
+HISTOGRAM_BINS = 30
+HISTOGRAM_BAR_COLORS = cv2.applyColorMap(
+    np.array([[int(255 * i / HISTOGRAM_BINS)] for i in range(HISTOGRAM_BINS)], dtype=np.uint8),
+    cv2.COLORMAP_TURBO
+).reshape(HISTOGRAM_BINS, 3)
+
+# Vertical turbo legend (high at the top) for the main dashboard view
+COLOR_BAR_IMAGE = cv2.applyColorMap(
+    np.repeat(np.linspace(255, 0, 120).astype(np.uint8).reshape(-1, 1), 20, axis=1),
+    cv2.COLORMAP_TURBO
+)
+
+
+# Per-level colors (BGR) and safety status labels, keyed by DensityLevel value
+LEVEL_COLORS = {
+    "FREE_FLOW": (0, 200, 0),
+    "LOW": (0, 255, 0),
+    "MEDIUM": (0, 200, 200),
+    "HIGH": (0, 150, 255),
+    "CRITICAL": (0, 0, 255),
+}
+SAFETY_STATUS = {
+    "FREE_FLOW": "SAFE",
+    "LOW": "SAFE",
+    "MEDIUM": "MONITOR",
+    "HIGH": "WARNING",
+    "CRITICAL": "DANGER",
+}
+_LIGHT_LEVELS = frozenset(("FREE_FLOW", "LOW", "MEDIUM"))  # Dark text reads better on these
+
+
+def _level_name(level) -> str:
+    """Level as its string value (accepts DensityLevel or str)."""
+    return level.value if isinstance(level, DensityLevel) else level
+
+
+# Pixels a stats box's border can extend past its rectangle (thickness 2)
+_SPRITE_MARGIN = 2
+
+
+@lru_cache(maxsize=32)
+def _stats_sprite(
+    box_size: Tuple[int, int],
+    border: Tuple[Tuple[int, int, int], int],
+    texts: Tuple[Tuple[str, Tuple[int, int], Tuple[int, int, int]], ...]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pre-render a stats box's border and text (cached by content).
+    
+    Text only changes when the stats do, so frames with the same values
+    reuse the rasterized sprite instead of calling putText again.
+    
+    Args:
+        box_size: Box (width, height); coordinates are relative to its
+                  top-left corner
+        border: (color, thickness) of the box outline
+        texts: (text, (x, y), color) entries, FONT_HERSHEY_SIMPLEX at 0.5
+        
+    Returns:
+        Tuple of (BGR sprite drawn over black, i.e. premultiplied by its
+        coverage, and 1 - coverage as float32 [H, W, 1]); the sprite's
+        origin is _SPRITE_MARGIN pixels up and left of the box corner
+    """
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    m = _SPRITE_MARGIN
+    box_w, box_h = box_size
+    
+    # Size to fit the box and any text running past it
+    sprite_w, sprite_h = box_w + 2 * m + 1, box_h + 2 * m + 1
+    for text, (tx, ty), _ in texts:
+        (text_w, _), baseline = cv2.getTextSize(text, font, 0.5, 1)
+        sprite_w = max(sprite_w, m + tx + text_w + 1)
+        sprite_h = max(sprite_h, m + ty + baseline + 1)
+    
+    sprite = np.zeros((sprite_h, sprite_w, 3), dtype=np.uint8)
+    coverage = np.zeros((sprite_h, sprite_w), dtype=np.uint8)
+    
+    # Same primitives drawn twice: in color (anti-aliased edges blend
+    # toward black) and in white on a single channel (coverage)
+    color, thickness = border
+    cv2.rectangle(sprite, (m, m), (m + box_w, m + box_h), color, thickness)
+    cv2.rectangle(coverage, (m, m), (m + box_w, m + box_h), 255, thickness)
+    
+    for text, (tx, ty), text_color in texts:
+        cv2.putText(sprite, text, (m + tx, m + ty), font, 0.5, text_color, 1)
+        cv2.putText(coverage, text, (m + tx, m + ty), font, 0.5, 255, 1)
+    
+    inv_alpha = 1.0 - coverage[..., None].astype(np.float32) / 255.0
+    return sprite, inv_alpha
+
+
+def _blit_sprite(frame: np.ndarray, sprite: np.ndarray, inv_alpha: np.ndarray, x: int, y: int):
+    """Alpha-composite a _stats_sprite into frame at box corner (x, y), clipped."""
+    h, w = frame.shape[:2]
+    x0, y0 = x - _SPRITE_MARGIN, y - _SPRITE_MARGIN
+    fx0, fy0 = max(x0, 0), max(y0, 0)
+    fx1, fy1 = min(x0 + sprite.shape[1], w), min(y0 + sprite.shape[0], h)
+    if fx1 <= fx0 or fy1 <= fy0:
+        return
+    
+    region = (slice(fy0 - y0, fy1 - y0), slice(fx0 - x0, fx1 - x0))
+    roi = frame[fy0:fy1, fx0:fx1]
+    roi[:] = np.rint(roi * inv_alpha[region] + sprite[region])
+
+
 def draw_stats_overlay(
     frame: np.ndarray,
     stats: Dict,
-    position: str = "top-left"
+    position: str = "top-left",
+    inplace: bool = False
 ) -> np.ndarray:
     """
     Draw statistics overlay on frame.
@@ -23,11 +132,13 @@ def draw_stats_overlay(
         frame: Input frame
         stats: Dictionary of statistics to display
         position: Overlay position ('top-left', 'top-right', 'bottom-left', 'bottom-right')
+        inplace: Draw on frame itself instead of a copy (only the box
+                 region is touched)
         
     Returns:
         Frame with stats overlay
     """
-    result = frame.copy()
+    result = frame if inplace else frame.copy()
     h, w = result.shape[:2]
     
     # Calculate text dimensions
@@ -61,18 +172,17 @@ def draw_stats_overlay(
     else:
         y = 10
     
-    # Draw background
-    overlay = result.copy()
-    cv2.rectangle(overlay, (x, y), (x + box_width, y + box_height), (0, 0, 0), -1)
-    result = cv2.addWeighted(overlay, 0.7, result, 0.3, 0)
-    
-    # Draw border
-    cv2.rectangle(result, (x, y), (x + box_width, y + box_height), (100, 100, 100), 1)
+    # Draw background (0.7 * black + 0.3 * frame, over the box only)
+    box = result[max(y, 0):y + box_height + 1, max(x, 0):x + box_width + 1]
+    cv2.convertScaleAbs(box, dst=box, alpha=0.3)
     
-    # Draw text
-    for i, line in enumerate(lines):
-        text_y = y + padding + (i + 1) * line_height - 5
-        cv2.putText(result, line, (x + padding, text_y), font, font_scale, (255, 255, 255), thickness)
+    # Draw border and text (rasterized once per distinct set of lines)
+    texts = tuple(
+        (line, (padding, padding + (i + 1) * line_height - 5), (255, 255, 255))
+        for i, line in enumerate(lines)
+    )
+    sprite, inv_alpha = _stats_sprite((box_width, box_height), ((100, 100, 100), 1), texts)
+    _blit_sprite(result, sprite, inv_alpha, x, y)
     
     return result
 
@@ -84,7 +194,9 @@ def create_dashboard_frame(
     count: float = 0,
     density_level: str = "UNKNOWN",
     fps: float = 0,
-    show_histogram: bool = True
+    show_histogram: bool = True,
+    device_frame=None,
+    device_density_map=None
 ) -> np.ndarray:
     """
     Create comprehensive dashboard with all visualizations.
@@ -100,6 +212,9 @@ def create_dashboard_frame(
     │ Histogram │ Mini-map │ Safety Meter │
     └─────────────────────────────────────┘
     
+    Allocates a new dashboard per call; use DashboardRenderer to reuse
+    buffers across frames of a video.
+    
     Args:
         frame: Original camera frame
         density_map: Density map from model
@@ -108,71 +223,157 @@ def create_dashboard_frame(
         density_level: Density classification
         fps: Current processing FPS
         show_histogram: Whether to show density histogram
+        device_frame: Optional uint8 frame tensor on the GPU
+                      (InferenceResult.device_frame)
+        device_density_map: Optional density map tensor on the GPU; with
+                            device_frame, the main view is rendered there
         
     Returns:
         Dashboard frame
     """
-    from .heatmap import generate_heatmap, overlay_heatmap
-    
-    h, w = frame.shape[:2]
-    
-    # Target dashboard size
-    dash_w = max(800, w)
-    dash_h = int(dash_w * 0.75)  # 4:3 aspect ratio
-    
-    # Main view height
-    main_h = int(dash_h * 0.75)
-    bottom_h = dash_h - main_h
-    
-    # Create dashboard canvas
-    dashboard = np.zeros((dash_h, dash_w, 3), dtype=np.uint8)
-    
-    # --- Main View with Heatmap ---
-    # Resize frame to fit main view
-    main_frame = cv2.resize(frame, (dash_w, main_h))
-    
-    # Generate and overlay heatmap
-    heatmap = generate_heatmap(density_map, target_size=(dash_w, main_h), colormap="turbo")
-    main_view = overlay_heatmap(main_frame, heatmap, alpha=0.5)
-    
-    # Draw stats box
-    stats_dict = {
-        "Count": f"{count:.0f}",
-        "Level": density_level,
-        "FPS": f"{fps:.1f}",
-    }
-    if stats:
-        stats_dict["Density"] = f"{stats.density_per_sqm:.2f}/sqm"
-        stats_dict["Hotspots"] = str(stats.hotspot_count)
-    
-    main_view = _draw_stats_box(main_view, stats_dict, density_level)
-    
-    # Draw color bar
-    main_view = _draw_color_bar(main_view)
-    
-    dashboard[0:main_h, 0:dash_w] = main_view
-    
-    # --- Bottom Panel ---
-    panel_w = dash_w // 3
-    
-    # Histogram panel
-    if show_histogram:
-        hist_panel = _create_histogram_panel(density_map, panel_w, bottom_h)
-        dashboard[main_h:dash_h, 0:panel_w] = hist_panel
-    
-    # Mini density map
-    mini_map = _create_mini_map(density_map, panel_w, bottom_h)
-    dashboard[main_h:dash_h, panel_w:2*panel_w] = mini_map
-    
-    # Safety meter
-    safety_panel = _create_safety_meter(
-        density_level,
-        stats.density_per_sqm if stats else count / 100,
-        panel_w, bottom_h
+    renderer = DashboardRenderer(show_histogram=show_histogram, num_buffers=1)
+    return renderer.render(
+        frame, density_map,
+        stats=stats,
+        count=count,
+        density_level=density_level,
+        fps=fps,
+        device_frame=device_frame,
+        device_density_map=device_density_map
     )
-    dashboard[main_h:dash_h, 2*panel_w:dash_w] = safety_panel
+
+
+class DashboardRenderer:
+    """
+    Renders dashboards (see create_dashboard_frame) into reused buffers.
+    
+    The canvas is allocated once per dashboard size and every element
+    (main view, stats box, panels) is drawn straight into its region, so
+    a video loop allocates no full-size images per frame. Canvases are
+    used round-robin: a returned dashboard stays valid for the next
+    num_buffers - 1 renders, which must cover any frames still queued
+    for display or encoding.
+    
+    Example:
+        ```python
+        renderer = DashboardRenderer()
+        
+        for frame, result in process_video():
+            display = renderer.render(frame, result.density_map, count=result.crowd_count)
+            cv2.imshow("Dashboard", display)
+        ```
+    """
     
-    return dashboard
+    def __init__(self, show_histogram: bool = True, num_buffers: int = 4):
+        """
+        Initialize renderer.
+        
+        Args:
+            show_histogram: Whether to show density histogram
+            num_buffers: Dashboards kept in rotation (frames in flight + 1)
+        """
+        self.show_histogram = show_histogram
+        self.num_buffers = max(1, num_buffers)
+        self._canvases: List[np.ndarray] = []
+        self._next = 0
+    
+    def _next_canvas(self, dash_h: int, dash_w: int) -> np.ndarray:
+        """Next canvas in the rotation, (re)allocated if the size changed."""
+        if self._canvases and self._canvases[0].shape[:2] != (dash_h, dash_w):
+            self._canvases = []
+        
+        if len(self._canvases) < self.num_buffers:
+            self._canvases.append(np.zeros((dash_h, dash_w, 3), dtype=np.uint8))
+            return self._canvases[-1]
+        
+        canvas = self._canvases[self._next]
+        self._next = (self._next + 1) % self.num_buffers
+        return canvas
+    
+    def render(
+        self,
+        frame: np.ndarray,
+        density_map: np.ndarray,
+        stats: Optional[DensityStats] = None,
+        count: float = 0,
+        density_level: str = "UNKNOWN",
+        fps: float = 0,
+        device_frame=None,
+        device_density_map=None
+    ) -> np.ndarray:
+        """
+        Render a dashboard (arguments as for create_dashboard_frame).
+        
+        Returns:
+            Dashboard frame (one of the renderer's buffers)
+        """
+        from .heatmap import generate_heatmap, overlay_heatmap_gpu
+        
+        h, w = frame.shape[:2]
+        
+        # Target dashboard size
+        dash_w = max(800, w)
+        dash_h = int(dash_w * 0.75)  # 4:3 aspect ratio
+        
+        # Main view height
+        main_h = int(dash_h * 0.75)
+        
+        dashboard = self._next_canvas(dash_h, dash_w)
+        main_view = dashboard[0:main_h]
+        
+        # --- Main View with Heatmap ---
+        if device_frame is not None and device_density_map is not None:
+            # Resize, colorize and blend on the GPU; one image comes back
+            main_view[:] = overlay_heatmap_gpu(
+                device_frame, device_density_map, colormap="turbo", alpha=0.5,
+                target_size=(dash_w, main_h)
+            )
+        else:
+            # Resize frame straight into the main view
+            cv2.resize(frame, (dash_w, main_h), dst=main_view)
+            
+            # Generate and overlay heatmap
+            heatmap = generate_heatmap(density_map, target_size=(dash_w, main_h), colormap="turbo")
+            cv2.addWeighted(main_view, 0.5, heatmap, 0.5, 0, dst=main_view)
+        
+        # Draw stats box
+        stats_dict = {
+            "Count": f"{count:.0f}",
+            "Level": density_level,
+            "FPS": f"{fps:.1f}",
+        }
+        if stats:
+            stats_dict["Density"] = f"{stats.density_per_sqm:.2f}/sqm"
+            stats_dict["Hotspots"] = str(stats.hotspot_count)
+        
+        _draw_stats_box(main_view, stats_dict, density_level)
+        
+        # Draw color bar
+        _draw_color_bar(main_view)
+        
+        # --- Bottom Panel ---
+        panel_w = dash_w // 3
+        bottom = dashboard[main_h:dash_h]
+        
+        # Histogram panel
+        if self.show_histogram:
+            _create_histogram_panel(density_map, panel_w, dash_h - main_h, out=bottom[:, 0:panel_w])
+        else:
+            bottom[:, 0:panel_w] = 0
+        
+        # Mini density map
+        _create_mini_map(density_map, panel_w, dash_h - main_h, out=bottom[:, panel_w:2*panel_w])
+        
+        # Safety meter (takes the remaining width)
+        safety = bottom[:, 2*panel_w:dash_w]
+        _create_safety_meter(
+            density_level,
+            stats.density_per_sqm if stats else count / 100,
+            safety.shape[1], safety.shape[0],
+            out=safety
+        )
+        
+        return dashboard
 
 
 def _draw_stats_box(
@@ -180,57 +381,44 @@ def _draw_stats_box(
     stats: Dict[str, str],
     level: str
 ) -> np.ndarray:
-    """Draw statistics box on main view."""
-    result = frame.copy()
+    """Draw statistics box on main view (in place; the frame is returned)."""
+    result = frame
     
     # Box dimensions
     box_w = 180
     box_h = len(stats) * 30 + 20
     x, y = 15, 15
     
-    # Semi-transparent background
-    overlay = result.copy()
-    cv2.rectangle(overlay, (x, y), (x + box_w, y + box_h), (30, 30, 30), -1)
-    result = cv2.addWeighted(overlay, 0.8, result, 0.2, 0)
+    # Semi-transparent background: 0.8 * (30, 30, 30) + 0.2 * frame,
+    # blended over the box region only
+    box = result[y:y + box_h + 1, x:x + box_w + 1]
+    cv2.convertScaleAbs(box, dst=box, alpha=0.2, beta=0.8 * 30)
     
     # Border color based on level
-    level_colors = {
-        "FREE_FLOW": (0, 200, 0),
-        "LOW": (0, 255, 0),
-        "MEDIUM": (0, 200, 200),
-        "HIGH": (0, 150, 255),
-        "CRITICAL": (0, 0, 255),
-    }
-    border_color = level_colors.get(level, (128, 128, 128))
-    cv2.rectangle(result, (x, y), (x + box_w, y + box_h), border_color, 2)
-    
-    # Stats text
+    border_color = LEVEL_COLORS.get(_level_name(level), (128, 128, 128))
+    
+    # Border and stats text, rasterized once per distinct set of values
+    texts = []
     for i, (key, value) in enumerate(stats.items()):
-        text_y = y + 25 + i * 30
-        cv2.putText(result, f"{key}:", (x + 10, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
-        cv2.putText(result, str(value), (x + 80, text_y),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        text_y = 25 + i * 30
+        texts.append((f"{key}:", (10, text_y), (150, 150, 150)))
+        texts.append((str(value), (80, text_y), (255, 255, 255)))
+    sprite, inv_alpha = _stats_sprite((box_w, box_h), (border_color, 2), tuple(texts))
+    _blit_sprite(result, sprite, inv_alpha, x, y)
     
     return result
 
 
 def _draw_color_bar(frame: np.ndarray) -> np.ndarray:
-    """Draw vertical color bar legend."""
-    result = frame.copy()
+    """Draw vertical color bar legend (in place; the frame is returned)."""
+    result = frame
     h, w = result.shape[:2]
     
-    bar_w = 20
-    bar_h = 120
+    bar_h, bar_w = COLOR_BAR_IMAGE.shape[:2]
     x = w - bar_w - 20
     y = (h - bar_h) // 2
     
-    # Gradient
-    gradient = np.linspace(255, 0, bar_h).astype(np.uint8).reshape(-1, 1)
-    gradient = np.repeat(gradient, bar_w, axis=1)
-    color_bar = cv2.applyColorMap(gradient, cv2.COLORMAP_TURBO)
-    
-    result[y:y+bar_h, x:x+bar_w] = color_bar
+    result[y:y+bar_h, x:x+bar_w] = COLOR_BAR_IMAGE
     cv2.rectangle(result, (x-1, y-1), (x+bar_w, y+bar_h), (255, 255, 255), 1)
     
     # Labels
@@ -245,10 +433,11 @@ def _draw_color_bar(frame: np.ndarray) -> np.ndarray:
 def _create_histogram_panel(
     density_map: np.ndarray,
     width: int,
-    height: int
+    height: int,
+    out: Optional[np.ndarray] = None
 ) -> np.ndarray:
-    """Create density histogram panel."""
-    panel = np.zeros((height, width, 3), dtype=np.uint8)
+    """Create density histogram panel (drawn into out if given)."""
+    panel = out if out is not None else np.empty((height, width, 3), dtype=np.uint8)
     panel[:] = (30, 30, 30)  # Dark background
     
     # Calculate histogram
@@ -264,29 +453,30 @@ def _create_histogram_panel(
                     cv2.FONT_HERSHEY_SIMPLEX, 0.5, (100, 100, 100), 1)
         return panel
     
-    # Create histogram
-    hist_bins = 30
-    hist, bin_edges = np.histogram(values, bins=hist_bins)
+    # Create histogram (same bins as np.histogram: [min, max], last
+    # bin closed; calcHist's upper bound is exclusive)
+    hist_bins = HISTOGRAM_BINS
+    v_min, v_max = float(values.min()), float(values.max())
+    if v_max > v_min:
+        hist_range = [v_min, float(np.nextafter(np.float32(v_max), np.float32(np.inf)))]
+    else:
+        hist_range = [v_min - 0.5, v_max + 0.5]
+    hist = cv2.calcHist(
+        [values.astype(np.float32, copy=False).reshape(-1, 1)], [0], None, [hist_bins], hist_range
+    ).ravel()
     
     # Normalize histogram heights
-    max_hist = max(hist) if max(hist) > 0 else 1
+    max_hist = hist.max() if hist.max() > 0 else 1
     hist_normalized = (hist / max_hist * (height - 40)).astype(int)
     
-    # Draw histogram bars
+    # Draw histogram bars (filled rectangles as slice assignments)
     bar_width = (width - 40) // hist_bins
+    y1 = height - 20
     
     for i, h_val in enumerate(hist_normalized):
         x1 = 20 + i * bar_width
-        y1 = height - 20
         x2 = x1 + bar_width - 2
-        y2 = y1 - h_val
-        
-        # Color based on position (low to high)
-        color_val = int(255 * i / hist_bins)
-        color = cv2.applyColorMap(np.array([[color_val]], dtype=np.uint8), cv2.COLORMAP_TURBO)[0, 0]
-        color = tuple(map(int, color))
-        
-        cv2.rectangle(panel, (x1, y2), (x2, y1), color, -1)
+        panel[y1 - h_val:y1 + 1, x1:x2 + 1] = HISTOGRAM_BAR_COLORS[i]
     
     # Title
     cv2.putText(panel, "Density Distribution", (10, 20),
@@ -298,12 +488,13 @@ def _create_histogram_panel(
 def _create_mini_map(
     density_map: np.ndarray,
     width: int,
-    height: int
+    height: int,
+    out: Optional[np.ndarray] = None
 ) -> np.ndarray:
-    """Create mini density map view."""
+    """Create mini density map view (drawn into out if given)."""
     from .heatmap import generate_heatmap
     
-    panel = np.zeros((height, width, 3), dtype=np.uint8)
+    panel = out if out is not None else np.empty((height, width, 3), dtype=np.uint8)
     panel[:] = (30, 30, 30)
     
     # Generate small heatmap
@@ -330,10 +521,11 @@ def _create_safety_meter(
     level: str,
     density_per_sqm: float,
     width: int,
-    height: int
+    height: int,
+    out: Optional[np.ndarray] = None
 ) -> np.ndarray:
-    """Create safety meter visualization."""
-    panel = np.zeros((height, width, 3), dtype=np.uint8)
+    """Create safety meter visualization (drawn into out if given)."""
+    panel = out if out is not None else np.empty((height, width, 3), dtype=np.uint8)
     panel[:] = (30, 30, 30)
     
     # Title
@@ -341,15 +533,9 @@ def _create_safety_meter(
                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
     
     # Level indicator
-    level_colors = {
-        "FREE_FLOW": ((0, 200, 0), "SAFE"),
-        "LOW": ((0, 255, 0), "SAFE"),
-        "MEDIUM": ((0, 200, 200), "MONITOR"),
-        "HIGH": ((0, 150, 255), "WARNING"),
-        "CRITICAL": ((0, 0, 255), "DANGER"),
-    }
-    
-    color, status = level_colors.get(level, ((128, 128, 128), "UNKNOWN"))
+    level = _level_name(level)
+    color = LEVEL_COLORS.get(level, (128, 128, 128))
+    status = SAFETY_STATUS.get(level, "UNKNOWN")
     
     # Large status indicator
     center_x = width // 2
@@ -366,7 +552,7 @@ def _create_safety_meter(
     text_y = center_y + text_size[1] // 2
     
     # Contrast text color
-    text_color = (0, 0, 0) if level in ["FREE_FLOW", "LOW", "MEDIUM"] else (255, 255, 255)
+    text_color = (0, 0, 0) if level in _LIGHT_LEVELS else (255, 255, 255)
     cv2.putText(panel, status, (text_x, text_y),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, text_color, 2)
     
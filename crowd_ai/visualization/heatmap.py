@@ -4,10 +4,24 @@ Heatmap Visualization
 Generate and overlay density heatmaps on video frames.
 """
 
+from functools import lru_cache
 from typing import Optional, Tuple
 import cv2
 import numpy as np
 
+try:
+    import torch
+    import torch.nn.functional as F
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 # Colormap presets for density visualization
 COLORMAP_PRESETS = {
@@ -19,13 +33,35 @@ COLORMAP_PRESETS = {
 }
 
 
+if NUMBA_AVAILABLE:
+    @numba.njit(parallel=True, fastmath=True, cache=True, boundscheck=False)
+    def _normalize_lut_kernel(density_map, lut, min_v, scale, out):
+        """Float density [H, W] -> scaled, rounded, clipped, colorized BGR [H, W, 3]."""
+        for y in numba.prange(density_map.shape[0]):
+            for x in range(density_map.shape[1]):
+                v = (density_map[y, x] - min_v) * scale + 0.5
+                u = 0 if v < 0.0 else (255 if v >= 255.0 else int(v))
+                for c in range(3):
+                    out[y, x, c] = lut[u, c]
+
+
+def _as_2d(density_map: np.ndarray) -> np.ndarray:
+    """Density map as [H, W] (drops a leading or trailing channel axis)."""
+    if density_map.ndim == 3:
+        return density_map[0] if density_map.shape[0] == 1 else density_map[:, :, 0]
+    return density_map
+
+
 def generate_heatmap(
     density_map: np.ndarray,
     target_size: Optional[Tuple[int, int]] = None,
     colormap: str = "jet",
     normalize: bool = True,
     min_val: Optional[float] = None,
-    max_val: Optional[float] = None
+    max_val: Optional[float] = None,
+    user_lut: Optional[np.ndarray] = None,
+    out: Optional[np.ndarray] = None,
+    colormap_first: bool = False
 ) -> np.ndarray:
     """
     Generate colored heatmap from density map.
@@ -37,43 +73,243 @@ def generate_heatmap(
         normalize: Whether to normalize values to [0, 255]
         min_val: Minimum value for normalization (uses min if None)
         max_val: Maximum value for normalization (uses max if None)
+        user_lut: Precomputed 256x1x3 BGR lookup table; overrides colormap
+        out: Optional preallocated uint8 [H', W', 3] buffer for the result
+        colormap_first: Colorize at density-map resolution and resize the
+                        BGR image instead. Faster when upscaling a lot, but
+                        blends colors rather than density values between
+                        map cells, so edges look slightly different
         
     Returns:
         BGR heatmap image [H', W', 3]
     """
     # Ensure 2D
-    if density_map.ndim == 3:
-        density_map = density_map[0] if density_map.shape[0] == 1 else density_map[:, :, 0]
+    density_map = _as_2d(density_map)
+    
+    if user_lut is None:
+        user_lut = _colormap_table(colormap)
+    
+    h, w = density_map.shape
+    if (
+        NUMBA_AVAILABLE
+        and normalize
+        and min_val is None
+        and (target_size is None or tuple(target_size) == (w, h))
+        and density_map.dtype in (np.float32, np.float64)
+    ):
+        # No resize needed: normalize and colorize in one fused pass
+        min_v, data_max, _, _ = cv2.minMaxLoc(density_map)
+        max_v = max_val if max_val is not None else data_max
+        scale = 255.0 / (max_v - min_v) if max_v > min_v else 0.0
+        if out is None:
+            out = np.empty((h, w, 3), dtype=np.uint8)
+        _normalize_lut_kernel(density_map, user_lut.reshape(256, 3), min_v, scale, out)
+        return out
     
     # Normalize to 0-255 range
-    if normalize:
-        min_v = min_val if min_val is not None else density_map.min()
-        max_v = max_val if max_val is not None else density_map.max()
+    if normalize and min_val is None and max_val is None:
+        # Scan, scale and uint8 cast in one OpenCV call (all zeros if flat)
+        normalized = cv2.normalize(density_map, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+    elif normalize:
+        if min_val is None or max_val is None:
+            data_min, data_max, _, _ = cv2.minMaxLoc(density_map)
+        min_v = min_val if min_val is not None else data_min
+        max_v = max_val if max_val is not None else data_max
         
-        if max_v > min_v:
-            normalized = ((density_map - min_v) / (max_v - min_v) * 255)
+        if max_v > min_v and min_val is None:
+            # Every value is >= min_v, so the abs is a no-op and this is a
+            # single saturating scale-and-convert pass
+            scale = 255.0 / (max_v - min_v)
+            normalized = cv2.convertScaleAbs(density_map, alpha=scale, beta=-min_v * scale)
+        elif max_v > min_v:
+            # Same arithmetic as (x - min) / range * 255, in one float scratch
+            normalized = np.subtract(
+                density_map, min_v, dtype=np.result_type(density_map.dtype, np.float32)
+            )
+            np.divide(normalized, max_v - min_v, out=normalized)
+            np.multiply(normalized, 255, out=normalized)
+            normalized = normalized.astype(np.uint8)
         else:
-            normalized = np.zeros_like(density_map)
-        
-        normalized = normalized.astype(np.uint8)
+            normalized = np.zeros(density_map.shape, dtype=np.uint8)
     else:
         normalized = density_map.astype(np.uint8)
     
+    if colormap_first and target_size is not None:
+        heatmap = cv2.applyColorMap(normalized, user_lut)
+        return cv2.resize(heatmap, target_size, dst=out, interpolation=cv2.INTER_LINEAR)
+    
     # Resize if target size specified
     if target_size is not None:
         normalized = cv2.resize(normalized, target_size, interpolation=cv2.INTER_LINEAR)
     
     # Apply colormap
-    cmap = COLORMAP_PRESETS.get(colormap, cv2.COLORMAP_JET)
-    heatmap = cv2.applyColorMap(normalized, cmap)
+    heatmap = cv2.applyColorMap(normalized, user_lut, dst=out)
     
     return heatmap
 
 
+@lru_cache(maxsize=None)
+def _colormap_table(colormap: str) -> np.ndarray:
+    """256x1x3 BGR lookup table for an OpenCV colormap, built once."""
+    cmap = COLORMAP_PRESETS.get(colormap, cv2.COLORMAP_JET)
+    ramp = np.arange(256, dtype=np.uint8).reshape(256, 1)
+    lut = cv2.applyColorMap(ramp, cmap)
+    lut.setflags(write=False)
+    return lut
+
+
+# Peak density below which a map is treated as empty (no heatmap to draw)
+EMPTY_DENSITY_EPS = 1e-6
+
+# Level text colors (BGR) in DensityVisualizer's count box
+COUNT_LEVEL_COLORS = {
+    "FREE_FLOW": (0, 200, 0),
+    "LOW": (0, 255, 0),
+    "MEDIUM": (0, 255, 255),
+    "HIGH": (0, 165, 255),
+    "CRITICAL": (0, 0, 255),
+}
+
+
+def _draw_count_box(
+    frame: np.ndarray,
+    count_text: str,
+    level: Optional[str],
+    font_scale: float
+):
+    """Draw the count box (black fill, white border, count and level text)."""
+    # Background box
+    box_height = 80 if level else 50
+    cv2.rectangle(frame, (10, 10), (200, 10 + box_height), (0, 0, 0), -1)
+    cv2.rectangle(frame, (10, 10), (200, 10 + box_height), (255, 255, 255), 1)
+    
+    # Count text
+    cv2.putText(
+        frame, count_text, (20, 40),
+        cv2.FONT_HERSHEY_SIMPLEX, font_scale,
+        (255, 255, 255), 2
+    )
+    
+    # Level text with color
+    if level:
+        color = COUNT_LEVEL_COLORS.get(level, (255, 255, 255))
+        cv2.putText(
+            frame, f"Level: {level}", (20, 75),
+            cv2.FONT_HERSHEY_SIMPLEX, font_scale * 0.8,
+            color, 2
+        )
+
+
+@lru_cache(maxsize=256)
+def _count_box_tile(count_text: str, level: Optional[str], font_scale: float) -> Optional[np.ndarray]:
+    """
+    Pre-rendered count box covering frame[10:11+box_height, 10:201].
+    
+    Returns None when the text would spill past the box, since the
+    overflow then depends on the frame underneath.
+    """
+    box_height = 80 if level else 50
+    texts = [(count_text, (20, 40), font_scale)]
+    if level:
+        texts.append((f"Level: {level}", (20, 75), font_scale * 0.8))
+    
+    for text, (tx, ty), scale in texts:
+        (text_w, text_h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+        if tx + text_w + 2 >= 200 or ty - text_h - 2 <= 10 or ty + baseline + 2 >= 10 + box_height:
+            return None
+    
+    canvas = np.zeros((11 + box_height, 201, 3), dtype=np.uint8)
+    _draw_count_box(canvas, count_text, level, font_scale)
+    tile = canvas[10:, 10:]
+    tile.setflags(write=False)
+    return tile
+
+
+# Density scale bar size in DensityVisualizer (pixels, excluding border)
+DENSITY_BAR_WIDTH = 20
+DENSITY_BAR_HEIGHT = 150
+
+
+@lru_cache(maxsize=None)
+def _density_bar_tile(colormap: str) -> np.ndarray:
+    """Density scale bar (high at top) with its 1px white border, built once."""
+    gradient = np.linspace(0, 255, DENSITY_BAR_HEIGHT).astype(np.uint8)
+    gradient = gradient[::-1].reshape(-1, 1)  # Reverse (high at top)
+    gradient = np.repeat(gradient, DENSITY_BAR_WIDTH, axis=1)
+    
+    tile = np.full((DENSITY_BAR_HEIGHT + 2, DENSITY_BAR_WIDTH + 2, 3), 255, dtype=np.uint8)
+    tile[1:-1, 1:-1] = cv2.applyColorMap(gradient, _colormap_table(colormap))
+    tile.setflags(write=False)
+    return tile
+
+
+@lru_cache(maxsize=None)
+def _colormap_lut(colormap: str, device: "torch.device") -> "torch.Tensor":
+    """256-entry BGR lookup table for an OpenCV colormap, on a device."""
+    lut = _colormap_table(colormap).reshape(256, 3).copy()
+    return torch.from_numpy(lut).to(device)
+
+
+def overlay_heatmap_gpu(
+    frame: "torch.Tensor",
+    density_map: "torch.Tensor",
+    colormap: str = "jet",
+    alpha: float = 0.5,
+    min_val: Optional[float] = None,
+    max_val: Optional[float] = None,
+    target_size: Optional[Tuple[int, int]] = None
+) -> np.ndarray:
+    """
+    Colorize a density map and blend it onto a frame entirely on the GPU.
+    
+    Equivalent to generate_heatmap() + overlay_heatmap(), but only the
+    final BGR image is copied back to the host.
+    
+    Args:
+        frame: uint8 BGR frame [H, W, 3] on the GPU
+        density_map: Density map [H', W'] on the same device
+        colormap: Colormap name ('jet', 'hot', 'inferno', 'turbo', 'plasma')
+        alpha: Blending factor (0 = only frame, 1 = only heatmap)
+        min_val: Minimum value for normalization (uses min if None)
+        max_val: Maximum value for normalization (uses max if None); may
+                 be a 0-d tensor on the device, which avoids a sync
+        target_size: Output size (width, height); frame is resized to it
+        
+    Returns:
+        Blended BGR image [H, W, 3] (uint8, host)
+    """
+    frame = frame.float()
+    if target_size is not None and (frame.shape[1], frame.shape[0]) != tuple(target_size):
+        frame = F.interpolate(
+            frame.permute(2, 0, 1)[None], size=(target_size[1], target_size[0]),
+            mode="bilinear", align_corners=False
+        )[0].permute(1, 2, 0)
+    h, w = frame.shape[:2]
+    density = density_map.float()
+    
+    # Normalize to 0-255 range
+    min_v = density.min() if min_val is None else torch.as_tensor(min_val, dtype=torch.float32, device=density.device)
+    max_v = density.max() if max_val is None else torch.as_tensor(max_val, dtype=torch.float32, device=density.device)
+    scale = torch.where(max_v > min_v, 255.0 / (max_v - min_v), torch.zeros_like(max_v))
+    normalized = ((density - min_v) * scale).clamp_(0, 255)
+    
+    # Resize, then quantize to colormap indices
+    normalized = F.interpolate(
+        normalized[None, None], size=(h, w), mode="bilinear", align_corners=False
+    )[0, 0]
+    heatmap = _colormap_lut(colormap, frame.device)[normalized.to(torch.uint8).long()]
+    
+    # Blend
+    blended = torch.lerp(frame, heatmap.float(), alpha).round_().to(torch.uint8)
+    
+    return blended.cpu().numpy()
+
+
 def overlay_heatmap(
     frame: np.ndarray,
     heatmap: np.ndarray,
-    alpha: float = 0.5
+    alpha: float = 0.5,
+    out: Optional[np.ndarray] = None
 ) -> np.ndarray:
     """
     Overlay heatmap on original frame.
@@ -82,6 +318,7 @@ def overlay_heatmap(
         frame: Original BGR frame [H, W, 3]
         heatmap: Colored heatmap [H, W, 3]
         alpha: Blending factor (0 = only frame, 1 = only heatmap)
+        out: Optional preallocated buffer for the result (may be frame)
         
     Returns:
         Blended image [H, W, 3]
@@ -91,7 +328,13 @@ def overlay_heatmap(
         heatmap = cv2.resize(heatmap, (frame.shape[1], frame.shape[0]))
     
     # Blend
-    blended = cv2.addWeighted(frame, 1 - alpha, heatmap, alpha, 0)
+    if frame.dtype != np.uint8 or heatmap.dtype != np.uint8:
+        raise ValueError(
+            f"overlay_heatmap expects uint8 images, got {frame.dtype} and {heatmap.dtype}"
+        )
+    
+    # uint8 in, uint8 out keeps addWeighted on its vectorized fast path
+    blended = cv2.addWeighted(frame, 1 - alpha, heatmap, alpha, 0, dst=out)
     
     return blended
 
@@ -122,7 +365,8 @@ class DensityVisualizer:
         alpha: float = 0.5,
         show_count: bool = True,
         show_density_bar: bool = True,
-        font_scale: float = 0.8
+        font_scale: float = 0.8,
+        use_umat: bool = False
     ):
         """
         Initialize visualizer.
@@ -133,16 +377,45 @@ class DensityVisualizer:
             show_count: Whether to display crowd count on frame
             show_density_bar: Whether to show density color bar
             font_scale: Font size scaling factor
+            use_umat: Run the numpy-path heatmap chain (normalize, resize,
+                      colormap, blend) on cv2.UMat so OpenCV can keep it
+                      on an OpenCL device, downloading only the result
         """
+        if use_umat and not cv2.ocl.haveOpenCL():
+            print("OpenCL not available, UMat heatmap path will run on the CPU")
+        
         self.colormap = colormap
         self.alpha = alpha
         self.show_count = show_count
         self.show_density_bar = show_density_bar
         self.font_scale = font_scale
+        self.use_umat = use_umat
         
         # For consistent normalization across frames
         self._max_density = 0.0
+        self._max_density_gpu = None  # Device-side running max (GPU path)
         self._adaptive_max = True
+        
+        # Heatmap scratch buffer, reused while the frame size is unchanged
+        self._heatmap_buf: Optional[np.ndarray] = None
+        self._empty_buf: Optional[np.ndarray] = None  # Solid zero-density heatmap
+    
+    @property
+    def _lut(self) -> np.ndarray:
+        """Cached BGR lookup table for the current colormap."""
+        return _colormap_table(self.colormap)
+    
+    def _empty_heatmap(self, h: int, w: int) -> np.ndarray:
+        """Heatmap of an all-zero density map, rebuilt only on size/colormap change."""
+        color = self._lut[0, 0]
+        if (
+            self._empty_buf is None
+            or self._empty_buf.shape[:2] != (h, w)
+            or not np.array_equal(self._empty_buf[0, 0], color)
+        ):
+            self._empty_buf = np.empty((h, w, 3), dtype=np.uint8)
+            self._empty_buf[:] = color
+        return self._empty_buf
     
     def set_fixed_scale(self, max_density: float):
         """
@@ -152,8 +425,32 @@ class DensityVisualizer:
             max_density: Maximum density value for normalization
         """
         self._max_density = max_density
+        self._max_density_gpu = None
         self._adaptive_max = False
     
+    def running_max_gpu(self, density_map: "torch.Tensor"):
+        """
+        Normalization max for a GPU density map, kept on the device.
+        
+        Same rule as the numpy path (running max of 1.2x each frame's
+        peak) without reading the peak back to the host every frame.
+        
+        Args:
+            density_map: Density map tensor on the GPU
+            
+        Returns:
+            0-d tensor on the map's device, or the fixed scale (float)
+        """
+        if not self._adaptive_max:
+            return self._max_density if self._max_density > 0 else None
+        
+        peak = density_map.max().float() * 1.2
+        if self._max_density_gpu is None or self._max_density_gpu.device != peak.device:
+            self._max_density_gpu = torch.clamp(peak, min=self._max_density)
+        else:
+            self._max_density_gpu = torch.maximum(self._max_density_gpu, peak)
+        return self._max_density_gpu
+    
     def visualize(
         self,
         frame: np.ndarray,
@@ -165,118 +462,144 @@ class DensityVisualizer:
         Generate visualization with heatmap overlay.
         
         Args:
-            frame: Original BGR frame
-            density_map: Density map from model
+            frame: Original BGR frame (numpy, or uint8 tensor on the GPU)
+            density_map: Density map from model (numpy, or a GPU tensor
+                         to render on the device)
             count: Crowd count to display
             density_level: Density level string (e.g., "HIGH")
             
         Returns:
             Visualized frame with heatmap
         """
-        # Update adaptive max
-        current_max = float(density_map.max())
-        if self._adaptive_max:
-            self._max_density = max(self._max_density, current_max * 1.2)
-        
-        # Generate heatmap
-        heatmap = generate_heatmap(
-            density_map,
-            target_size=(frame.shape[1], frame.shape[0]),
-            colormap=self.colormap,
-            max_val=self._max_density if self._max_density > 0 else None
-        )
-        
-        # Overlay on frame
-        result = overlay_heatmap(frame, heatmap, self.alpha)
+        if TORCH_AVAILABLE and isinstance(density_map, torch.Tensor):
+            # GPU map (InferenceResult.device_density_map): colorize and
+            # blend on the device, copy back only the final image
+            if not isinstance(frame, torch.Tensor):
+                frame = torch.from_numpy(frame).to(density_map.device)
+            result = overlay_heatmap_gpu(
+                frame, density_map, self.colormap, self.alpha,
+                max_val=self.running_max_gpu(density_map)
+            )
+        else:
+            # Update adaptive max
+            current_max = float(density_map.max())
+            if self._adaptive_max:
+                self._max_density = max(self._max_density, current_max * 1.2)
+            max_val = self._max_density if self._max_density > 0 else None
+            
+            if self.use_umat:
+                result = self._overlay_umat(frame, density_map, max_val)
+            else:
+                result = self._overlay(frame, density_map, current_max, max_val)
         
-        # Add annotations
+        # Add annotations (result is a fresh blend, so draw on it in place)
         if self.show_count and count is not None:
-            result = self._draw_count(result, count, density_level)
+            self._draw_count(result, count, density_level)
         
         if self.show_density_bar:
-            result = self._draw_density_bar(result)
+            self._draw_density_bar_inplace(result)
         
         return result
     
+    def _overlay(
+        self,
+        frame: np.ndarray,
+        density_map: np.ndarray,
+        current_max: float,
+        max_val: Optional[float]
+    ) -> np.ndarray:
+        """Heatmap + blend on the CPU, reusing the scratch buffers."""
+        # Generate heatmap into the reused scratch buffer
+        h, w = frame.shape[:2]
+        if self._heatmap_buf is None or self._heatmap_buf.shape[:2] != (h, w):
+            self._heatmap_buf = np.empty((h, w, 3), dtype=np.uint8)
+        if current_max < EMPTY_DENSITY_EPS:
+            # Empty scene: every pixel maps to the colormap's zero color,
+            # so reuse a solid image instead of normalizing/colorizing
+            heatmap = self._empty_heatmap(h, w)
+        else:
+            heatmap = generate_heatmap(
+                density_map,
+                target_size=(w, h),
+                max_val=max_val,
+                user_lut=self._lut,
+                out=self._heatmap_buf
+            )
+        
+        # Overlay on frame
+        result = overlay_heatmap(frame, heatmap, self.alpha)
+        
+        return result
+    
+    def _overlay_umat(
+        self,
+        frame: np.ndarray,
+        density_map: np.ndarray,
+        max_val: Optional[float]
+    ) -> np.ndarray:
+        """Heatmap + blend through cv2.UMat (OpenCL T-API), one download at the end."""
+        density_map = np.ascontiguousarray(_as_2d(density_map))
+        density = cv2.UMat(density_map)
+        
+        min_v, max_v, _, _ = cv2.minMaxLoc(density)
+        if max_val is not None:
+            max_v = max_val
+        
+        h, w = frame.shape[:2]
+        if max_v > min_v:
+            scale = 255.0 / (max_v - min_v)
+            normalized = cv2.convertScaleAbs(density, alpha=scale, beta=-min_v * scale)
+        else:
+            normalized = cv2.UMat(np.zeros(density_map.shape, dtype=np.uint8))
+        normalized = cv2.resize(normalized, (w, h), interpolation=cv2.INTER_LINEAR)
+        heatmap = cv2.applyColorMap(normalized, self._lut)
+        
+        blended = cv2.addWeighted(cv2.UMat(frame), 1 - self.alpha, heatmap, self.alpha, 0)
+        return blended.get()
+    
     def _draw_count(
         self,
         frame: np.ndarray,
         count: float,
         level: Optional[str] = None
     ) -> np.ndarray:
-        """Draw count annotation on frame."""
-        result = frame.copy()
-        
-        # Background box
+        """Draw count annotation directly onto frame."""
         box_height = 80 if level else 50
-        cv2.rectangle(result, (10, 10), (200, 10 + box_height), (0, 0, 0), -1)
-        cv2.rectangle(result, (10, 10), (200, 10 + box_height), (255, 255, 255), 1)
-        
-        # Count text
         count_text = f"Count: {count:.0f}"
-        cv2.putText(
-            result, count_text, (20, 40),
-            cv2.FONT_HERSHEY_SIMPLEX, self.font_scale,
-            (255, 255, 255), 2
-        )
+        tile = _count_box_tile(count_text, level, self.font_scale)
         
-        # Level text with color
-        if level:
-            level_colors = {
-                "FREE_FLOW": (0, 200, 0),
-                "LOW": (0, 255, 0),
-                "MEDIUM": (0, 255, 255),
-                "HIGH": (0, 165, 255),
-                "CRITICAL": (0, 0, 255),
-            }
-            color = level_colors.get(level, (255, 255, 255))
-            
-            cv2.putText(
-                result, f"Level: {level}", (20, 75),
-                cv2.FONT_HERSHEY_SIMPLEX, self.font_scale * 0.8,
-                color, 2
-            )
+        # The box is opaque, so a cached tile is exact when it fits the frame
+        if tile is not None and frame.shape[0] > 10 + box_height and frame.shape[1] > 200:
+            frame[10:10 + box_height + 1, 10:201] = tile
+        else:
+            _draw_count_box(frame, count_text, level, self.font_scale)
         
-        return result
+        return frame
     
-    def _draw_density_bar(self, frame: np.ndarray) -> np.ndarray:
-        """Draw density color scale bar."""
-        result = frame.copy()
-        h, w = result.shape[:2]
-        
-        # Bar dimensions
-        bar_width = 20
-        bar_height = 150
-        bar_x = w - bar_width - 20
-        bar_y = (h - bar_height) // 2
-        
-        # Create gradient bar
-        gradient = np.linspace(0, 255, bar_height).astype(np.uint8)
-        gradient = gradient[::-1].reshape(-1, 1)  # Reverse (high at top)
-        gradient = np.repeat(gradient, bar_width, axis=1)
-        
-        # Apply colormap
-        cmap = COLORMAP_PRESETS.get(self.colormap, cv2.COLORMAP_JET)
-        color_bar = cv2.applyColorMap(gradient, cmap)
-        
-        # Paste on frame
-        result[bar_y:bar_y+bar_height, bar_x:bar_x+bar_width] = color_bar
-        
-        # Border
-        cv2.rectangle(
-            result,
-            (bar_x - 1, bar_y - 1),
-            (bar_x + bar_width, bar_y + bar_height),
-            (255, 255, 255), 1
-        )
+    def _draw_density_bar_inplace(self, frame: np.ndarray) -> np.ndarray:
+        """Draw density color scale bar directly onto frame."""
+        h, w = frame.shape[:2]
+        
+        # Bar position (the cached tile includes the 1px border)
+        bar_x = w - DENSITY_BAR_WIDTH - 20
+        bar_y = (h - DENSITY_BAR_HEIGHT) // 2
+        tile = _density_bar_tile(self.colormap)
+        
+        # Clip to the frame (the border falls off the edge on small frames)
+        y0, x0 = bar_y - 1, bar_x - 1
+        ty, tx = max(0, -y0), max(0, -x0)
+        y1 = min(h, y0 + tile.shape[0])
+        x1 = min(w, x0 + tile.shape[1])
+        if y1 > y0 + ty and x1 > x0 + tx:
+            frame[y0 + ty:y1, x0 + tx:x1] = tile[ty:y1 - y0, tx:x1 - x0]
         
         # Labels
-        cv2.putText(result, "High", (bar_x - 40, bar_y + 15),
+        cv2.putText(frame, "High", (bar_x - 40, bar_y + 15),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-        cv2.putText(result, "Low", (bar_x - 35, bar_y + bar_height - 5),
+        cv2.putText(frame, "Low", (bar_x - 35, bar_y + DENSITY_BAR_HEIGHT - 5),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
         
-        return result
+        return frame
     
     def visualize_zones(
         self,
@@ -290,6 +613,7 @@ class DensityVisualizer:
         Args:
             frame: Original frame
             zones: List of zone dicts from DensityAnalyzer.analyze_zones()
+                   ("color" RGB, or precomputed "color_bgr")
             show_counts: Whether to show count per zone
             
         Returns:
@@ -298,20 +622,26 @@ class DensityVisualizer:
         result = frame.copy()
         overlay = result.copy()
         
-        for zone in zones:
-            bounds = zone["bounds"]
-            x1, y1, x2, y2 = bounds["x1"], bounds["y1"], bounds["x2"], bounds["y2"]
-            
-            # Scale bounds to frame size
+        if zones:
+            # Scale all bounds to frame size at once (last zone holds the map extent)
             h, w = frame.shape[:2]
-            x1_scaled = int(x1 / zones[-1]["bounds"]["x2"] * w)
-            x2_scaled = int(x2 / zones[-1]["bounds"]["x2"] * w)
-            y1_scaled = int(y1 / zones[-1]["bounds"]["y2"] * h)
-            y2_scaled = int(y2 / zones[-1]["bounds"]["y2"] * h)
-            
-            # Zone color based on level
-            color = zone["color"][::-1]  # RGB to BGR
+            bounds = np.array(
+                [[z["bounds"]["x1"], z["bounds"]["y1"], z["bounds"]["x2"], z["bounds"]["y2"]]
+                 for z in zones],
+                dtype=np.float64
+            )
+            scaled = bounds / bounds[-1, [2, 3, 2, 3]] * np.array([w, h, w, h])
+            scaled = scaled.astype(np.int64).tolist()
             
+            # Zone colors: analyze_zones() provides BGR, otherwise flip RGB
+            colors = [
+                z["color_bgr"] if "color_bgr" in z else z["color"][::-1]
+                for z in zones
+            ]
+        else:
+            scaled, colors = [], []
+        
+        for zone, (x1_scaled, y1_scaled, x2_scaled, y2_scaled), color in zip(zones, scaled, colors):
             # Semi-transparent fill
             cv2.rectangle(overlay, (x1_scaled, y1_scaled), (x2_scaled, y2_scaled), color, -1)
             
@@ -18,12 +18,21 @@ Free for non-commercial use.
 
 Installation:
     pip install ultralytics
+
+TensorRT (optional):
+    Export an INT8 engine once with export_tensorrt_engine() and pass
+    its path as YOLOv8Detector(engine_path=...) for faster GPU inference.
 """
 
 from typing import Optional, List, Tuple, Dict
 from dataclasses import dataclass
+from pathlib import Path
+import json
+import threading
 import numpy as np
 
+from .capture.frame_pool import hold_until
+
 try:
     from ultralytics import YOLO
     YOLO_AVAILABLE = True
@@ -31,6 +40,39 @@ except ImportError:
     YOLO_AVAILABLE = False
 
 
+# Pinned staging buffers kept for GPU frame uploads (frames in flight)
+STAGING_BUFFERS = 4
+
+# Default directory for exported TensorRT engines
+DEFAULT_ENGINE_DIR = Path(__file__).parent / "weights"
+
+
+def _engine_batch_info(engine_path: str) -> Tuple[int, bool]:
+    """
+    (batch size, dynamic) of an Ultralytics-exported TensorRT engine.
+    
+    Ultralytics prefixes the serialized engine with its export metadata
+    (4-byte little-endian length + JSON). Engines without readable
+    metadata are treated as static batch 1, the export default.
+    """
+    try:
+        with open(engine_path, "rb") as f:
+            meta_len = int.from_bytes(f.read(4), byteorder="little", signed=True)
+            if not 0 < meta_len < 1 << 20:
+                return 1, False
+            metadata = json.loads(f.read(meta_len).decode("utf-8"))
+        batch = max(1, int(metadata.get("batch", 1)))
+        dynamic = bool(metadata.get("args", {}).get("dynamic", False))
+        return batch, dynamic
+    except (OSError, ValueError, UnicodeDecodeError, AttributeError):
+        return 1, False
+
+
+def default_engine_path(model_size: str = "n", precision: str = "int8") -> Path:
+    """Get the default TensorRT engine path for a model size and precision."""
+    return DEFAULT_ENGINE_DIR / f"yolov8{model_size}_{precision}.engine"
+
+
 @dataclass
 class PersonDetection:
     """A single person detection."""
@@ -86,7 +128,11 @@ class YOLOv8Detector:
         self,
         model_size: str = "n",  # n, s, m, l, x
         confidence_threshold: float = 0.5,
-        device: Optional[str] = None
+        device: Optional[str] = None,
+        engine_path: Optional[str] = None,
+        imgsz: int = 640,
+        gpu_preprocess: bool = True,
+        precision: str = "fp16"
     ):
         """
         Initialize YOLOv8 detector.
@@ -96,6 +142,18 @@ class YOLOv8Detector:
                         Smaller = faster, larger = more accurate
             confidence_threshold: Minimum detection confidence
             device: Device to run on ('cpu', 'cuda', or None for auto)
+            engine_path: Optional TensorRT engine (e.g. yolov8n_int8.engine).
+                         Falls back to the FP16 engine, then to the PyTorch
+                         weights if the engine file is missing.
+            imgsz: Square network input size
+            gpu_preprocess: Letterbox/normalize frames on the GPU when
+                            running on CUDA instead of Ultralytics' CPU path
+            precision: 'fp32', 'fp16' or 'int8'. 'fp16' runs the PyTorch
+                       weights in half precision on CUDA. 'int8' loads the
+                       default INT8 engine (see export_tensorrt_engine())
+                       when no engine_path is given, then falls back as
+                       above. Engines keep the precision they were built
+                       with; detection output format is unchanged.
         """
         if not YOLO_AVAILABLE:
             raise ImportError(
@@ -103,17 +161,169 @@ class YOLOv8Detector:
                 "Install with: pip install ultralytics"
             )
         
+        if precision not in ("fp32", "fp16", "int8"):
+            raise ValueError(f"Unknown precision: {precision}")
+        
         self.confidence_threshold = confidence_threshold
         self.device = device
+        self.imgsz = imgsz
+        self._preprocess_device = self._get_preprocess_device(device) if gpu_preprocess else None
         
-        # Load pretrained YOLO model
-        model_name = f"yolov8{model_size}.pt"
+        # Pinned host buffers for async frame uploads: [tensor, copy-done event]
+        self._staging: list = []
+        self._staging_index = 0
+        
+        # The Ultralytics predictor and the staging ring are not thread-safe
+        self._lock = threading.Lock()
+        
+        # Load TensorRT engine if available, otherwise pretrained YOLO model
+        if precision == "int8" and engine_path is None:
+            engine_path = str(default_engine_path(model_size, "int8"))
+        model_name = self._resolve_model_path(model_size, engine_path)
         print(f"Loading YOLOv8 model: {model_name}")
-        self.model = YOLO(model_name)
+        self.model = YOLO(model_name, task="detect")
+        
+        # TensorRT engines have a fixed (static) or maximum (dynamic) batch;
+        # detect_batch() splits larger batches to fit
+        if model_name.endswith(".engine"):
+            self.max_batch_size, self._dynamic_batch = _engine_batch_info(model_name)
+        else:
+            self.max_batch_size, self._dynamic_batch = None, True
+        
+        # FP16 PyTorch weights need CUDA; engines carry their own precision
+        self._half = (
+            precision != "fp32"
+            and model_name.endswith(".pt")
+            and self._get_preprocess_device(device) is not None
+        )
         
         # Person class ID in COCO dataset
         self.person_class_id = 0
     
+    @staticmethod
+    def _resolve_model_path(model_size: str, engine_path: Optional[str]) -> str:
+        """Pick INT8 engine, then FP16 engine, then PyTorch weights."""
+        if engine_path is not None:
+            engine = Path(engine_path)
+            if engine.exists():
+                return str(engine)
+            
+            fp16_engine = engine.with_name(engine.name.replace("_int8", "_fp16"))
+            if fp16_engine != engine and fp16_engine.exists():
+                print(f"INT8 engine not found, using FP16 engine: {fp16_engine}")
+                return str(fp16_engine)
+            
+            print(f"TensorRT engine not found at {engine}, using PyTorch weights")
+        
+        return f"yolov8{model_size}.pt"
+    
+    @staticmethod
+    def _get_preprocess_device(device: Optional[str]):
+        """Return the CUDA device for GPU preprocessing, or None for CPU."""
+        try:
+            import torch
+        except ImportError:
+            return None
+        
+        if not torch.cuda.is_available():
+            return None
+        if device is None:
+            return torch.device("cuda")
+        
+        device = str(device)
+        if device.isdigit():
+            return torch.device(f"cuda:{device}")
+        if device.startswith("cuda"):
+            return torch.device(device)
+        return None
+    
+    def _upload(self, frame: np.ndarray):
+        """
+        Copy a uint8 frame to the preprocess device through pinned memory.
+        
+        Buffers are used round-robin; a buffer is only rewritten once its
+        previous copy has completed, so the host never waits on the copy
+        it just queued.
+        """
+        import torch
+        
+        host = torch.from_numpy(frame)
+        if host.is_pinned() and host.is_contiguous():
+            # Pooled capture frames are already page-locked: copy directly and
+            # hold the buffer back from the pool until the copy has finished
+            device_frame = host.to(self._preprocess_device, non_blocking=True)
+            hold_until(frame, torch.cuda.current_stream(self._preprocess_device).record_event())
+            return device_frame
+        
+        if len(self._staging) < STAGING_BUFFERS:
+            self._staging.append([None, None])
+        slot = self._staging[self._staging_index % len(self._staging)]
+        self._staging_index += 1
+        
+        staging, event = slot
+        if staging is None or staging.shape != frame.shape:
+            staging = torch.empty(frame.shape, dtype=torch.uint8, pin_memory=True)
+            slot[0] = staging
+        elif event is not None:
+            event.synchronize()
+        staging.copy_(host)
+        
+        device_frame = staging.to(self._preprocess_device, non_blocking=True)
+        slot[1] = torch.cuda.current_stream(self._preprocess_device).record_event()
+        return device_frame
+    
+    @property
+    def gpu_preprocess_device(self):
+        """CUDA device used for preprocessing, or None on the CPU path."""
+        return self._preprocess_device
+    
+    @staticmethod
+    def _frame_shape(frame) -> Tuple[int, int]:
+        """(H, W) of a BGR ndarray [H, W, 3] or RGB tensor [3, H, W]."""
+        if isinstance(frame, np.ndarray):
+            return frame.shape[:2]
+        return tuple(frame.shape[1:3])
+    
+    def _preprocess_gpu(self, frames: list):
+        """
+        Letterbox a list of frames into one normalized RGB batch on GPU.
+        
+        BGR ndarrays are uploaded as raw uint8 and flipped to RGB; RGB
+        uint8 tensors [3, H, W] (e.g. from nvJPEG) are used in place.
+        Frames are then scaled to [0, 1], resized to fit imgsz and padded
+        (bottom/right) on the device.
+        
+        Returns:
+            Tuple of (tensor [B, 3, imgsz, imgsz], list of per-frame scales)
+        """
+        import torch
+        import torch.nn.functional as F
+        
+        batch = torch.full(
+            (len(frames), 3, self.imgsz, self.imgsz), 114 / 255.0,
+            dtype=torch.half if self._half else torch.float32,
+            device=self._preprocess_device
+        )
+        scales = []
+        
+        for i, frame in enumerate(frames):
+            h, w = self._frame_shape(frame)
+            scale = self.imgsz / max(h, w)
+            new_h, new_w = max(1, round(h * scale)), max(1, round(w * scale))
+            
+            if isinstance(frame, np.ndarray):
+                t = self._upload(frame).flip(-1).permute(2, 0, 1)
+            else:
+                t = frame.to(self._preprocess_device, non_blocking=True)
+            t = t.unsqueeze(0).float().div_(255.0)
+            if (new_h, new_w) != (h, w):
+                t = F.interpolate(t, size=(new_h, new_w), mode="bilinear", align_corners=False)
+            
+            batch[i, :, :new_h, :new_w] = t[0]
+            scales.append(scale)
+        
+        return batch, scales
+    
     def detect(
         self,
         frame: np.ndarray,
@@ -123,52 +333,109 @@ class YOLOv8Detector:
         Detect people in frame.
         
         Args:
-            frame: BGR image from OpenCV
+            frame: BGR image from OpenCV, or an RGB uint8 tensor [3, H, W]
+                   already on the GPU (requires GPU preprocessing)
             classes: Classes to detect (default: [0] for person only)
             
         Returns:
             DetectionResult with person count and bounding boxes
         """
+        return self.detect_batch([frame], classes=classes)[0]
+    
+    def detect_batch(
+        self,
+        frames: List[np.ndarray],
+        classes: Optional[List[int]] = None
+    ) -> List[DetectionResult]:
+        """
+        Detect people in several frames with a single batched forward pass.
+        
+        Args:
+            frames: List of BGR images from OpenCV (sizes may differ), or
+                    RGB uint8 GPU tensors as accepted by detect()
+            classes: Classes to detect (default: [0] for person only)
+            
+        Returns:
+            One DetectionResult per input frame, in order. Processing time
+            is the batch time amortized over the frames.
+            
+        Safe to call from several threads; calls are serialized.
+        """
         import time
         start = time.perf_counter()
         
-        # Default to person class only
+        if not frames:
+            return []
+        
         if classes is None:
             classes = [self.person_class_id]
         
-        # Run inference
-        results = self.model(
-            frame,
+        chunk = self.max_batch_size or len(frames)
+        results, scales = [], []
+        with self._lock:
+            for i in range(0, len(frames), chunk):
+                chunk_results, chunk_scales = self._predict(frames[i:i + chunk], classes)
+                results.extend(chunk_results)
+                scales.extend(chunk_scales)
+        
+        per_frame_ms = (time.perf_counter() - start) * 1000 / len(frames)
+        
+        batch_results = []
+        for frame, result, scale in zip(frames, results, scales):
+            detections = self._extract_detections(result, scale)
+            batch_results.append(DetectionResult(
+                detections=detections,
+                person_count=len(detections),
+                processing_time_ms=per_frame_ms,
+                frame_shape=self._frame_shape(frame)
+            ))
+        
+        return batch_results
+    
+    def _predict(self, frames: list, classes: List[int]) -> Tuple[list, List[float]]:
+        """One forward pass over at most max_batch_size frames."""
+        n = len(frames)
+        if not self._dynamic_batch and self.max_batch_size and n < self.max_batch_size:
+            # Static engines only accept their exact batch; pad with the last frame
+            frames = frames + [frames[-1]] * (self.max_batch_size - n)
+        
+        if self._preprocess_device is not None:
+            source, scales = self._preprocess_gpu(frames)
+        else:
+            source, scales = frames, [1.0] * len(frames)
+        
+        results = self.model.predict(
+            source,
             classes=classes,
             conf=self.confidence_threshold,
             device=self.device,
+            imgsz=self.imgsz,
+            half=self._half,
             verbose=False
         )
+        return list(results)[:n], scales[:n]
+    
+    def _extract_detections(self, result, scale: float = 1.0) -> List[PersonDetection]:
+        """
+        Convert one Ultralytics result into person detections.
         
-        # Extract detections
-        detections = []
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                confidence = float(box.conf[0])
-                class_id = int(box.cls[0])
-                
-                if class_id == self.person_class_id:
-                    detections.append(PersonDetection(
-                        bbox=(x1, y1, x2, y2),
-                        confidence=confidence,
-                        class_id=class_id
-                    ))
-        
-        processing_time = (time.perf_counter() - start) * 1000
-        
-        return DetectionResult(
-            detections=detections,
-            person_count=len(detections),
-            processing_time_ms=processing_time,
-            frame_shape=frame.shape[:2]
-        )
+        Box coordinates are divided by scale to map letterboxed GPU
+        input back to the original frame.
+        """
+        boxes = result.boxes
+        if len(boxes) == 0:
+            return []
+        
+        # One device->host copy per result instead of one per box
+        class_ids = boxes.cls.cpu().numpy().astype(int)
+        person = class_ids == self.person_class_id
+        xyxy = (boxes.xyxy.cpu().numpy()[person] / scale).astype(int).tolist()
+        confs = boxes.conf.cpu().numpy()[person].tolist()
+        
+        return [
+            PersonDetection(bbox=tuple(bbox), confidence=confidence, class_id=self.person_class_id)
+            for bbox, confidence in zip(xyxy, confs)
+        ]
     
     def draw_detections(
         self,
@@ -176,7 +443,8 @@ class YOLOv8Detector:
         result: DetectionResult,
         color: Tuple[int, int, int] = (0, 255, 0),
         thickness: int = 2,
-        show_confidence: bool = True
+        show_confidence: bool = True,
+        inplace: bool = False
     ) -> np.ndarray:
         """
         Draw detection boxes on frame.
@@ -187,22 +455,29 @@ class YOLOv8Detector:
             color: Box color (BGR)
             thickness: Line thickness
             show_confidence: Show confidence scores
+            inplace: Draw directly on frame instead of a copy
             
         Returns:
-            Frame with drawn detections
+            Frame with drawn detections (frame itself if inplace)
         """
         import cv2
         
-        output = frame.copy()
+        output = frame if inplace else frame.copy()
         
-        for det in result.detections:
-            x1, y1, x2, y2 = det.bbox
-            
-            # Draw box
-            cv2.rectangle(output, (x1, y1), (x2, y2), color, thickness)
-            
-            # Label
-            if show_confidence:
+        # Draw all box outlines in one call (same pixels as per-box rectangles)
+        if result.detections:
+            boxes = np.array([det.bbox for det in result.detections], dtype=np.int32)
+            if thickness > 0:
+                corners = boxes[:, [0, 1, 2, 1, 2, 3, 0, 3]].reshape(-1, 4, 2)
+                cv2.polylines(output, list(corners), True, color, thickness)
+            else:
+                for x1, y1, x2, y2 in boxes.tolist():
+                    cv2.rectangle(output, (x1, y1), (x2, y2), color, thickness)
+        
+        # Labels
+        if show_confidence:
+            for det in result.detections:
+                x1, y1 = det.bbox[:2]
                 label = f"Person {det.confidence:.2f}"
                 cv2.putText(
                     output, label, (x1, y1 - 10),
@@ -243,7 +518,8 @@ class HybridCrowdCounter:
         csrnet_engine,
         yolo_detector: Optional[YOLOv8Detector] = None,
         density_threshold: float = 30,
-        area_sqm: float = 100.0
+        area_sqm: float = 100.0,
+        decision_ttl: int = 10
     ):
         """
         Initialize hybrid counter.
@@ -253,13 +529,18 @@ class HybridCrowdCounter:
             yolo_detector: YOLOv8Detector instance (created if None)
             density_threshold: Use YOLO when estimated count < threshold
             area_sqm: Area for density calculation
+            decision_ttl: Frames to reuse a CSRNet/YOLO decision before
+                          re-checking with CSRNet (1 = check every frame)
         """
         self.csrnet = csrnet_engine
         self.yolo = yolo_detector
         self.density_threshold = density_threshold
         self.area_sqm = area_sqm
+        self.decision_ttl = decision_ttl
         
         self._last_method = None
+        self._frame_index = 0
+        self._decision_cache: Optional[Tuple[bool, int]] = None  # (use_yolo, frame index)
     
     def count(
         self,
@@ -276,24 +557,56 @@ class HybridCrowdCounter:
         Returns:
             Dictionary with count and method used
         """
-        if force_method == "yolo" or (
-            force_method is None and self._should_use_yolo(frame)
-        ):
+        if force_method == "yolo":
             return self._count_with_yolo(frame)
-        else:
+        if force_method is not None:
             return self._count_with_csrnet(frame)
+        
+        self._frame_index += 1
+        use_yolo, csrnet_result = self._should_use_yolo(frame)
+        
+        if not use_yolo:
+            # The decision pass already is the CSRNet answer
+            if csrnet_result is None:
+                return self._count_with_csrnet(frame)
+            return self._csrnet_response(csrnet_result)
+        
+        response = self._count_with_yolo(frame)
+        if response["method"] == "yolo" and response["count"] >= self.density_threshold:
+            # Scene got busier than YOLO is meant for; re-check next frame
+            self._decision_cache = None
+        return response
     
-    def _should_use_yolo(self, frame: np.ndarray) -> bool:
-        """Decide whether to use YOLO based on initial CSRNet estimate."""
-        # Quick CSRNet estimate
-        result = self.csrnet.process(frame, area_sqm=self.area_sqm)
+    def _should_use_yolo(self, frame: np.ndarray):
+        """
+        Decide whether to use YOLO based on a CSRNet estimate.
+        
+        The decision is reused for decision_ttl frames, so most frames
+        skip the extra CSRNet pass entirely.
+        
+        Returns:
+            Tuple of (use_yolo, CSRNet result if one was computed else None)
+        """
+        if self._decision_cache is not None:
+            use_yolo, decided_at = self._decision_cache
+            if self._frame_index - decided_at < self.decision_ttl:
+                return use_yolo, None
+        
+        # Quick CSRNet estimate (count only, no density map transfer)
+        result = self.csrnet.process(frame, area_sqm=self.area_sqm, return_density_map=False)
         
         # Use YOLO for low-density scenes
-        return result.crowd_count < self.density_threshold
+        use_yolo = result.crowd_count < self.density_threshold
+        self._decision_cache = (use_yolo, self._frame_index)
+        return use_yolo, result
     
     def _count_with_csrnet(self, frame: np.ndarray) -> Dict:
         """Count using CSRNet."""
-        result = self.csrnet.process(frame, area_sqm=self.area_sqm)
+        result = self.csrnet.process(frame, area_sqm=self.area_sqm, return_density_map=False)
+        return self._csrnet_response(result)
+    
+    def _csrnet_response(self, result) -> Dict:
+        """Build the count dict from a CSRNet InferenceResult."""
         self._last_method = "csrnet"
         
         return {
@@ -338,6 +651,64 @@ class HybridCrowdCounter:
             return "CRITICAL"
 
 
+def export_tensorrt_engine(
+    model_size: str = "n",
+    int8: bool = True,
+    data: str = "calib.yaml",
+    imgsz: int = 640,
+    workspace: int = 4,
+    save_path: Optional[str] = None,
+    batch: int = 16
+) -> Path:
+    """
+    Export YOLOv8 weights to a TensorRT engine (offline, run once per GPU).
+    
+    INT8 export needs a calibration dataset YAML pointing at 200-500
+    representative frames from the deployment cameras.
+    
+    Args:
+        model_size: YOLO model size ('n', 's', 'm', 'l', 'x')
+        int8: Export INT8 engine (FP16 if False)
+        data: Calibration dataset YAML (used for INT8 only)
+        imgsz: Inference image size
+        workspace: TensorRT builder workspace in GB
+        save_path: Output engine path (default: crowd_ai/weights/)
+        batch: Maximum batch size of the (dynamic-batch) engine; should
+               cover the API server's request batcher
+        
+    Returns:
+        Path to the exported engine
+    """
+    if not YOLO_AVAILABLE:
+        raise ImportError(
+            "ultralytics package not installed. "
+            "Install with: pip install ultralytics"
+        )
+    
+    precision = "int8" if int8 else "fp16"
+    target = Path(save_path) if save_path else default_engine_path(model_size, precision)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    
+    model = YOLO(f"yolov8{model_size}.pt")
+    export_kwargs = {
+        "format": "engine",
+        "imgsz": imgsz,
+        "workspace": workspace,
+        "half": not int8,
+        "int8": int8,
+        "dynamic": True,
+        "batch": batch,
+    }
+    if int8:
+        export_kwargs["data"] = data
+    
+    exported = Path(model.export(**export_kwargs))
+    exported.replace(target)
+    
+    print(f"TensorRT {precision.upper()} engine saved to {target}")
+    return target
+
+
 def check_yolo_available() -> bool:
     """Check if YOLO is available."""
     return YOLO_AVAILABLE